@@ -1,24 +1,94 @@
-from typing import List, Dict, Optional
+from typing import TYPE_CHECKING, Callable, Iterator, List, Dict, Optional, Union
 import os
+import time
 import uuid
-import tempfile
+import queue
+import hashlib
 import asyncio
+import logging
+import threading
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
 from datetime import datetime
 
 import streamlit as st
 from dotenv import load_dotenv
 
-from firecrawl import FirecrawlApp
-from qdrant_client import QdrantClient
-from qdrant_client.http import models
-from qdrant_client.http.models import Distance, VectorParams
-from fastembed import TextEmbedding
-
-from agents import Agent, Runner
-from openai import AsyncOpenAI
+from chunking import chunk_pages
+from catalog import CatalogBuilder, detect_language
+from conversation import ConversationMemory, RENDER_WINDOW
+from retrieval import BM25Index, reciprocal_rank_fusion
+from chunk_store import ChunkStore, get_chunk_store
+from resources import (get_embedding_model, get_vector_client, get_reranker, embedding_dim, get_async_openai, run_async,
+                       prewarm_embedding_model, is_remote_qdrant)
+from answer_cache import get_answer_cache, DENSE_SIMILARITY
+from audio_cache import get_audio_cache, audio_key
+from audio_server import (AUDIO_CHUNK_BYTES, TTS_FORMAT, SegmentedStream, audio_source, clip_mime, live_url, mime_type,
+                          open_live_clip, start_audio_server)
+from speech_pipeline import AsyncSpeechPipeline, segment_player
+from openai_http import get_rate_limiter, estimate_request_tokens, COMPLETION_TOKEN_ESTIMATE
+from prompts import assemble_text, count_tokens, record_cached_tokens
+from faq_bundle import get_faq_bundle
+from ingest_jobs import get_ingest_jobs, ACTIVE_STATES, QUEUED, CRAWLING, EMBEDDING, FAILED
+from tracing import trace, span, cache_event, format_breakdown, start_metrics_server
+from startup import lazy_import, milestone, format_startup_report
+
+# firecrawl, qdrant_client, fastembed, agents and openai take seconds to import, so they are
+# imported where first needed (Initialize or a question), not when the page first renders
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from qdrant_client.http import models
+    from fastembed import TextEmbedding
+    from agents import Agent
 
 load_dotenv()
 
+FIRECRAWL_API_URL = os.getenv("FIRECRAWL_API_URL", "https://api.firecrawl.dev")
+
+# Streaming ingestion: crawl status poll interval (seconds), pages buffered between the crawl
+# and the indexer, pages chunked + embedded together, and the sidebar's crawl limit
+CRAWL_POLL_INTERVAL = float(os.getenv("CRAWL_POLL_INTERVAL", "2"))
+INGEST_QUEUE_PAGES = int(os.getenv("INGEST_QUEUE_PAGES", "16"))
+INGEST_BATCH_PAGES = int(os.getenv("INGEST_BATCH_PAGES", "8"))
+MAX_CRAWL_PAGES = int(os.getenv("MAX_CRAWL_PAGES", "500"))
+INGEST_POLL_SECONDS = 1.0  # how often a session refreshes its ingest job's status
+
+# Ingestion tuning (texts per ONNX batch, fastembed worker processes, points per upsert)
+EMBED_BATCH_SIZE = int(os.getenv("EMBED_BATCH_SIZE", "64"))
+EMBED_PARALLEL = int(os.getenv("EMBED_PARALLEL", "0")) or None
+UPSERT_BATCH_SIZE = int(os.getenv("UPSERT_BATCH_SIZE", "128"))
+UPSERT_WORKERS = int(os.getenv("UPSERT_WORKERS", "2"))
+
+# Hybrid retrieval: candidates per retriever (dense + BM25) before fusion, chunks sent to the
+# model, and how many fused candidates the optional cross-encoder rescores
+RETRIEVAL_CANDIDATES = int(os.getenv("RETRIEVAL_CANDIDATES", "20"))
+RETRIEVAL_TOP_K = int(os.getenv("RETRIEVAL_TOP_K", "3"))
+RERANK_CANDIDATES = int(os.getenv("RERANK_CANDIDATES", "10"))
+SPARSE_INDEX_CACHE_SIZE = 4
+
+# Vector storage: "full" payloads carry each chunk's text and page metadata; "lean" keeps only
+# these small filterable fields in the index and the rest in the local chunk store (chunk_store.py)
+PAYLOAD_MODE = os.getenv("PAYLOAD_MODE", "full")
+LEAN_PAYLOAD_FIELDS = ("url", "source_root", "content_hash", "chunk_index", "heading", "language")
+# Qdrant server collections: int8 scalar quantization (a 4x smaller copy of the vectors searched in
+# RAM, float32 originals on disk) rescoring oversampled candidates with the originals; "none" disables
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "int8")
+QUANTIZATION_OVERSAMPLING = float(os.getenv("QUANTIZATION_OVERSAMPLING", "2.0"))
+
+TTS_MODEL = "gpt-4o-mini-tts"
+
+# Speaking instructions are fixed per language, so no LLM call is needed to produce them
+TTS_BASE_INSTRUCTIONS = "Convert response into natural spoken speech. Friendly and clear."
+TTS_LANGUAGE_HINTS = {
+    "en": "Speak in clear Indian English.",
+    "hinglish": "Speak natural Hinglish the way customers in an Indian shop talk, pronouncing Hindi words naturally.",
+    "hi": "Speak in natural Hindi, reading prices and quantities clearly.",
+}
+TTS_INSTRUCTIONS = {lang: f"{TTS_BASE_INSTRUCTIONS} {hint}" for lang, hint in TTS_LANGUAGE_HINTS.items()}
+
+logger = logging.getLogger(__name__)
+
 # -----------------------------
 # UI Glass Style (Optional)
 # -----------------------------
@@ -55,19 +125,27 @@ def apply_glass_ui():
 # -----------------------------
 def init_session_state():
     defaults = {
+        "index_backend": "qdrant",
         "qdrant_url": "",
         "qdrant_api_key": "",
         "firecrawl_api_key": "",
         "openai_api_key": "",
         "doc_url": "",
         "setup_complete": False,
-        "client": None,
-        "embedding_model": None,
+        "index_version": "",
         "processor_agent": None,
-        "tts_agent": None,
+        "ingest_job": None,  # id of this session's background ingest job
+        "applied_job": None,  # the finished job whose index this session answers from
         "selected_voice": "coral",
+        "tts_format": TTS_FORMAT,
+        "show_timings": False,
+        "retrieval_k": RETRIEVAL_TOP_K,
+        "rerank": False,
+        "catalog": None,
         "crawl_limit": 5,
-        "chat": []  # ChatGPT style history
+        "memory": ConversationMemory(),  # ChatGPT style history, token-budgeted for the prompt
+        "history_shown": RENDER_WINDOW,
+        "audio_turn": 0  # numbers the voiced answers, keeping their players distinct
     }
     for k, v in defaults.items():
         if k not in st.session_state:
@@ -77,91 +155,517 @@ def init_session_state():
 # -----------------------------
 # Setup Qdrant
 # -----------------------------
-def setup_qdrant_collection(qdrant_url: str, qdrant_api_key: str, collection_name="docs_embeddings"):
-    client = QdrantClient(url=qdrant_url, api_key=qdrant_api_key)
-    embedding_model = TextEmbedding()
-
-    test_embedding = list(embedding_model.embed(["test"]))[0]
-    embedding_dim = len(test_embedding)
+def setup_qdrant_collection(qdrant_url: str, qdrant_api_key: str, collection_name="docs_embeddings", backend="qdrant"):
+    # shared across sessions: one client per Qdrant config (or the embedded index), one loaded model per process
+    client = get_vector_client(backend, qdrant_url, qdrant_api_key)
+    embedding_model = get_embedding_model()
+    models = lazy_import("qdrant_client.http.models")
+    # quantization and payload indexes only exist on a Qdrant server; in-process indexes search exhaustively
+    remote = is_remote_qdrant(client)
+    quantization = quantization_config() if remote else None
 
     try:
         client.create_collection(
             collection_name=collection_name,
-            vectors_config=VectorParams(size=embedding_dim, distance=Distance.COSINE)
+            vectors_config=models.VectorParams(size=embedding_dim(), distance=models.Distance.COSINE,
+                                               on_disk=quantization is not None),
+            quantization_config=quantization
         )
     except Exception as e:
         if "already exists" not in str(e).lower():
             raise e
+        # collections created before quantization was enabled are quantized in place
+        if quantization is not None and client.get_collection(collection_name).config.quantization_config is None:
+            client.update_collection(collection_name, quantization_config=quantization)
+
+    # incremental re-indexing filters existing points by these fields
+    if remote:
+        for field in ("url", "source_root"):
+            client.create_payload_index(collection_name, field_name=field, field_schema=models.PayloadSchemaType.KEYWORD)
 
     return client, embedding_model
 
 
+def quantization_config() -> Optional["models.ScalarQuantization"]:
+    if VECTOR_QUANTIZATION != "int8":
+        return None
+    models = lazy_import("qdrant_client.http.models")
+    return models.ScalarQuantization(scalar=models.ScalarQuantizationConfig(
+        type=models.ScalarType.INT8, quantile=0.99, always_ram=True))
+
+
+def search_params() -> Optional["models.SearchParams"]:
+    """Rescore quantized candidates with the original vectors (Qdrant server collections)."""
+    if VECTOR_QUANTIZATION != "int8":
+        return None
+    models = lazy_import("qdrant_client.http.models")
+    return models.SearchParams(quantization=models.QuantizationSearchParams(
+        rescore=True, oversampling=QUANTIZATION_OVERSAMPLING))
+
+
 # -----------------------------
 # Crawl docs (Firecrawl FIXED)
 # -----------------------------
-def crawl_documentation(firecrawl_api_key: str, url: str, limit: int = 5):
-    firecrawl = FirecrawlApp(api_key=firecrawl_api_key)
-
-    response = firecrawl.crawl(
-        url=url,
-        params={
-            "limit": limit,
-            "scrapeOptions": {"formats": ["markdown"]}
+def to_page(document, root_url: str) -> Dict:
+    metadata = document.metadata or {}
+    if not isinstance(metadata, dict):
+        metadata = metadata.model_dump()
+    return {
+        "content": document.markdown or "",
+        "url": metadata.get("source_url") or metadata.get("url") or root_url,
+        "metadata": {
+            "title": metadata.get("title") or "",
+            "description": metadata.get("description") or "",
+            "language": metadata.get("language") or "en",
+            "crawl_date": datetime.now().isoformat()
         }
-    )
+    }
+
+
+def stream_crawl(firecrawl_api_key: str, url: str, limit: int = 5,
+                 poll_interval: float = CRAWL_POLL_INTERVAL) -> Iterator[Dict]:
+    """Start an async crawl job and yield pages as Firecrawl completes them.
 
-    pages = []
-    for page in response.get("data", []):
-        content = page.get("markdown", "") or ""
-        metadata = page.get("metadata", {}) or {}
-        source_url = metadata.get("sourceURL", url)
-
-        pages.append({
-            "content": content,
-            "url": source_url,
-            "metadata": {
-                "title": metadata.get("title", ""),
-                "description": metadata.get("description", ""),
-                "language": metadata.get("language", "en"),
-                "crawl_date": datetime.now().isoformat()
-            }
-        })
+    Each status poll asks only for the pages not seen yet (skip=N) and follows the result
+    pagination, so nothing is held beyond the current response. Closing the generator early
+    cancels the job.
+    """
+    firecrawl = lazy_import("firecrawl").FirecrawlApp(api_key=firecrawl_api_key, api_url=FIRECRAWL_API_URL)
+    scrape_options = lazy_import("firecrawl.v2.types").ScrapeOptions(formats=["markdown"])
+    job = firecrawl.start_crawl(url, limit=limit, scrape_options=scrape_options)
+    seen = 0
+    done = False
+    try:
+        while True:
+            status = firecrawl.get_crawl_status_page(f"/v2/crawl/{job.id}?skip={seen}")
+            state = status.status
+            while True:
+                for document in status.data or []:
+                    seen += 1
+                    yield to_page(document, url)
+                if not status.next:
+                    break
+                status = firecrawl.get_crawl_status_page(status.next)
+            if state == "completed":
+                done = True
+                return
+            if state in ("failed", "cancelled"):
+                done = True
+                raise RuntimeError(f"Crawl {state} after {seen} pages.")
+            time.sleep(poll_interval)
+    finally:
+        if not done:
+            try:
+                firecrawl.cancel_crawl(job.id)
+            except Exception as e:
+                logger.warning("Could not cancel crawl %s: %s", job.id, e)
+
+
+def crawl_documentation(firecrawl_api_key: str, url: str, limit: int = 5) -> List[Dict]:
+    """Every crawled page in one list (small crawls; ingestion streams with ingest_stream)."""
+    with span("crawl", limit=limit) as s:
+        pages = list(stream_crawl(firecrawl_api_key, url, limit))
+        s["pages"] = len(pages)
+        s["bytes_in"] = sum(len(p["content"]) for p in pages)
     return pages
 
 
 # -----------------------------
 # Store embeddings
 # -----------------------------
-def store_embeddings(client: QdrantClient, embedding_model: TextEmbedding, pages: List[Dict], collection_name: str):
-    for page in pages:
-        if not page["content"].strip():
-            continue
+def point_id(url: str, chunk_index: int) -> str:
+    """Deterministic point ID so re-crawls overwrite instead of duplicating."""
+    return str(uuid.uuid5(uuid.NAMESPACE_URL, f"{url}#{chunk_index}"))
+
 
-        embedding = list(embedding_model.embed([page["content"]]))[0]
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode("utf-8")).hexdigest()
 
-        client.upsert(
+
+def fetch_existing_hashes(client: "QdrantClient", collection_name: str, source_root: str, urls: List[str]) -> Dict[str, Optional[str]]:
+    """Point ID -> stored content hash for everything under this doc root or these URLs."""
+    models = lazy_import("qdrant_client.http.models")
+    conditions = [models.FieldCondition(key="url", match=models.MatchAny(any=urls))]
+    if source_root:
+        conditions.append(models.FieldCondition(key="source_root", match=models.MatchValue(value=source_root)))
+
+    existing = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(
             collection_name=collection_name,
-            points=[
-                models.PointStruct(
-                    id=str(uuid.uuid4()),
-                    vector=embedding.tolist(),
-                    payload={
-                        "content": page["content"],
-                        "url": page["url"],
-                        **page["metadata"]
-                    }
-                )
-            ]
+            scroll_filter=models.Filter(should=conditions),
+            with_payload=["content_hash"],
+            with_vectors=False,
+            limit=256,
+            offset=offset
         )
+        for p in points:
+            existing[str(p.id)] = (p.payload or {}).get("content_hash")
+        if offset is None:
+            return existing
+
+
+def index_version(hashes: Dict[str, Optional[str]]) -> str:
+    """Identifies an index's content: every point ID with its chunk's content hash."""
+    return content_hash("".join(f"{pid}:{hashes[pid]}" for pid in sorted(hashes)))[:12]
+
+
+def collection_version(client: "QdrantClient", collection_name: str) -> str:
+    """index_version() of a collection as stored, for processes that didn't run its ingest (faq_batch.py)."""
+    hashes = {}
+    offset = None
+    while True:
+        points, offset = client.scroll(collection_name=collection_name, with_payload=["content_hash"],
+                                       with_vectors=False, limit=256, offset=offset)
+        for p in points:
+            hashes[str(p.id)] = (p.payload or {}).get("content_hash")
+        if offset is None:
+            return index_version(hashes)
+
+
+class IndexWriter:
+    """Incremental indexing fed in batches: skip unchanged, embed + upsert changed, delete vanished on finish().
+
+    Upserts are sent while the next batch is being embedded, and points are searchable as soon
+    as their batch lands. Only point IDs and content hashes are kept across batches.
+    With payload_mode="lean" the chunk texts go to chunk_store (default: the shared one) before
+    their points are upserted, and a point whose text the store lacks is indexed again.
+    """
+
+    def __init__(self, client: "QdrantClient", embedding_model: "TextEmbedding", collection_name: str, source_root: str = "",
+                 batch_size: int = EMBED_BATCH_SIZE, parallel: Optional[int] = EMBED_PARALLEL,
+                 upsert_batch_size: int = UPSERT_BATCH_SIZE, upsert_workers: int = UPSERT_WORKERS,
+                 payload_mode: str = PAYLOAD_MODE, chunk_store: Optional[ChunkStore] = None):
+        self.client = client
+        self.embedding_model = embedding_model
+        self.collection_name = collection_name
+        self.source_root = source_root
+        self.batch_size = batch_size
+        self.parallel = parallel
+        self.upsert_batch_size = upsert_batch_size
+        self.upsert_workers = upsert_workers
+        self.chunk_store = (chunk_store or get_chunk_store()) if payload_mode == "lean" else None
+        self.pool = ThreadPoolExecutor(max_workers=upsert_workers)
+        self.in_flight = []
+        self.hashes: Dict[str, str] = {}
+        self.urls = set()
+        self.upserted = 0
+        self.started = time.perf_counter()
+
+    def _upsert(self, points: List["models.PointStruct"]):
+        # keep at most 2 batches per worker queued so memory stays bounded
+        while len(self.in_flight) >= self.upsert_workers * 2:
+            self.in_flight.pop(0).result()
+        self.in_flight.append(self.pool.submit(self.client.upsert, collection_name=self.collection_name,
+                                               points=points, wait=True))
+
+    def add(self, chunks: List[Dict]) -> int:
+        """Index a batch of chunks; returns how many were new or changed."""
+        latest = {}
+        for c in chunks:
+            if c["content"].strip():
+                latest[point_id(c["url"], c.get("chunk_index", 0))] = c
+        if not latest:
+            return 0
+        hashes = {pid: content_hash(c["content"]) for pid, c in latest.items()}
+        urls = sorted({c["url"] for c in latest.values()})
+        self.hashes.update(hashes)
+        self.urls.update(urls)
+
+        # the previous batch lands before this one is compared (embedded clients are not thread-safe)
+        self._drain()
+        with span("fetch_existing"):
+            existing = fetch_existing_hashes(self.client, self.collection_name, "", urls)
+        stored = self.chunk_store.hashes(self.collection_name, latest) if self.chunk_store else hashes
+        changed = [(pid, c, hashes[pid]) for pid, c in latest.items()
+                   if existing.get(pid) != hashes[pid] or stored.get(pid) != hashes[pid]]
+        if not changed:
+            return 0
+
+        models = lazy_import("qdrant_client.http.models")
+        embeddings = self.embedding_model.embed([c["content"] for _, c, _ in changed],
+                                                batch_size=self.batch_size, parallel=self.parallel)
+        with span("embed_upsert", chunks=len(changed)):
+            batch, texts = [], []
+            for (pid, chunk, digest), embedding in zip(changed, embeddings):
+                payload = {
+                    "content": chunk["content"],
+                    "url": chunk["url"],
+                    "source_root": self.source_root,
+                    "content_hash": digest,
+                    "chunk_index": chunk.get("chunk_index", 0),
+                    "heading_path": chunk.get("heading_path", []),
+                    **chunk["metadata"]
+                }
+                if self.chunk_store:
+                    texts.append({"id": pid, "content_hash": digest, "content": payload.pop("content"),
+                                  "metadata": {k: payload.pop(k) for k in list(payload) if k not in LEAN_PAYLOAD_FIELDS}})
+                batch.append(models.PointStruct(id=pid, vector=embedding.tolist(), payload=payload))
+                if len(batch) >= self.upsert_batch_size:
+                    self._flush(batch, texts)
+                    batch, texts = [], []
+            if batch:
+                self._flush(batch, texts)
+        self.upserted += len(changed)
+        return len(changed)
+
+    def _flush(self, points: List["models.PointStruct"], texts: List[Dict]):
+        # texts first: a point must not become searchable before its text can be read
+        if self.chunk_store:
+            self.chunk_store.put(self.collection_name, texts)
+        self._upsert(points)
+
+    def _drain(self):
+        in_flight, self.in_flight = self.in_flight, []
+        for future in in_flight:
+            future.result()
+
+    def _persist(self):
+        # the embedded index keeps upserts in memory and writes its files once per ingest
+        if hasattr(self.client, "flush"):
+            self.client.flush()
+
+    def abort(self):
+        """Stop without deleting anything; upserts already sent still land."""
+        self.in_flight = []
+        self.pool.shutdown(wait=True, cancel_futures=True)
+        self._persist()
+
+    def finish(self) -> Dict:
+        """Wait for pending upserts, drop points no longer in the docs, and return the ingest stats."""
+        try:
+            self._drain()
+        finally:
+            self.pool.shutdown(wait=False)
+        if not self.hashes:
+            # an empty crawl must not wipe the existing index
+            return {"pages": 0, "chunks": 0, "unchanged": 0, "upserted": 0, "deleted": 0,
+                    "seconds": 0.0, "pages_per_sec": 0.0, "version": ""}
+
+        with span("fetch_existing"):
+            existing = fetch_existing_hashes(self.client, self.collection_name, self.source_root, sorted(self.urls))
+        stale = [pid for pid in existing if pid not in self.hashes]
+        if stale:
+            with span("delete_stale", points=len(stale)):
+                models = lazy_import("qdrant_client.http.models")
+                self.client.delete(collection_name=self.collection_name,
+                                   points_selector=models.PointIdsList(points=stale), wait=True)
+                if self.chunk_store:
+                    self.chunk_store.delete(self.collection_name, stale)
+        self._persist()
+
+        elapsed = time.perf_counter() - self.started
+        return {
+            "pages": len(self.urls),
+            "chunks": len(self.hashes),
+            "unchanged": len(self.hashes) - self.upserted,
+            "upserted": self.upserted,
+            "deleted": len(stale),
+            "seconds": elapsed,
+            "pages_per_sec": len(self.urls) / elapsed if elapsed > 0 else 0.0,
+            "version": index_version(self.hashes),
+        }
+
+
+def store_embeddings(client: "QdrantClient", embedding_model: "TextEmbedding", chunks: List[Dict], collection_name: str,
+                     source_root: str = "", **kwargs) -> Dict:
+    """Incrementally index a complete set of chunks (see IndexWriter)."""
+    writer = IndexWriter(client, embedding_model, collection_name, source_root, **kwargs)
+    writer.add(chunks)
+    return writer.finish()
+
+
+def ingest_stream(pages: Iterator[Dict], writer: IndexWriter, catalog: Optional[CatalogBuilder] = None,
+                  on_page: Optional[Callable[[int, Dict], None]] = None, queue_size: int = INGEST_QUEUE_PAGES,
+                  batch_pages: int = INGEST_BATCH_PAGES) -> Dict:
+    """Chunk, embed and upsert pages while the crawl is still producing them.
+
+    A thread drains the crawl into a bounded queue (the crawl pauses when indexing falls
+    behind), and this thread indexes whatever pages are waiting, up to batch_pages at a time.
+    on_page(n, page) is called as each page is indexed. Returns IndexWriter.finish() stats.
+    """
+    buffer: "queue.Queue" = queue.Queue(maxsize=queue_size)
+    stop = threading.Event()
+    crawl_error = []
+
+    def produce():
+        try:
+            for page in pages:
+                while not stop.is_set():
+                    try:
+                        buffer.put(page, timeout=0.5)
+                        break
+                    except queue.Full:
+                        continue
+                if stop.is_set():
+                    break
+        except BaseException as e:
+            crawl_error.append(e)
+        finally:
+            close = getattr(pages, "close", None)
+            if close:
+                close()  # cancels the crawl job if indexing stopped early
+            while not stop.is_set():
+                try:
+                    buffer.put(None, timeout=0.5)
+                    break
+                except queue.Full:
+                    continue
+
+    producer = threading.Thread(target=produce, name="crawl-producer", daemon=True)
+    producer.start()
+    indexed = 0
+    finished = False
+    try:
+        with span("crawl_index") as s:
+            while not finished:
+                batch = [buffer.get()]
+                while len(batch) < batch_pages:
+                    try:
+                        batch.append(buffer.get_nowait())
+                    except queue.Empty:
+                        break
+                if None in batch:
+                    finished = True
+                    batch = batch[:batch.index(None)]
+                if not batch:
+                    continue
+                with span("chunk"):
+                    chunks = chunk_pages(batch)
+                writer.add(chunks)
+                for page in batch:
+                    indexed += 1
+                    s["bytes_in"] = s.get("bytes_in", 0) + len(page["content"])
+                    if catalog is not None:
+                        catalog.add(page["content"])
+                    if on_page:
+                        on_page(indexed, page)
+            s["pages"] = indexed
+        if crawl_error:
+            raise crawl_error[0]
+    except BaseException:
+        # keep what was indexed, but a partial crawl must not delete the rest
+        writer.abort()
+        raise
+    finally:
+        stop.set()
+        producer.join(timeout=5)
+    return writer.finish()
+
+
+# -----------------------------
+# Hybrid retrieval
+# -----------------------------
+_sparse_indexes: "OrderedDict[tuple, BM25Index]" = OrderedDict()
+_sparse_lock = threading.Lock()
+
+
+def with_content(collection_name: str, sections: List[Dict], chunk_store: Optional[ChunkStore] = None) -> List[Dict]:
+    """Sections with their text: lean payloads are completed from the chunk store.
+
+    A section the store doesn't have (or has for different content) is dropped.
+    """
+    lean = [s["id"] for s in sections if "content" not in s]
+    if not lean:
+        return sections
+    with span("chunk_lookup", chunks=len(lean)):
+        stored = (chunk_store or get_chunk_store()).get(collection_name, lean)
+    complete = []
+    for section in sections:
+        if "content" not in section:
+            row = stored.get(section["id"])
+            if row is None or row["content_hash"] != section.get("content_hash"):
+                continue
+            section = {**row, **section}
+        complete.append(section)
+    if len(complete) < len(sections):
+        logger.warning("%d chunks of %s are missing from the chunk store; re-index to restore them.",
+                       len(sections) - len(complete), collection_name)
+    return complete
+
+
+def sparse_index(client: "QdrantClient", collection_name: str, version: str,
+                 chunk_store: Optional[ChunkStore] = None) -> BM25Index:
+    """BM25 over every chunk in the collection, built once per index version and shared by all sessions."""
+    key = (id(client), collection_name, version)
+    with _sparse_lock:
+        if key in _sparse_indexes:
+            _sparse_indexes.move_to_end(key)
+            return _sparse_indexes[key]
+
+        sections = []
+        offset = None
+        while True:
+            points, offset = client.scroll(collection_name=collection_name, with_payload=True, with_vectors=False,
+                                           limit=256, offset=offset)
+            sections += [{**(p.payload or {}), "id": str(p.id)} for p in points]
+            if offset is None:
+                break
+        index = _sparse_indexes[key] = BM25Index(with_content(collection_name, sections, chunk_store))
+        while len(_sparse_indexes) > SPARSE_INDEX_CACHE_SIZE:
+            _sparse_indexes.popitem(last=False)
+        return index
+
+
+_reranker_failed = False
+
+
+def rerank(query: str, candidates: List[Dict]) -> List[Dict]:
+    """Reorder candidates by a local cross-encoder; keeps the fused order if the model can't load."""
+    global _reranker_failed
+    if _reranker_failed:
+        return candidates
+    try:
+        reranker = get_reranker()
+    except Exception as e:
+        # don't retry a model download on every question
+        _reranker_failed = True
+        logger.warning("Reranker unavailable, keeping fused order: %s", e)
+        return candidates
+    scores = list(reranker.rerank(query, [c.get("content", "") for c in candidates]))
+    order = sorted(range(len(candidates)), key=lambda i: scores[i], reverse=True)
+    return [candidates[i] for i in order]
+
+
+def hybrid_search(client: "QdrantClient", collection_name: str, version: str, query: str, query_embedding,
+                  k: int = RETRIEVAL_TOP_K, candidates: int = RETRIEVAL_CANDIDATES, use_reranker: bool = False,
+                  chunk_store: Optional[ChunkStore] = None) -> List[Dict]:
+    """Dense + BM25 candidates fused with reciprocal rank fusion, optionally reranked; top-k payloads.
+
+    BM25 catches the exact tokens customers type ("20L", "Weather Plus", "120+ pieces",
+    phone numbers) that the dense model blurs, especially in Hinglish. With lean payloads
+    only the fused candidates that can still be returned are read from the chunk store.
+    """
+    with span("dense_search") as s:
+        response = client.query_points(collection_name=collection_name, query=query_embedding.tolist(),
+                                       limit=candidates, with_payload=True,
+                                       search_params=search_params() if is_remote_qdrant(client) else None)
+        dense = [{**(p.payload or {}), "id": str(p.id)} for p in response.points]
+        s["hits"] = len(dense)
+    with span("sparse_search") as s:
+        index = sparse_index(client, collection_name, version, chunk_store)
+        sparse = [section for _, section in index.search(query, candidates)]
+        s["hits"] = len(sparse)
+
+    # BM25 sections already carry their text, so they win over a lean dense payload
+    by_id = {c["id"]: c for c in dense + sparse}
+    fused = [by_id[pid] for pid, _ in reciprocal_rank_fusion([[c["id"] for c in dense], [c["id"] for c in sparse]])]
+    fused = with_content(collection_name, fused[:max(k, RERANK_CANDIDATES if use_reranker else 0)], chunk_store)
+    if use_reranker and len(fused) > 1:
+        with span("rerank", candidates=min(len(fused), RERANK_CANDIDATES)):
+            fused = rerank(query, fused[:RERANK_CANDIDATES]) + fused[RERANK_CANDIDATES:]
+    return fused[:k]
 
 
 # -----------------------------
 # Agents
 # -----------------------------
-def setup_agents(openai_api_key: str):
+def setup_agents(openai_api_key: str) -> "Agent":
     os.environ["OPENAI_API_KEY"] = openai_api_key
+    agents = lazy_import("agents")
 
-    processor_agent = Agent(
+    processor_agent = agents.Agent(
         name="Shikhar Traders Support Agent",
         instructions=(
             "You are Shikhar Traders customer support assistant.\n"
@@ -173,64 +677,330 @@ def setup_agents(openai_api_key: str):
             "  Call/WhatsApp: 07355969446 or 09450805567\n"
             "  Email: shikhartraders@zohomail.com\n"
         ),
-        model="gpt-4o"
-    )
-
-    tts_agent = Agent(
-        name="Text-to-Speech Agent",
-        instructions="Convert response into natural spoken speech. Friendly and clear.",
-        model="gpt-4o-mini-tts"
+        # pooled client: keeps its connections open across turns on the shared event loop
+        model=agents.OpenAIResponsesModel(model="gpt-4o", openai_client=get_async_openai(openai_api_key))
     )
 
-    return processor_agent, tts_agent
+    return processor_agent
 
 
 # -----------------------------
 # Answer + Voice
 # -----------------------------
-async def answer_with_voice(query: str):
-    query_embedding = list(st.session_state.embedding_model.embed([query]))[0]
-
-    search_response = st.session_state.client.query_points(
-        collection_name="docs_embeddings",
-        query=query_embedding.tolist(),
-        limit=3,
-        with_payload=True
-    )
+def voice_answer_cache():
+    # shared by all sessions; dense query embeddings allow paraphrase hits
+    return get_answer_cache("voice", similarity_threshold=DENSE_SIMILARITY)
+
+
+async def stream_agent_answer(agent: "Agent", agent_input: str, on_token: Optional[Callable[[str], None]] = None) -> str:
+    """Run the agent with streaming, passing text deltas to on_token as they arrive."""
+    with span("agent", prompt_tokens_local=count_tokens(agent_input)) as s:
+        started = time.perf_counter()
+        text_delta_event = lazy_import("openai.types.responses").ResponseTextDeltaEvent
+        result = lazy_import("agents").Runner.run_streamed(agent, agent_input)
+        async for event in result.stream_events():
+            if event.type == "raw_response_event" and isinstance(event.data, text_delta_event):
+                if "ttft_ms" not in s:
+                    s["ttft_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                if on_token and event.data.delta:
+                    on_token(event.data.delta)
+        usage = result.context_wrapper.usage
+        s["completion_tokens"] = usage.output_tokens
+        record_cached_tokens(s, usage.input_tokens, getattr(usage.input_tokens_details, "cached_tokens", 0) or 0)
+    return result.final_output
+
+
+async def answer_with_voice(query: str, session: Dict, on_token: Optional[Callable[[str], None]] = None,
+                            on_audio: Optional[Callable[[bytes], None]] = None, history: str = "",
+                            search_query: str = "") -> Optional[Dict]:
+    """Answer from the indexed docs with a spoken reply.
+
+    Runs on the shared event loop (resources.run_async), so it reads a snapshot of the
+    session state instead of st.session_state. Sentences are synthesized while the answer
+    streams and handed to on_audio in order.
+    Returns {"text", "audio", "sources", "ttft", "cached", "trace"} or None when nothing
+    relevant is indexed. ttft is the seconds from the question to the first answer token
+    (None when the agent streamed no tokens);
+    trace holds the per-stage timings. Catalog price/contact questions are answered from a
+    template ("fast_path": True) without retrieval or a model call.
+    history is the conversation so far (ConversationMemory.prompt_text()); search_query, when
+    it differs from query, is the follow-up expanded with its topic for retrieval.
+    """
+    with trace("voice_answer", voice=session["selected_voice"]) as answer_trace:
+        result = await _voice_answer(query, session, on_token, on_audio, history, search_query or query)
+        answer_trace.set(cached=bool(result and result["cached"]), found=result is not None)
+    if result:
+        result["trace"] = answer_trace
+    return result
+
+
+async def _voice_answer(query: str, session: Dict, on_token: Optional[Callable[[str], None]],
+                        on_audio: Optional[Callable[[Union[bytes, str]], None]], history: str, search_query: str) -> Optional[Dict]:
+    started = time.perf_counter()
+    embedding_model = get_embedding_model()
+    client = get_vector_client(session.get("index_backend", "qdrant"), session["qdrant_url"], session["qdrant_api_key"])
+    answer_cache = voice_answer_cache()
+    audio_cache = get_audio_cache()
+    voice = session["selected_voice"]
+    response_format = session.get("tts_format", TTS_FORMAT)
+    language = detect_language(query)
+    instructions = TTS_INSTRUCTIONS[language]
+    follow_up = search_query != query
+
+    # questions pre-computed by faq_batch.py for this index come with their clip (faq_batch itself opts out)
+    if not follow_up and session.get("faq_bundle", True):
+        faq_bundle = get_faq_bundle("voice")
+        faq = faq_bundle.get(session["index_version"], language, query)
+        faq_path = faq and await asyncio.to_thread(faq_bundle.audio, faq, voice, response_format)
+        cache_event("faq", bool(faq_path))
+        if faq_path:
+            return {"text": faq["answer"], "audio": faq_path, "sources": faq["sources"],
+                    "ttft": time.perf_counter() - started, "cached": True}
+
+    # catalog prices and contacts are answered from a template: no embedding, retrieval or model call
+    catalog = session.get("catalog")
+    with span("fast_path") as s:
+        fast_answer = catalog.answer(query, language) if catalog else None
+        if fast_answer is None and catalog and follow_up:
+            fast_answer = catalog.answer(search_query, language)
+        s["matched"] = fast_answer is not None
 
-    results = search_response.points if hasattr(search_response, "points") else []
-    if not results:
-        return None, None, []
-
-    context = ""
     sources = []
-    for r in results:
-        payload = r.payload or {}
-        sources.append(payload.get("url", "Unknown URL"))
-        context += f"Source: {payload.get('url','')}\n{payload.get('content','')}\n\n"
-
-    context += f"User Question: {query}\n"
-
-    processor_result = await Runner.run(st.session_state.processor_agent, context)
-    text_answer = processor_result.final_output
-
-    tts_result = await Runner.run(st.session_state.tts_agent, text_answer)
-    tts_instructions = tts_result.final_output
-
-    async_openai = AsyncOpenAI(api_key=st.session_state.openai_api_key)
-    audio_response = await async_openai.audio.speech.create(
-        model="gpt-4o-mini-tts",
-        voice=st.session_state.selected_voice,
-        input=text_answer,
-        instructions=tts_instructions,
-        response_format="mp3"
-    )
+    cached = None
+    if fast_answer is None:
+        # CPU-bound embedding and the blocking index calls run on worker threads so the
+        # shared loop keeps streaming other sessions' answers meanwhile
+        with span("embed"):
+            query_embedding = await asyncio.to_thread(lambda: list(embedding_model.embed([search_query]))[0])
+
+        # follow-ups depend on the conversation, so they are neither served from nor stored in the cache
+        cached = None if follow_up else answer_cache.get(session["index_version"], language, query, query_embedding)
+        cache_event("answer", cached is not None)
+        # the cached text is shared by every session; the clip must match this session's voice, format and instructions
+        cached_path = cached and audio_cache.get(audio_key(cached["text"], voice, TTS_MODEL, instructions, response_format),
+                                                 response_format)
+        if cached_path:
+            return {"text": cached["text"], "audio": cached_path,
+                    "sources": cached["sources"], "ttft": time.perf_counter() - started, "cached": True}
+
+    # answered before but not yet spoken this way: reuse the text and sources, synthesize only the speech
+    reused = cached["text"] if cached else None
+    if cached:
+        sources = list(cached["sources"])
+    if fast_answer is None and reused is None:
+        with span("retrieve") as s:
+            results = await asyncio.to_thread(
+                hybrid_search,
+                client,
+                "docs_embeddings",
+                session["index_version"],
+                search_query,
+                query_embedding,
+                k=session.get("retrieval_k", RETRIEVAL_TOP_K),
+                use_reranker=session.get("rerank", False)
+            )
+            s["hits"] = len(results)
+        if not results:
+            return None
+
+        blocks = []
+        for payload in results:
+            sources.append(payload.get("url", "Unknown URL"))
+            source = payload.get("url", "")
+            if payload.get("heading"):
+                source += f" ({payload['heading']})"
+            blocks.append(f"Source: {source}\n{payload.get('content','')}")
+
+        # the agent instructions and the history (append-only between turns) lead, so they form a
+        # reusable cached prefix; the per-question chunks and the question come last
+        context = assemble_text(history, blocks, f"User Question: {query}", reserve=COMPLETION_TOKEN_ESTIMATE)
+
+    async_openai = get_async_openai(session["openai_api_key"])
+    tts_limiter = get_rate_limiter(session["openai_api_key"], "audio/speech")
+
+    async def synthesize(text: str, sink: Optional[Callable[[bytes], None]] = None) -> bytes:
+        key = audio_key(text, voice, TTS_MODEL, instructions, response_format)
+        path = audio_cache.get(key, response_format)
+        cache_event("audio", path is not None)
+        if path:
+            with open(path, "rb") as f:
+                data = f.read()
+            if sink:
+                sink(data)
+            return data
+        with span("tts", chars=len(text), format=response_format) as s:
+            # same process-wide speech quota as streamlit_app.py; the SDK retries 429s itself
+            await asyncio.to_thread(tts_limiter.acquire, estimate_request_tokens({"input": text}))
+            chunks = []
+            # streamed, so a live clip can play this segment while it is still being synthesized
+            async with async_openai.audio.speech.with_streaming_response.create(
+                model=TTS_MODEL,
+                voice=voice,
+                input=text,
+                instructions=instructions,
+                response_format=response_format
+            ) as audio_response:
+                async for chunk in audio_response.iter_bytes(AUDIO_CHUNK_BYTES):
+                    chunks.append(chunk)
+                    if sink:
+                        sink(chunk)
+            data = b"".join(chunks)
+            s["bytes_in"] = len(data)
+        await asyncio.to_thread(audio_cache.put, key, data, response_format)
+        return data
+
+    # one live clip per answer when the audio server can stream this format, else clip-by-clip playback
+    live_clip = open_live_clip(response_format) if on_audio else None
+    pipeline = AsyncSpeechPipeline(synthesize, response_format=response_format,
+                                   stream=SegmentedStream(live_clip) if live_clip else None)
+    player = None
+    if live_clip:
+        on_audio(live_url(live_clip))
+    elif on_audio:
+        player = asyncio.create_task(pipeline.play(on_audio))
+    ttft = None
+
+    def handle_token(delta: str):
+        nonlocal ttft
+        if ttft is None:
+            ttft = time.perf_counter() - started
+        pipeline.feed(delta)
+        if on_token:
+            on_token(delta)
 
-    audio_path = os.path.join(tempfile.gettempdir(), f"voice_{uuid.uuid4()}.mp3")
-    with open(audio_path, "wb") as f:
-        f.write(audio_response.content)
+    try:
+        if fast_answer is not None or reused is not None:
+            text_answer = fast_answer if fast_answer is not None else reused
+            handle_token(text_answer)
+        else:
+            text_answer = await stream_agent_answer(session["processor_agent"], context, handle_token)
+        pipeline.finish()
+        if player:
+            await player
+        key = audio_key(text_answer, voice, TTS_MODEL, instructions, response_format)
+        full_audio = await pipeline.audio()
+        with span("audio_write", bytes_out=len(full_audio)):
+            audio_path = await asyncio.to_thread(audio_cache.put, key, full_audio, response_format)
+    except BaseException:
+        pipeline.cancel()
+        if player:
+            player.cancel()
+        raise
+
+    sources = list(dict.fromkeys(sources))
+    if fast_answer is None and reused is None and not follow_up:
+        answer_cache.put(session["index_version"], language, query, {"text": text_answer, "sources": sources},
+                         query_embedding)
+    return {"text": text_answer, "audio": audio_path, "sources": sources, "ttft": ttft, "cached": reused is not None,
+            "fast_path": fast_answer is not None}
+
+
+def run_answer(query: str, on_token: Callable[[str], None], on_audio: Callable[[Union[bytes, str]], None],
+               history: str = "", search_query: str = "") -> Optional[Dict]:
+    """Run answer_with_voice on the shared loop, applying its callbacks on this script thread.
+
+    Streamlit elements can only be updated from the session's own script thread, so the
+    loop thread queues token and audio events and this thread drains them.
+    """
+    events = queue.Queue()
+    future = run_async(answer_with_voice(
+        query,
+        dict(st.session_state),
+        on_token=lambda delta: events.put((on_token, delta)),
+        on_audio=lambda data: events.put((on_audio, data)),
+        history=history,
+        search_query=search_query
+    ))
+    while True:
+        try:
+            handler, value = events.get(timeout=0.05)
+        except queue.Empty:
+            if future.done():
+                return future.result()
+            continue
+        handler(value)
 
-    return text_answer, audio_path, list(dict.fromkeys(sources))
+
+# -----------------------------
+# Background ingestion
+# -----------------------------
+def ingest_key(backend: str, qdrant_url: str, doc_url: str) -> str:
+    """Jobs for the same docs into the same index are deduplicated on this."""
+    return f"{backend}|{qdrant_url if backend == 'qdrant' else ''}|{doc_url.strip().rstrip('/')}"
+
+
+def run_ingest(settings: Dict, update: Callable[..., None]) -> Dict:
+    """Ingest job body (runs on the ingest_jobs worker pool, not the script thread): crawl, index, catalog."""
+    with trace("ingest", url=settings["doc_url"], limit=settings["crawl_limit"]) as ingest_trace:
+        with span("qdrant_setup"):
+            client, embedding_model = setup_qdrant_collection(settings["qdrant_url"], settings["qdrant_api_key"],
+                                                              backend=settings["index_backend"])
+        writer = IndexWriter(client, embedding_model, "docs_embeddings", source_root=settings["doc_url"])
+        catalog = CatalogBuilder()
+
+        def on_page(n: int, page: Dict):
+            update(state=EMBEDDING, pages=n, chunks=len(writer.hashes),
+                   last_page=page["metadata"].get("title") or page["url"])
+
+        # pages are chunked, embedded and upserted as the crawl delivers them
+        stats = ingest_stream(stream_crawl(settings["firecrawl_api_key"], settings["doc_url"], settings["crawl_limit"]),
+                              writer, catalog, on_page)
+        catalog = catalog.build()
+    if stats["version"]:
+        voice_answer_cache().set_version(settings["doc_url"], stats["version"])
+    update(pages=stats["pages"], chunks=stats["chunks"])
+    return {**stats, "products": len(catalog.products), "timings": format_breakdown(ingest_trace), "output": catalog}
+
+
+def apply_ingest_job(job: Dict):
+    """Switch this session to a finished job's index; until then it keeps answering from the previous one."""
+    result = job["result"] or {}
+    if result.get("version"):
+        st.session_state.index_version = result["version"]
+    catalog = get_ingest_jobs().output(job["id"])
+    if catalog is not None:
+        st.session_state.catalog = catalog
+    st.session_state.processor_agent = setup_agents(st.session_state.openai_api_key)
+    st.session_state.setup_complete = True
+    st.session_state.applied_job = job["id"]
+
+
+def ingest_progress():
+    job = get_ingest_jobs().get(st.session_state.ingest_job)
+    if job is None or job["state"] not in ACTIVE_STATES:
+        st.rerun(scope="app")  # finished: let the full run apply it and stop polling
+    limit = max(job["params"]["crawl_limit"], job["pages"], 1)
+    labels = {QUEUED: "Queued...", CRAWLING: "Crawling documentation...", EMBEDDING: "Crawling and indexing..."}
+    with st.status(labels[job["state"]], expanded=True, state="running"):
+        text = f"Indexed {job['pages']}/{job['params']['crawl_limit']} pages, {job['chunks']} chunks"
+        if job.get("last_page"):
+            text += f": {job['last_page']}"
+        st.progress(min(job["pages"] / limit, 1.0), text=text)
+        if st.session_state.setup_complete:
+            st.caption("Chat keeps answering from the current index until this one is ready.")
+
+
+def ingest_panel():
+    """Status of this session's ingest job, polled in a fragment so the rest of the app stays usable"""
+    job = get_ingest_jobs().get(st.session_state.ingest_job)
+    if job is None:
+        st.session_state.ingest_job = None
+        return
+    if job["state"] in ACTIVE_STATES:
+        st.fragment(run_every=INGEST_POLL_SECONDS)(ingest_progress)()
+    elif job["state"] == FAILED:
+        st.error(f"❌ Setup failed: {job['errors'][-1] if job['errors'] else 'unknown error'}")
+    else:
+        if st.session_state.applied_job != job["id"]:
+            apply_ingest_job(job)
+        result = job["result"] or {}
+        with st.status("✅ System Ready!", state="complete"):
+            st.write(f"Catalog: {result.get('products', 0)} products")
+            st.write(f"Indexed {result.get('chunks', 0)} chunks from {result.get('pages', 0)} pages in "
+                     f"{result.get('seconds', 0.0):.1f}s ({result.get('pages_per_sec', 0.0):.1f} pages/sec): "
+                     f"{result.get('upserted', 0)} updated, {result.get('unchanged', 0)} unchanged, {result.get('deleted', 0)} removed")
+            if st.session_state.show_timings and result.get("timings"):
+                st.write(f"🧭 {result['timings']}")
 
 
 # -----------------------------
@@ -240,8 +1010,12 @@ def sidebar():
     with st.sidebar:
         st.title("🔑 Configuration")
 
-        st.session_state.qdrant_url = st.text_input("Qdrant URL", value=st.session_state.qdrant_url, type="password")
-        st.session_state.qdrant_api_key = st.text_input("Qdrant API Key", value=st.session_state.qdrant_api_key, type="password")
+        backends = {"qdrant": "Qdrant server", "local": "Embedded (this machine, no server)"}
+        st.session_state.index_backend = st.radio("Vector Index", list(backends), format_func=backends.get,
+                                                  index=list(backends).index(st.session_state.index_backend))
+        if st.session_state.index_backend == "qdrant":
+            st.session_state.qdrant_url = st.text_input("Qdrant URL", value=st.session_state.qdrant_url, type="password")
+            st.session_state.qdrant_api_key = st.text_input("Qdrant API Key", value=st.session_state.qdrant_api_key, type="password")
         st.session_state.firecrawl_api_key = st.text_input("Firecrawl API Key", value=st.session_state.firecrawl_api_key, type="password")
         st.session_state.openai_api_key = st.text_input("OpenAI API Key", value=st.session_state.openai_api_key, type="password")
 
@@ -249,38 +1023,39 @@ def sidebar():
 
         voices = ["alloy", "ash", "ballad", "coral", "echo", "fable", "onyx", "nova", "sage", "shimmer", "verse"]
         st.session_state.selected_voice = st.selectbox("Select Voice", voices, index=voices.index(st.session_state.selected_voice))
-
-        st.session_state.crawl_limit = st.slider("Crawl Pages Limit", 1, 10, st.session_state.crawl_limit)
+        formats = ["mp3", "opus", "aac"]
+        st.session_state.tts_format = st.selectbox("Audio Format", formats, index=formats.index(st.session_state.tts_format),
+                                                   help="opus clips are about a quarter the size of mp3; mp3 and aac play while still being synthesized")
+
+        st.session_state.crawl_limit = st.slider("Crawl Pages Limit", 1, MAX_CRAWL_PAGES, st.session_state.crawl_limit)
+        st.session_state.retrieval_k = st.slider("Context Chunks (k)", 1, 8, st.session_state.retrieval_k)
+        st.session_state.rerank = st.toggle("Rerank with local cross-encoder", value=st.session_state.rerank)
+        st.session_state.show_timings = st.toggle("Show timing breakdown", value=st.session_state.show_timings)
+        if st.session_state.show_timings:
+            with st.expander("🚀 Startup profile"):
+                st.code(format_startup_report(), language=None)
 
         if st.button("Initialize System", type="primary"):
             try:
-                with st.status("Initializing...", expanded=True) as status:
-                    st.write("Connecting Qdrant...")
-                    client, embedding_model = setup_qdrant_collection(st.session_state.qdrant_url, st.session_state.qdrant_api_key)
-                    st.session_state.client = client
-                    st.session_state.embedding_model = embedding_model
-
-                    st.write("Crawling documentation...")
-                    pages = crawl_documentation(st.session_state.firecrawl_api_key, st.session_state.doc_url, st.session_state.crawl_limit)
-
-                    st.write("Saving embeddings...")
-                    store_embeddings(client, embedding_model, pages, "docs_embeddings")
-
-                    st.write("Setting up AI agents...")
-                    processor, tts = setup_agents(st.session_state.openai_api_key)
-                    st.session_state.processor_agent = processor
-                    st.session_state.tts_agent = tts
-
-                    st.session_state.setup_complete = True
-                    status.update(label="✅ System Ready!", state="complete")
-
+                settings = {k: st.session_state[k] for k in ("index_backend", "qdrant_url", "qdrant_api_key",
+                                                             "firecrawl_api_key", "doc_url", "crawl_limit")}
+                # a second click (or another session) for the same docs joins the running job
+                job = get_ingest_jobs().submit(
+                    ingest_key(settings["index_backend"], settings["qdrant_url"], settings["doc_url"]),
+                    {"doc_url": settings["doc_url"], "index_backend": settings["index_backend"], "crawl_limit": settings["crawl_limit"]},
+                    partial(run_ingest, settings)
+                )
+                st.session_state.ingest_job = job["id"]
             except Exception as e:
-                st.session_state.setup_complete = False
                 st.error(f"❌ Setup failed: {e}")
 
+        if st.session_state.ingest_job:
+            ingest_panel()
+
         st.markdown("---")
         if st.button("🧹 Clear Chat"):
-            st.session_state.chat = []
+            st.session_state.memory.clear()
+            st.session_state.history_shown = RENDER_WINDOW
             st.rerun()
 
 
@@ -289,48 +1064,86 @@ def sidebar():
 # -----------------------------
 def main():
     st.set_page_config(page_title="Shikhar Traders Voice Agent", page_icon="🎙️", layout="wide")
+    start_metrics_server()
+    start_audio_server()
+    get_faq_bundle("voice")  # answers pre-computed by faq_batch.py, loaded once per process
+    prewarm_embedding_model()  # MODEL_PREWARM=1: in the background, the page doesn't wait for it
     init_session_state()
     apply_glass_ui()
     sidebar()
 
     st.title("🎙️ Shikhar Traders Voice Agent")
     st.caption("ChatGPT-style support + voice replies")
+    milestone("first_render")
 
     if not st.session_state.setup_complete:
         st.info("👈 Add keys + docs URL and click Initialize System.")
         return
 
-    # Chat history
-    for msg in st.session_state.chat:
+    # Chat history: only the latest messages (and their audio players) are rendered per rerun
+    memory = st.session_state.memory
+    visible, hidden = memory.page(st.session_state.history_shown)
+    if hidden and st.button(f"⬆️ Show {min(hidden, RENDER_WINDOW)} older messages"):
+        st.session_state.history_shown += RENDER_WINDOW
+        st.rerun()
+    for msg in visible:
         with st.chat_message(msg["role"]):
             st.markdown(msg["content"])
-            if msg.get("audio"):
-                st.audio(msg["audio"], format="audio/mp3")
+            # past clips are referenced by URL, so a rerun doesn't resend their audio
+            source = audio_source(msg.get("audio"))
+            if source:
+                st.audio(source, format=clip_mime(msg["audio"]))
+            if msg.get("ttft") is not None:
+                st.caption(f"⏱️ First token in {msg['ttft']:.2f}s")
+            if st.session_state.show_timings and msg.get("timings"):
+                st.caption(f"🧭 {msg['timings']}")
 
     user_query = st.chat_input("Ask something... (Example: UltraTech cement price?)")
 
     if user_query:
-        st.session_state.chat.append({"role": "user", "content": user_query})
+        # history and the follow-up's search query are taken before this question joins the memory
+        history = memory.prompt_text()
+        search_query = memory.contextual_query(user_query)
+        memory.add({"role": "user", "content": user_query})
+        with st.chat_message("user"):
+            st.markdown(user_query)
 
         with st.chat_message("assistant"):
+            answer_box = st.empty()
+            audio_slot = st.empty()
+            streamed = []
+
+            def show_token(delta: str):
+                streamed.append(delta)
+                answer_box.markdown("".join(streamed) + " ▌")
+
             with st.spinner("Thinking..."):
-                text_answer, audio_path, sources = asyncio.run(answer_with_voice(user_query))
+                st.session_state.audio_turn += 1
+                player = segment_player(audio_slot, mime_type(st.session_state.tts_format), st.session_state.audio_turn)
+                result = run_answer(user_query, on_token=show_token, on_audio=player,
+                                    history=history, search_query=search_query)
 
-            if not text_answer:
+            if not result:
                 text_answer = "Sorry, I couldn't find that in the documentation. Please try again or re-initialize the system."
-                st.markdown(text_answer)
-                st.session_state.chat.append({"role": "assistant", "content": text_answer})
+                answer_box.markdown(text_answer)
+                memory.add({"role": "assistant", "content": text_answer, "memory": False})
             else:
-                st.markdown(text_answer)
-                st.audio(audio_path, format="audio/mp3")
-
-                st.markdown("**Sources:**")
-                for s in sources:
-                    st.markdown(f"- {s}")
-
-                st.session_state.chat.append({"role": "assistant", "content": text_answer, "audio": audio_path})
-
-        st.rerun()
+                answer_box.markdown(result["text"])
+                if result["cached"] and audio_source(result["audio"]):
+                    audio_slot.audio(audio_source(result["audio"]), format=clip_mime(result["audio"]), autoplay=True)
+                if result["ttft"] is not None:
+                    st.caption(f"⏱️ First token in {result['ttft']:.2f}s")
+                timings = format_breakdown(result["trace"])
+                if st.session_state.show_timings:
+                    st.caption(f"🧭 {timings}")
+
+                if result["sources"]:
+                    st.markdown("**Sources:**")
+                    for s in result["sources"]:
+                        st.markdown(f"- {s}")
+
+                memory.add({"role": "assistant", "content": result["text"],
+                            "audio": result["audio"], "ttft": result["ttft"], "timings": timings})
 
 
 if __name__ == "__main__":
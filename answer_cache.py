@@ -0,0 +1,166 @@
+import os
+import re
+import math
+import time
+import threading
+from collections import Counter, OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from retrieval import tokenize
+
+# -----------------------------
+# Semantic answer cache
+# -----------------------------
+ANSWER_CACHE_TTL = int(os.getenv("ANSWER_CACHE_TTL", str(24 * 3600)))
+ANSWER_CACHE_MAX_ENTRIES = int(os.getenv("ANSWER_CACHE_MAX_ENTRIES", "1000"))
+
+# thresholds for near-duplicate questions: sparse word/trigram vectors vs. dense model embeddings
+SPARSE_SIMILARITY = 0.85
+DENSE_SIMILARITY = 0.92
+
+NUMBER_RE = re.compile(r"\d+")
+
+
+def normalize_question(question: str) -> str:
+    return " ".join(re.sub(r"[^\w\sऀ-ॿ₹]", " ", (question or "").lower()).split())
+
+
+def text_vector(text: str) -> Dict[str, float]:
+    """Sparse word + character-trigram vector, for apps without an embedding model."""
+    features = Counter()
+    for token in tokenize(text):
+        features[token] += 1.0
+        padded = f" {token} "
+        for i in range(len(padded) - 2):
+            features["#" + padded[i:i + 3]] += 0.5
+    return dict(features)
+
+
+def _normalize(vector):
+    """Unit-length copy: a dict for sparse vectors, a float32 array for dense embeddings."""
+    if vector is None:
+        return None
+    if isinstance(vector, dict):
+        norm = math.sqrt(sum(v * v for v in vector.values())) or 1.0
+        return {k: v / norm for k, v in vector.items()}
+    array = np.asarray(vector, dtype=np.float32).ravel()
+    norm = float(np.linalg.norm(array))
+    return array / norm if norm else array
+
+
+def _sparse_cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(v * b.get(k, 0.0) for k, v in a.items())
+
+
+class AnswerCache:
+    """LRU + TTL cache keyed by (docs version, language, normalized question).
+
+    Lookups try the exact key first, then the nearest cached question with the same
+    docs version and language whose vector is above the similarity threshold.
+    Questions mentioning different numbers (10L vs 20L) never match each other.
+    Dense embeddings are scored with one matrix-vector product over all cached ones.
+    """
+
+    def __init__(self, max_entries: int = ANSWER_CACHE_MAX_ENTRIES, ttl_seconds: int = ANSWER_CACHE_TTL,
+                 similarity_threshold: float = SPARSE_SIMILARITY):
+        self.max_entries = max_entries
+        self.ttl_seconds = ttl_seconds
+        self.similarity_threshold = similarity_threshold
+        self._entries: "OrderedDict[Tuple[str, str, str], Dict]" = OrderedDict()
+        self._source_versions: Dict[str, str] = {}
+        self._dense: Optional[Tuple[List[Tuple[str, str, str]], np.ndarray]] = None  # (keys, unit rows), rebuilt after changes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.semantic_hits = 0
+        self.misses = 0
+
+    def get(self, docs_version: str, lang: str, question: str, vector=None) -> Optional[Any]:
+        key = (docs_version, lang, normalize_question(question))
+        numbers = NUMBER_RE.findall(key[2])
+        vector = _normalize(vector)
+        now = time.time()
+
+        with self._lock:
+            self._expire(now)
+            entry = self._entries.get(key)
+            if entry is None and vector is not None:
+                best = self._nearest(vector, docs_version, lang, numbers)
+                if best is not None:
+                    key, entry = best, self._entries[best]
+                    self.semantic_hits += 1
+
+            if entry is None:
+                self.misses += 1
+                return None
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return entry["value"]
+
+    def _nearest(self, vector, docs_version: str, lang: str, numbers: List[str]) -> Optional[Tuple[str, str, str]]:
+        """Key of the most similar entry above the threshold with this version, language and numbers."""
+        if isinstance(vector, dict):
+            scored = [(_sparse_cosine(vector, e["vector"]), k) for k, e in self._entries.items() if isinstance(e["vector"], dict)]
+        else:
+            keys, matrix = self._dense_index(len(vector))
+            scores = matrix @ vector
+            scored = [(float(scores[i]), keys[i]) for i in np.flatnonzero(scores >= self.similarity_threshold)]
+        for score, key in sorted(scored, key=lambda item: item[0], reverse=True):
+            if score < self.similarity_threshold:
+                break
+            if key[0] == docs_version and key[1] == lang and NUMBER_RE.findall(key[2]) == numbers:
+                return key
+        return None
+
+    def _dense_index(self, dim: int) -> Tuple[List[Tuple[str, str, str]], np.ndarray]:
+        if self._dense is None or self._dense[1].shape[1] != dim:
+            keys = [k for k, e in self._entries.items() if isinstance(e["vector"], np.ndarray) and len(e["vector"]) == dim]
+            matrix = np.stack([self._entries[k]["vector"] for k in keys]) if keys else np.zeros((0, dim), dtype=np.float32)
+            self._dense = (keys, matrix)
+        return self._dense
+
+    def put(self, docs_version: str, lang: str, question: str, value: Any, vector=None):
+        key = (docs_version, lang, normalize_question(question))
+        with self._lock:
+            self._entries[key] = {"value": value, "vector": _normalize(vector), "expires": time.time() + self.ttl_seconds}
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+            self._dense = None
+
+    def set_version(self, source: str, docs_version: str):
+        """Record the current docs version of a source; entries of its previous version are dropped."""
+        with self._lock:
+            previous = self._source_versions.get(source)
+            self._source_versions[source] = docs_version
+            if previous and previous != docs_version:
+                for key in [k for k in self._entries if k[0] == previous]:
+                    del self._entries[key]
+                self._dense = None
+
+    def _expire(self, now: float):
+        expired = [k for k, e in self._entries.items() if e["expires"] <= now]
+        for key in expired:
+            del self._entries[key]
+        if expired:
+            self._dense = None
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"entries": len(self._entries), "hits": self.hits,
+                    "semantic_hits": self.semantic_hits, "misses": self.misses}
+
+
+_caches: Dict[str, AnswerCache] = {}
+_caches_lock = threading.Lock()
+
+
+def get_answer_cache(name: str, **kwargs) -> AnswerCache:
+    """Process-wide cache shared by every Streamlit session."""
+    with _caches_lock:
+        if name not in _caches:
+            _caches[name] = AnswerCache(**kwargs)
+        return _caches[name]
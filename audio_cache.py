@@ -0,0 +1,102 @@
+import os
+import json
+import uuid
+import hashlib
+import threading
+from typing import Callable, Dict, Optional
+
+# -----------------------------
+# Content-addressed TTS audio cache
+# -----------------------------
+# Shared by both apps (and every session) through the same directory. Files are
+# named by hash(text, voice, model, instructions, format); mtime is the LRU clock.
+# By default the directory is inside the apps' static/ folder, so Streamlit's
+# static file serving can hand clips to the browser by URL (see audio_server).
+APP_STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+TTS_CACHE_DIR = os.getenv("TTS_CACHE_DIR", os.path.join(APP_STATIC_DIR, "tts_cache"))
+TTS_CACHE_MAX_MB = int(os.getenv("TTS_CACHE_MAX_MB", "200"))
+
+
+def audio_key(text: str, voice: str, model: str, instructions: str = "", response_format: str = "mp3") -> str:
+    raw = json.dumps([text, voice, model, instructions or "", response_format], ensure_ascii=False)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+class AudioCache:
+    def __init__(self, directory: str = TTS_CACHE_DIR, max_bytes: int = TTS_CACHE_MAX_MB * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._key_locks: Dict[str, Dict] = {}  # key -> {"lock", "users"}: one synthesis per key at a time
+
+    def path_for(self, key: str, response_format: str = "mp3") -> str:
+        return os.path.join(self.directory, f"{key}.{response_format}")
+
+    def get(self, key: str, response_format: str = "mp3") -> Optional[str]:
+        path = self.path_for(key, response_format)
+        try:
+            os.utime(path)  # mark as recently used
+        except FileNotFoundError:
+            return None
+        return path
+
+    def put(self, key: str, data: bytes, response_format: str = "mp3") -> str:
+        path = self.path_for(key, response_format)
+        tmp_path = f"{path}.{uuid.uuid4().hex}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)  # atomic, so readers never see a partial clip
+        self.evict()
+        return path
+
+    def get_or_create(self, key: str, synthesize: Callable[[], bytes], response_format: str = "mp3") -> str:
+        """Cached clip path; synthesize() runs at most once per key at a time in this process."""
+        path = self.get(key, response_format)
+        if path:
+            return path
+        with self._lock:
+            entry = self._key_locks.setdefault(key, {"lock": threading.Lock(), "users": 0})
+            entry["users"] += 1
+        try:
+            with entry["lock"]:
+                # whoever held the lock before may have just made it
+                path = self.get(key, response_format)
+                if not path:
+                    path = self.put(key, synthesize(), response_format)
+        finally:
+            # the lock is dropped with its last user, so a late arrival can't start a second synthesis
+            with self._lock:
+                entry["users"] -= 1
+                if not entry["users"]:
+                    del self._key_locks[key]
+        return path
+
+    def evict(self):
+        """Delete least recently used clips until the directory fits in max_bytes."""
+        files = []
+        for entry in os.scandir(self.directory):
+            if entry.is_file() and not entry.name.endswith(".tmp"):
+                stat = entry.stat()
+                files.append((stat.st_mtime, stat.st_size, entry.path))
+        total = sum(size for _, size, _ in files)
+        for _, size, path in sorted(files):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.remove(path)
+                total -= size
+            except FileNotFoundError:
+                pass
+
+
+_audio_cache: Optional[AudioCache] = None
+_audio_cache_lock = threading.Lock()
+
+
+def get_audio_cache() -> AudioCache:
+    global _audio_cache
+    with _audio_cache_lock:
+        if _audio_cache is None:
+            _audio_cache = AudioCache()
+        return _audio_cache
@@ -0,0 +1,332 @@
+import os
+import re
+import uuid
+import time
+import logging
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional
+
+from audio_cache import APP_STATIC_DIR, get_audio_cache
+
+# -----------------------------
+# Audio delivery
+# -----------------------------
+# st.audio(bytes_or_path) ships every clip through Streamlit again on each rerun,
+# so a chat's rerun cost grows with its length. The page instead references
+# finished clips by URL, so a rerun costs a few bytes per past clip:
+#   /app/static/tts_cache/<key>.<format>
+#       the default. The audio cache lives in static/ and Streamlit serves it
+#       itself (server.enableStaticServing in .streamlit/config.toml), same
+#       origin as the app, with HTTP Range support. Without static serving, under
+#       server.baseUrlPath, or with TTS_CACHE_DIR outside static/, the apps fall
+#       back to st.audio with the clip file.
+# Optionally this small HTTP server runs too, when AUDIO_PUBLIC_URL says how
+# browsers reach it (on Streamlit Cloud, in Docker or from another machine the
+# browser's localhost is not the app's). It serves:
+#   /audio/<key>.<format>  finished clips, cached as immutable (content-addressed),
+#                          with ETag and HTTP Range support for seeking.
+#   /live/<id>             an answer still being synthesized, sent with chunked
+#                          transfer encoding as the speech bytes arrive. The
+#                          browser starts playing before synthesis completes.
+# It listens on localhost only unless AUDIO_HOST says otherwise, and sends a CORS
+# header only when AUDIO_ALLOW_ORIGIN is set (<audio> playback doesn't need one).
+AUDIO_PORT = int(os.getenv("AUDIO_PORT", "8502"))
+AUDIO_HOST = os.getenv("AUDIO_HOST", "127.0.0.1")
+# e.g. http://localhost:8502 when browser and app share a machine, or the proxy URL in front of AUDIO_PORT
+AUDIO_PUBLIC_URL = os.getenv("AUDIO_PUBLIC_URL", "")
+AUDIO_ALLOW_ORIGIN = os.getenv("AUDIO_ALLOW_ORIGIN", "")
+STATIC_URL_PREFIX = "/app/static/"
+# TTS response_format: opus is ~1/4 the size of mp3 at similar quality
+TTS_FORMAT = os.getenv("TTS_FORMAT", "mp3")
+AUDIO_MIME_TYPES = {"mp3": "audio/mpeg", "opus": "audio/ogg", "aac": "audio/aac", "flac": "audio/flac", "wav": "audio/wav"}
+# frame-based formats whose clips can be appended into one playable stream
+STREAMABLE_FORMATS = ("mp3", "aac")
+AUDIO_CHUNK_BYTES = 16 * 1024
+LIVE_CLIP_TTL_SECONDS = 300
+# clips never closed (abandoned tab, crashed answer) are dropped after this long, and the oldest beyond the cap
+LIVE_CLIP_MAX_AGE_SECONDS = int(os.getenv("LIVE_CLIP_MAX_AGE_SECONDS", "900"))
+MAX_LIVE_CLIPS = int(os.getenv("MAX_LIVE_CLIPS", "200"))
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+CLIP_PATH_RE = re.compile(r"^/audio/([0-9a-f]{64})\.([a-z0-9]+)$")
+LIVE_PATH_RE = re.compile(r"^/live/([0-9a-f]{32})$")
+RANGE_RE = re.compile(r"^bytes=(\d*)-(\d*)$")
+
+
+class LiveClip:
+    """Audio still being synthesized: readers get the bytes so far, then wait for more."""
+
+    def __init__(self, response_format: str = TTS_FORMAT):
+        self.id = uuid.uuid4().hex
+        self.response_format = response_format
+        self.chunks: List[bytes] = []
+        self.done = False
+        self.error: Optional[str] = None
+        self.opened_at = time.monotonic()
+        self.closed_at = 0.0
+        self._cond = threading.Condition()
+
+    def write(self, data: bytes):
+        if data:
+            with self._cond:
+                self.chunks.append(data)
+                self._cond.notify_all()
+
+    def close(self, error: Optional[str] = None):
+        with self._cond:
+            self.done = True
+            self.error = error
+            self.closed_at = time.monotonic()
+            self._cond.notify_all()
+
+    def read(self, timeout: float = 60) -> Iterator[bytes]:
+        """Every chunk from the start, waiting for new ones until the clip is closed (or stalls for timeout)."""
+        index = 0
+        while True:
+            with self._cond:
+                if index >= len(self.chunks) and not self.done:
+                    self._cond.wait(timeout)
+                pending = self.chunks[index:]
+            if not pending:
+                return
+            index += len(pending)
+            yield from pending
+
+
+class SegmentedStream:
+    """One LiveClip fed by segments synthesized in parallel: each segment's bytes are passed
+    through as they arrive once every earlier segment has ended, and buffered until then."""
+
+    def __init__(self, clip: LiveClip):
+        self.clip = clip
+        self.parts: List[List[bytes]] = []
+        self.ended: List[bool] = []
+        self.head = 0
+        self.finished = False
+        self._lock = threading.Lock()
+
+    def add(self) -> int:
+        with self._lock:
+            self.parts.append([])
+            self.ended.append(False)
+            return len(self.parts) - 1
+
+    def write(self, index: int, data: bytes):
+        with self._lock:
+            if index == self.head:
+                self.clip.write(data)
+            else:
+                self.parts[index].append(data)
+
+    def end(self, index: int):
+        with self._lock:
+            self.ended[index] = True
+            while self.head < len(self.parts) and self.ended[self.head]:
+                self.head += 1
+                if self.head < len(self.parts):
+                    for data in self.parts[self.head]:
+                        self.clip.write(data)
+                    self.parts[self.head] = []
+            if self.finished and self.head == len(self.parts):
+                self.clip.close()
+
+    def finish(self, error: Optional[str] = None):
+        """No more segments; the clip closes once the last one has ended (or right away on error)."""
+        with self._lock:
+            self.finished = True
+            if error or self.head == len(self.parts):
+                self.clip.close(error)
+
+
+_live: Dict[str, LiveClip] = {}
+_live_lock = threading.Lock()
+
+
+def open_live_clip(response_format: str = TTS_FORMAT) -> Optional[LiveClip]:
+    """A new live clip, or None when it couldn't be played as one stream (server off, container format)."""
+    if _server is None or response_format not in STREAMABLE_FORMATS:
+        return None
+    clip = LiveClip(response_format)
+    now = time.monotonic()
+    with _live_lock:
+        for old in [c for c in _live.values() if (c.done and now - c.closed_at > LIVE_CLIP_TTL_SECONDS)
+                    or now - c.opened_at > LIVE_CLIP_MAX_AGE_SECONDS]:
+            _drop_live(old)
+        while len(_live) >= MAX_LIVE_CLIPS:
+            _drop_live(next(iter(_live.values())))  # the oldest
+        _live[clip.id] = clip
+    return clip
+
+
+def _drop_live(clip: LiveClip):
+    del _live[clip.id]
+    if not clip.done:
+        clip.close(error="expired")  # a reader still waiting on it ends its response
+
+
+def public_url() -> str:
+    return AUDIO_PUBLIC_URL.rstrip("/")
+
+
+def live_url(clip: LiveClip) -> str:
+    return f"{public_url()}/live/{clip.id}"
+
+
+def static_url(path: str) -> Optional[str]:
+    """Same-origin URL Streamlit serves a file under static/ at, or None when it doesn't serve it."""
+    from streamlit import config
+
+    if not config.get_option("server.enableStaticServing") or config.get_option("server.baseUrlPath"):
+        return None
+    relative = os.path.relpath(os.path.abspath(path), APP_STATIC_DIR)
+    if relative.startswith(os.pardir):
+        return None
+    return STATIC_URL_PREFIX + relative.replace(os.sep, "/")
+
+
+def audio_source(path: Optional[str]) -> Optional[str]:
+    """What to hand st.audio for a cached clip: its URL (the audio server's, else Streamlit's static
+    serving), or the file path when neither can serve it.
+
+    None when the clip has been evicted from the cache since.
+    """
+    if not path or not os.path.exists(path):
+        return None
+    if _server is not None:
+        return f"{public_url()}/audio/{os.path.basename(path)}"
+    return static_url(path) or path
+
+
+def mime_type(response_format: str) -> str:
+    return AUDIO_MIME_TYPES.get(response_format, "application/octet-stream")
+
+
+def clip_mime(path: str) -> str:
+    """MIME type of a cached clip file (the cache names files <key>.<format>)."""
+    return mime_type(os.path.splitext(path)[1].lstrip(".") or "mp3")
+
+
+# -----------------------------
+# HTTP server
+# -----------------------------
+class _AudioHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # keep-alive for range requests, chunked encoding for live clips
+
+    def log_message(self, *args):
+        pass
+
+    def do_HEAD(self):
+        self._serve(head=True)
+
+    def do_GET(self):
+        self._serve(head=False)
+
+    def _empty(self, status: int, **headers):
+        self.send_response(status)
+        for name, value in headers.items():
+            self.send_header(name.replace("_", "-"), value)
+        self.send_header("Content-Length", "0")
+        self.end_headers()
+
+    def _serve(self, head: bool):
+        path = self.path.split("?")[0]
+        clip = CLIP_PATH_RE.match(path)
+        if clip:
+            return self._serve_file(clip.group(1), clip.group(2), head)
+        live = LIVE_PATH_RE.match(path)
+        if live:
+            return self._serve_live(live.group(1), head)
+        self._empty(404)
+
+    def _serve_file(self, key: str, response_format: str, head: bool):
+        path = get_audio_cache().get(key, response_format)
+        if path is None:
+            return self._empty(404)
+        etag = f'"{key}"'
+        if self.headers.get("If-None-Match") == etag:
+            return self._empty(304, ETag=etag, Cache_Control=IMMUTABLE_CACHE_CONTROL)
+        size = os.path.getsize(path)
+        start, end, status = 0, size - 1, 200
+        requested = RANGE_RE.match(self.headers.get("Range", "").strip())
+        if requested and requested.group(0) != "bytes=-":
+            first, last = requested.groups()
+            if first:
+                start, end = int(first), min(int(last), size - 1) if last else size - 1
+            else:
+                start = max(0, size - int(last))  # suffix range: the last N bytes
+            if start >= size or start > end:
+                return self._empty(416, Content_Range=f"bytes */{size}")
+            status = 206
+
+        self.send_response(status)
+        self.send_header("Content-Type", mime_type(response_format))
+        self.send_header("Content-Length", str(end - start + 1))
+        self.send_header("Accept-Ranges", "bytes")
+        self.send_header("ETag", etag)
+        self.send_header("Cache-Control", IMMUTABLE_CACHE_CONTROL)
+        if AUDIO_ALLOW_ORIGIN:
+            self.send_header("Access-Control-Allow-Origin", AUDIO_ALLOW_ORIGIN)
+        if status == 206:
+            self.send_header("Content-Range", f"bytes {start}-{end}/{size}")
+        self.end_headers()
+        if head:
+            return
+        with open(path, "rb") as f:
+            f.seek(start)
+            remaining = end - start + 1
+            while remaining > 0:
+                data = f.read(min(AUDIO_CHUNK_BYTES, remaining))
+                if not data:
+                    break
+                self.wfile.write(data)
+                remaining -= len(data)
+
+    def _serve_live(self, clip_id: str, head: bool):
+        with _live_lock:
+            clip = _live.get(clip_id)
+        if clip is None:
+            return self._empty(404)
+        self.send_response(200)
+        self.send_header("Content-Type", mime_type(clip.response_format))
+        self.send_header("Cache-Control", "no-store")
+        if AUDIO_ALLOW_ORIGIN:
+            self.send_header("Access-Control-Allow-Origin", AUDIO_ALLOW_ORIGIN)
+        if head:
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+        try:
+            for data in clip.read():
+                self.wfile.write(f"{len(data):x}\r\n".encode("ascii") + data + b"\r\n")
+                self.wfile.flush()
+            self.wfile.write(b"0\r\n\r\n")
+        except (BrokenPipeError, ConnectionResetError):
+            pass  # the player went away (page rerun, seek)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_audio_server(port: int = AUDIO_PORT, host: str = AUDIO_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve clips and live answers once per process (safe to call on every Streamlit rerun).
+
+    Off (None) unless AUDIO_PUBLIC_URL is set; port 0 disables it too. Finished clips
+    are then still played by URL through Streamlit's static serving.
+    """
+    global _server, _server_failed
+    with _server_lock:
+        if _server is None and port and AUDIO_PUBLIC_URL and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _AudioHandler)
+            except OSError as e:
+                _server_failed = True
+                logging.getLogger(__name__).warning("Audio server not started on %s:%s: %s", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="audio", daemon=True).start()
+        return _server
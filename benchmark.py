@@ -0,0 +1,630 @@
+import os
+import sys
+import json
+import time
+import uuid
+import hashlib
+import argparse
+import resource
+import platform
+import tempfile
+import threading
+import subprocess
+import urllib.parse
+from concurrent.futures import ThreadPoolExecutor
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional
+
+# -----------------------------
+# Offline benchmark
+# -----------------------------
+# Runs both apps' code paths against local stand-ins (no API keys, no network):
+#   - OpenAI chat completions, responses (agents) and speech, with configurable
+#     first-byte latency and token rate
+#   - Firecrawl v2 crawl endpoints and the raw docs URL, serving the bundled markdown
+#     (prompt caching simulated, reported as "prompt_cache")
+#   - an in-memory Qdrant collection, or the embedded NumPy index (--index local)
+# The embedding model is the real fastembed model (from the local model cache).
+# The startup scenario times the voice app's cold start in fresh interpreters.
+#
+#   python benchmark.py --concurrency 4 --requests 40 --output bench.json
+#   python benchmark.py --output new.json --baseline old.json --max-regression 0.2
+DOCS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shikhartraders_support_docs_all_in_one.md")
+
+QUESTIONS = [
+    "What is the price of UltraTech Super cement?",
+    "Weather Pro 20L ka rate kya hai?",
+    "Iron ring minimum bulk order kitna hai?",
+    "What payment methods do you accept?",
+    "How long does delivery take?",
+    "Where is the store located?",
+    "Can I return waterproofing products?",
+    "सीमेंट का रेट क्या है?",
+]
+
+MOCK_ANSWER = (
+    "UltraTech Super cement is about ₹415 per bag. Weather Pro 20L costs around ₹2500. "
+    "For the final price and delivery please call 07355969446 or WhatsApp 09450805567. "
+    "Prices are approximate and may change."
+)
+
+# MPEG1 Layer III, 128 kbps, 44.1 kHz frame (417 bytes, ~26 ms); clips are kept a few
+# frames long so client-side playback pacing doesn't dominate the timings
+MP3_FRAME = b"\xff\xfb\x90\x00" + b"\x00" * 413
+MP3_FRAMES_PER_CLIP = 4
+
+# crawl status results per response; larger crawls are paginated with "next" like Firecrawl's
+CRAWL_STATUS_PAGE = 10
+
+# the mock reports cached_tokens the way OpenAI's prompt cache does: the longest
+# previously seen prompt prefix, in 128-token blocks, once it reaches 1024 tokens
+PROMPT_CACHE_MIN_TOKENS = 1024
+
+# the voice app's cold start, in a fresh interpreter per run: the script import, then each
+# deferred import in first-use order and the embedding model from the local model cache
+STARTUP_PROBE = """
+import json, time
+started = time.perf_counter()
+import ai_voice_agent_docs
+script_import = time.perf_counter() - started
+import resources
+from startup import lazy_import, startup_report
+for name in ("qdrant_client.http.models", "fastembed", "agents", "openai.types.responses", "firecrawl"):
+    lazy_import(name)
+try:
+    resources.load_embedding_model(resources.EMBEDDING_MODEL, local_files_only=True)
+except Exception:
+    pass
+print(json.dumps({"script_import": script_import, **startup_report()}))
+"""
+PROMPT_CACHE_BLOCK_TOKENS = 128
+
+
+# -----------------------------
+# Mock services
+# -----------------------------
+class MockConfig:
+    def __init__(self, latency_ms: float, token_rate: float, tts_latency_ms: float, crawl_pages: int,
+                 crawl_page_ms: float = 20):
+        self.latency = latency_ms / 1000
+        self.token_delay = 1 / token_rate if token_rate > 0 else 0.0
+        self.tts_latency = tts_latency_ms / 1000
+        self.crawl_pages = crawl_pages
+        self.crawl_page_delay = crawl_page_ms / 1000
+        self.crawl_started: Dict[str, float] = {}
+        self.counter = 0
+        self.lock = threading.Lock()
+        self.requests: Dict[str, int] = {}
+        self.prompt_blocks = set()
+        self.prompt_cache = {"requests": 0, "hits": 0, "prompt_tokens": 0, "cached_tokens": 0}
+
+    def next_ref(self, path: str) -> int:
+        with self.lock:
+            self.counter += 1
+            self.requests[path] = self.requests.get(path, 0) + 1
+            return self.counter
+
+    def cached_tokens(self, prompt: str, prompt_tokens: int) -> int:
+        """Simulated provider prompt cache: the longest prefix seen before, in whole blocks from the minimum size."""
+        block = PROMPT_CACHE_BLOCK_TOKENS * 4
+        digest, hashes = hashlib.sha256(), []
+        for start in range(0, len(prompt) - block + 1, block):
+            digest.update(prompt[start:start + block].encode("utf-8"))
+            hashes.append(digest.hexdigest())
+        with self.lock:
+            seen = next((i for i, h in enumerate(hashes) if h not in self.prompt_blocks), len(hashes))
+            self.prompt_blocks.update(hashes)
+            cached = seen * PROMPT_CACHE_BLOCK_TOKENS if seen * PROMPT_CACHE_BLOCK_TOKENS >= PROMPT_CACHE_MIN_TOKENS else 0
+            cached = min(cached, prompt_tokens)
+            stats = self.prompt_cache
+            stats["requests"] += 1
+            stats["hits"] += cached > 0
+            stats["prompt_tokens"] += prompt_tokens
+            stats["cached_tokens"] += cached
+        return cached
+
+    def prompt_cache_report(self) -> Dict:
+        stats = dict(self.prompt_cache)
+        stats["hit_rate"] = round(stats["hits"] / stats["requests"], 3) if stats["requests"] else 0.0
+        stats["cached_token_share"] = round(stats["cached_tokens"] / stats["prompt_tokens"], 3) if stats["prompt_tokens"] else 0.0
+        return stats
+
+
+def docs_pages(markdown: str) -> List[str]:
+    """The bundled docs split at top-level headings, one crawled page per section."""
+    pages, current = [], []
+    for line in markdown.splitlines():
+        if line.startswith("# ") and current:
+            pages.append("\n".join(current))
+            current = []
+        current.append(line)
+    if current:
+        pages.append("\n".join(current))
+    return pages
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    config: MockConfig = None
+    docs_text = ""
+
+    def log_message(self, *args):
+        pass
+
+    # --- plumbing
+    def _json(self, status: int, data: Dict, headers: Optional[Dict] = None):
+        body = json.dumps(data).encode("utf-8")
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        for k, v in (headers or {}).items():
+            self.send_header(k, v)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def _start_sse(self):
+        self.send_response(200)
+        self.send_header("Content-Type", "text/event-stream")
+        self.send_header("Transfer-Encoding", "chunked")
+        self.end_headers()
+
+    def _chunk(self, data: bytes):
+        self.wfile.write(f"{len(data):x}\r\n".encode() + data + b"\r\n")
+        self.wfile.flush()
+
+    def _sse(self, data: Dict, event: str = ""):
+        prefix = f"event: {event}\n" if event else ""
+        self._chunk(f"{prefix}data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+    def _answer_tokens(self, ref: int) -> List[str]:
+        words = f"{MOCK_ANSWER} (ref {ref})".split(" ")
+        return [w + (" " if i < len(words) - 1 else "") for i, w in enumerate(words)]
+
+    def _usage(self, body: Dict, completion: int) -> Dict:
+        text = json.dumps([body.get("instructions") or "", body.get("messages") or body.get("input") or ""], ensure_ascii=False)
+        prompt = len(text) // 4
+        return {"prompt": prompt, "completion": completion, "cached": self.config.cached_tokens(text, prompt)}
+
+    # --- routes
+    def do_GET(self):
+        if self.path.startswith("/docs/"):
+            etag = '"%s"' % hashlib.md5(self.docs_text.encode("utf-8")).hexdigest()
+            if self.headers.get("If-None-Match") == etag:
+                self.send_response(304)
+                self.send_header("ETag", etag)
+                self.send_header("Content-Length", "0")
+                self.end_headers()
+                return
+            body = self.docs_text.encode("utf-8")
+            self.send_response(200)
+            self.send_header("Content-Type", "text/plain; charset=utf-8")
+            self.send_header("ETag", etag)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+        elif self.path.startswith("/v2/crawl/"):
+            path, _, query = self.path.partition("?")
+            skip = int(urllib.parse.parse_qs(query).get("skip", ["0"])[0])
+            self._crawl_status(path.rsplit("/", 1)[-1], skip)
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_DELETE(self):
+        if self.path.startswith("/v2/crawl/"):
+            self._json(200, {"status": "cancelled"})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def do_POST(self):
+        body = json.loads(self.rfile.read(int(self.headers.get("Content-Length") or 0)) or b"{}")
+        path = self.path.split("?")[0]
+        ref = self.config.next_ref(path)
+        if path.endswith("/chat/completions"):
+            self._chat(body, ref)
+        elif path.endswith("/responses"):
+            self._responses(body, ref)
+        elif path.endswith("/audio/speech"):
+            time.sleep(self.config.tts_latency)
+            data = b"".join(MP3_FRAME for _ in range(MP3_FRAMES_PER_CLIP))
+            self.send_response(200)
+            self.send_header("Content-Type", "audio/mpeg")
+            self.send_header("Content-Length", str(len(data)))
+            self.end_headers()
+            self.wfile.write(data)
+        elif path == "/v2/crawl":
+            limit = int(body.get("limit") or self.config.crawl_pages)
+            job_id = f"{min(limit, self.config.crawl_pages)}-{uuid.uuid4().hex}"
+            self.config.crawl_started[job_id] = time.perf_counter()
+            self._json(200, {"success": True, "id": job_id,
+                             "url": body.get("url")})
+        else:
+            self._json(404, {"error": "not found"})
+
+    def _chat(self, body: Dict, ref: int):
+        time.sleep(self.config.latency)
+        tokens = self._answer_tokens(ref)
+        usage = self._usage(body, len(tokens))
+        usage = {"prompt_tokens": usage["prompt"], "completion_tokens": usage["completion"],
+                 "total_tokens": usage["prompt"] + usage["completion"], "prompt_tokens_details": {"cached_tokens": usage["cached"]}}
+        base = {"id": f"chatcmpl-{ref}", "created": int(time.time()), "model": body.get("model", "gpt-4o-mini")}
+        if not body.get("stream"):
+            self._json(200, {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "".join(tokens)}}]})
+            return
+        self._start_sse()
+        for token in tokens:
+            self._sse({**base, "object": "chat.completion.chunk",
+                       "choices": [{"index": 0, "delta": {"content": token}, "finish_reason": None}]})
+            time.sleep(self.config.token_delay)
+        self._sse({**base, "object": "chat.completion.chunk", "choices": [], "usage": usage})
+        self._chunk(b"data: [DONE]\n\n")
+        self._chunk(b"")
+
+    def _responses(self, body: Dict, ref: int):
+        time.sleep(self.config.latency)
+        tokens = self._answer_tokens(ref)
+        text = "".join(tokens)
+        usage = self._usage(body, len(tokens))
+        message = {"type": "message", "id": f"msg_{ref}", "status": "completed", "role": "assistant",
+                   "content": [{"type": "output_text", "text": text, "annotations": []}]}
+        response = {"id": f"resp_{ref}", "object": "response", "created_at": int(time.time()),
+                    "model": body.get("model", "gpt-4o"), "status": "completed", "output": [message],
+                    "parallel_tool_calls": True, "tool_choice": "auto", "tools": [],
+                    "usage": {"input_tokens": usage["prompt"], "output_tokens": usage["completion"],
+                              "total_tokens": usage["prompt"] + usage["completion"],
+                              "input_tokens_details": {"cached_tokens": usage["cached"]},
+                              "output_tokens_details": {"reasoning_tokens": 0}}}
+        if not body.get("stream"):
+            self._json(200, response)
+            return
+
+        seq = iter(range(1_000_000))
+        self._start_sse()
+        self._sse({"type": "response.created", "sequence_number": next(seq),
+                   "response": {**response, "status": "in_progress", "output": []}}, "response.created")
+        self._sse({"type": "response.output_item.added", "sequence_number": next(seq), "output_index": 0,
+                   "item": {**message, "status": "in_progress", "content": []}}, "response.output_item.added")
+        self._sse({"type": "response.content_part.added", "sequence_number": next(seq), "item_id": message["id"],
+                   "output_index": 0, "content_index": 0,
+                   "part": {"type": "output_text", "text": "", "annotations": []}}, "response.content_part.added")
+        for token in tokens:
+            self._sse({"type": "response.output_text.delta", "sequence_number": next(seq), "item_id": message["id"],
+                       "output_index": 0, "content_index": 0, "delta": token, "logprobs": []},
+                      "response.output_text.delta")
+            time.sleep(self.config.token_delay)
+        self._sse({"type": "response.completed", "sequence_number": next(seq), "response": response}, "response.completed")
+        self._chunk(b"")
+
+    def _crawl_status(self, job_id: str, skip: int):
+        """Pages complete one per crawl_page_ms; results are served CRAWL_STATUS_PAGE at a time from skip."""
+        count = int(job_id.split("-", 1)[0])
+        elapsed = time.perf_counter() - self.config.crawl_started.get(job_id, 0.0)
+        completed = count if self.config.crawl_page_delay <= 0 else min(count, int(elapsed / self.config.crawl_page_delay))
+        sections = docs_pages(self.docs_text)
+        data = []
+        for i in range(skip, min(completed, skip + CRAWL_STATUS_PAGE)):
+            content = sections[i % len(sections)]
+            if i >= len(sections):
+                content += f"\n\nCopy {i // len(sections)} of this page."
+            data.append({"markdown": content, "metadata": {
+                "sourceURL": f"https://docs.local/page-{i}", "title": content.splitlines()[0].lstrip("# "),
+                "description": "", "language": "en", "statusCode": 200}})
+        end = skip + len(data)
+        next_url = f"http://{self.headers.get('Host')}/v2/crawl/{job_id}?skip={end}" if end < completed else None
+        self._json(200, {"success": True, "status": "completed" if completed == count else "scraping",
+                         "total": count, "completed": completed, "creditsUsed": completed, "expiresAt": None,
+                         "next": next_url, "data": data})
+
+
+def start_mock_services(config: MockConfig) -> ThreadingHTTPServer:
+    with open(DOCS_FILE, encoding="utf-8") as f:
+        docs_text = f.read()
+    handler = type("Handler", (MockHandler,), {"config": config, "docs_text": docs_text})
+    server = ThreadingHTTPServer(("127.0.0.1", 0), handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="mock-services", daemon=True).start()
+    return server
+
+
+def point_app_at(server: ThreadingHTTPServer, cache_dir: str):
+    """Environment for the app modules; must run before they are imported."""
+    base = f"http://127.0.0.1:{server.server_address[1]}"
+    os.environ["OPENAI_BASE_URL"] = f"{base}/v1"
+    os.environ["OPENAI_API_KEY"] = "sk-benchmark"
+    os.environ["OPENAI_AGENTS_DISABLE_TRACING"] = "1"
+    os.environ["FIRECRAWL_API_URL"] = base
+    os.environ.setdefault("CRAWL_POLL_INTERVAL", "0.05")
+    os.environ["TTS_CACHE_DIR"] = cache_dir
+    os.environ["LOCAL_INDEX_DIR"] = os.path.join(cache_dir, "index")
+    os.environ["CHUNK_STORE_PATH"] = os.path.join(cache_dir, "chunks.sqlite3")
+    # the mocks have no quota; don't let the client-side limiter shape the numbers
+    for name in ("OPENAI_CHAT_RPM", "OPENAI_CHAT_TPM", "OPENAI_TTS_RPM", "OPENAI_TTS_TPM"):
+        os.environ.setdefault(name, "100000000")
+    return base
+
+
+# -----------------------------
+# Measurement
+# -----------------------------
+class Recorder:
+    def __init__(self):
+        self.samples: Dict[str, List[float]] = {}
+        self.errors: List[str] = []
+        self.lock = threading.Lock()
+
+    def add(self, stage: str, seconds: float):
+        with self.lock:
+            self.samples.setdefault(stage, []).append(seconds)
+
+    def timed(self, stage: str, fn: Callable, *args, **kwargs):
+        started = time.perf_counter()
+        result = fn(*args, **kwargs)
+        self.add(stage, time.perf_counter() - started)
+        return result
+
+    def error(self, e: Exception):
+        with self.lock:
+            self.errors.append(f"{type(e).__name__}: {e}")
+
+
+def percentile(sorted_values: List[float], pct: float) -> float:
+    """Nearest-rank percentile."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(pct / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(samples: List[float]) -> Dict:
+    values = sorted(samples)
+    return {
+        "count": len(values),
+        "mean_ms": round(1000 * sum(values) / len(values), 3) if values else 0.0,
+        "p50_ms": round(1000 * percentile(values, 50), 3),
+        "p95_ms": round(1000 * percentile(values, 95), 3),
+        "p99_ms": round(1000 * percentile(values, 99), 3),
+        "max_ms": round(1000 * values[-1], 3) if values else 0.0,
+    }
+
+
+def peak_rss_mb() -> float:
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return round(rss / (1024 * 1024) if sys.platform == "darwin" else rss / 1024, 1)  # bytes on macOS, KB on Linux
+
+
+def run_load(worker: Callable[[int, "Recorder"], None], requests: int, concurrency: int, recorder: Recorder,
+             first: int = 0) -> float:
+    def safe(i: int):
+        try:
+            worker(i, recorder)
+        except Exception as e:
+            recorder.error(e)
+
+    started = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        list(pool.map(safe, range(first, first + requests)))
+    return time.perf_counter() - started
+
+
+def run_measured(worker: Callable[[int, "Recorder"], None], args, recorder: Recorder) -> float:
+    """Warm-up requests (cold imports, first connections) are run first and not recorded."""
+    if args.warmup:
+        run_load(worker, args.warmup, args.concurrency, Recorder(), first=args.requests)
+    return run_load(worker, args.requests, args.concurrency, recorder)
+
+
+def question(i: int, cache_hits: bool) -> str:
+    text = QUESTIONS[i % len(QUESTIONS)]
+    # a distinct number keeps the answer caches from matching (they require equal numbers)
+    return text if cache_hits else f"{text} #{i}"
+
+
+# -----------------------------
+# Scenarios
+# -----------------------------
+def bench_simple_app(base: str, args) -> Dict:
+    """streamlit_app.py: docs store + BM25 retrieval + streamed chat + TTS."""
+    from retrieval import build_docs_index, retrieve_context
+    from docs_store import get_docs_store
+    from prompts import fits_prefix
+    import streamlit_app as app
+
+    recorder = Recorder()
+    docs_url = f"{base}/docs/shikhartraders_support_docs_all_in_one.md"
+    store = get_docs_store()
+    # load_docs() only accepts GitHub raw URLs, so the store is called directly
+    docs = recorder.timed("docs_fetch", store.get, docs_url, True)
+    recorder.timed("index_build", docs.derive, "bm25", build_docs_index)
+
+    def worker(i: int, recorder: Recorder):
+        started = time.perf_counter()
+        q = question(i, args.cache_hits)
+        current = recorder.timed("docs_revalidate", store.get, docs_url, True)
+        # same layout as the app: retrieved sections after the cached prefix
+        prefix = current.derive("prompt_prefix", app.prompt_prefix)
+        context = ""
+        if not current.derive("docs_in_prefix", fits_prefix):
+            context = recorder.timed("retrieve", retrieve_context, current.derive("bm25", build_docs_index), q, app.RETRIEVAL_TOP_K)
+
+        chat_started = time.perf_counter()
+        parts = []
+        for delta in app.openai_chat_stream("sk-benchmark", q, context, "English", prefix=prefix):
+            if not parts:
+                recorder.add("chat_ttft", time.perf_counter() - chat_started)
+            parts.append(delta)
+        recorder.add("chat_total", time.perf_counter() - chat_started)
+
+        if not args.no_tts:
+            recorder.timed("tts", app.openai_tts, "sk-benchmark", "".join(parts), "alloy")
+        recorder.add("request_total", time.perf_counter() - started)
+
+    wall = run_measured(worker, args, recorder)
+    return report(recorder, args.requests, wall, {"docs_not_modified": store.stats()["not_modified"]})
+
+
+def bench_voice_app(base: str, args) -> Dict:
+    """ai_voice_agent_docs.py: streaming Firecrawl crawl -> chunk/embed/index, then voiced agent answers."""
+    import ai_voice_agent_docs as app
+    from resources import run_async
+
+    recorder = Recorder()
+    backend = "local" if args.index == "local" else "qdrant"
+    client, embedding_model = recorder.timed("qdrant_setup", app.setup_qdrant_collection, ":memory:", "", backend=backend)
+
+    def ingest(first_page_stage: Optional[str] = None) -> Dict:
+        started = time.perf_counter()
+
+        def on_page(n: int, page: Dict):
+            if n == 1 and first_page_stage:
+                recorder.add(first_page_stage, time.perf_counter() - started)
+
+        writer = app.IndexWriter(client, embedding_model, "docs_embeddings", source_root=base)
+        return app.ingest_stream(app.stream_crawl("fc-benchmark", base, args.crawl_pages), writer, on_page=on_page)
+
+    stats = recorder.timed("index", ingest, "first_page_searchable")
+    recorder.timed("reindex_unchanged", ingest)
+
+    session = {
+        "index_backend": backend,
+        "qdrant_url": ":memory:",
+        "qdrant_api_key": "",
+        "openai_api_key": "sk-benchmark",
+        "selected_voice": "coral",
+        "index_version": stats["version"],
+        "processor_agent": app.setup_agents("sk-benchmark"),
+    }
+
+    def worker(i: int, recorder: Recorder):
+        started = time.perf_counter()
+        first_audio = []
+
+        def on_audio(data: bytes):
+            if not first_audio:
+                first_audio.append(time.perf_counter() - started)
+
+        result = run_async(app.answer_with_voice(question(i, args.cache_hits), session, on_audio=on_audio)).result()
+        recorder.add("request_total", time.perf_counter() - started)
+        if result and result["ttft"] is not None:  # None when the agent streamed no tokens
+            recorder.add("ttft", result["ttft"])
+        if first_audio:
+            recorder.add("first_audio", first_audio[0])
+
+    wall = run_measured(worker, args, recorder)
+    return report(recorder, args.requests, wall, {"pages": stats["pages"], "chunks": stats["chunks"],
+                                                  "pages_per_sec": round(stats["pages_per_sec"], 2)})
+
+
+def bench_startup(args) -> Dict:
+    """Cold start of ai_voice_agent_docs.py: script import, deferred imports and model load."""
+    recorder = Recorder()
+    started = time.perf_counter()
+    for _ in range(args.startup_runs):
+        try:
+            out = subprocess.run([sys.executable, "-c", STARTUP_PROBE], capture_output=True, text=True, check=True,
+                                 cwd=os.path.dirname(os.path.abspath(__file__)), timeout=300).stdout
+            profile = json.loads(out.strip().splitlines()[-1])
+        except Exception as e:
+            recorder.errors.append(str(e))
+            continue
+        recorder.add("script_import", profile["script_import"])
+        for stage in ("import", "load"):
+            for name, ms in profile[stage].items():
+                recorder.add(f"{stage}:{name}", ms / 1000)
+    return report(recorder, args.startup_runs, time.perf_counter() - started, {})
+
+
+def report(recorder: Recorder, requests: int, wall: float, extra: Dict) -> Dict:
+    return {
+        "requests": requests,
+        "errors": len(recorder.errors),
+        "error_samples": recorder.errors[:5],
+        "wall_seconds": round(wall, 3),
+        "throughput_rps": round(requests / wall, 3) if wall > 0 else 0.0,
+        "stages": {stage: summarize(values) for stage, values in recorder.samples.items()},
+        **extra,
+    }
+
+
+def git_revision() -> str:
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), timeout=5).stdout.strip()
+    except Exception:
+        return ""
+
+
+def regressions(results: Dict, baseline: Dict, max_regression: float) -> List[str]:
+    """Stages whose p95 grew by more than max_regression (fraction) against the baseline."""
+    found = []
+    for scenario, data in results["scenarios"].items():
+        old_stages = baseline.get("scenarios", {}).get(scenario, {}).get("stages", {})
+        for stage, summary in data["stages"].items():
+            old = old_stages.get(stage, {}).get("p95_ms")
+            if old and summary["p95_ms"] > old * (1 + max_regression):
+                found.append(f"{scenario}.{stage}: p95 {old:.1f}ms -> {summary['p95_ms']:.1f}ms")
+    return found
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Offline benchmark for the Shikhar Traders apps.")
+    parser.add_argument("--scenario", choices=["simple", "voice", "startup", "all"], default="all")
+    parser.add_argument("--requests", type=int, default=20, help="questions per scenario")
+    parser.add_argument("--concurrency", type=int, default=4, help="questions in flight at once")
+    parser.add_argument("--warmup", type=int, default=0, help="unrecorded questions before measuring (0 = include cold start)")
+    parser.add_argument("--latency-ms", type=float, default=300, help="mock chat/agent time to first token")
+    parser.add_argument("--token-rate", type=float, default=50, help="mock streamed tokens per second")
+    parser.add_argument("--tts-latency-ms", type=float, default=400, help="mock speech response time")
+    parser.add_argument("--crawl-pages", type=int, default=13, help="pages the mock crawl returns")
+    parser.add_argument("--crawl-page-ms", type=float, default=20, help="mock crawl time per page")
+    parser.add_argument("--index", choices=["memory", "local"], default="memory",
+                        help="voice scenario vector index: in-memory Qdrant or the embedded NumPy index")
+    parser.add_argument("--cache-hits", action="store_true", help="repeat questions verbatim so answer caches can hit")
+    parser.add_argument("--no-tts", action="store_true", help="skip speech in the simple app scenario")
+    parser.add_argument("--startup-runs", type=int, default=3, help="fresh interpreters in the startup scenario")
+    parser.add_argument("--output", help="write JSON results here")
+    parser.add_argument("--baseline", help="earlier JSON results to compare p95 latencies against")
+    parser.add_argument("--max-regression", type=float, default=0.2, help="allowed p95 growth vs. baseline (0.2 = 20%%)")
+    args = parser.parse_args()
+
+    config = MockConfig(args.latency_ms, args.token_rate, args.tts_latency_ms, args.crawl_pages, args.crawl_page_ms)
+    server = start_mock_services(config)
+    results = {
+        "revision": git_revision(),
+        "timestamp": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        "python": platform.python_version(),
+        "config": vars(args),
+        "scenarios": {},
+    }
+    # clips, the local index and the chunk store the scenarios write are removed afterwards
+    with tempfile.TemporaryDirectory(prefix="bench_tts_cache_") as cache_dir:
+        base = point_app_at(server, cache_dir)
+        try:
+            if args.scenario in ("simple", "all"):
+                results["scenarios"]["simple"] = bench_simple_app(base, args)
+            if args.scenario in ("voice", "all"):
+                results["scenarios"]["voice"] = bench_voice_app(base, args)
+            if args.scenario in ("startup", "all"):
+                results["scenarios"]["startup"] = bench_startup(args)
+        finally:
+            server.shutdown()
+    results["mock_requests"] = dict(config.requests)
+    results["prompt_cache"] = config.prompt_cache_report()
+    results["peak_rss_mb"] = peak_rss_mb()
+
+    text = json.dumps(results, indent=2, ensure_ascii=False)
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            f.write(text + "\n")
+    print(text)
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            found = regressions(results, json.load(f), args.max_regression)
+        for line in found:
+            print(f"REGRESSION {line}", file=sys.stderr)
+        if found:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
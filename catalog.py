@@ -0,0 +1,303 @@
+import re
+from typing import Dict, List, Optional, Set
+
+from retrieval import tokenize
+
+# -----------------------------
+# Structured catalog + deterministic fast path
+# -----------------------------
+# Product, pack, approx price and bulk rules are parsed from the docs' product
+# lists ("**UltraTech Super** — ₹415 approx"), contacts from the docs header.
+# Catalog.answer() matches price / contact questions in English, Hinglish and
+# Hindi and answers confident matches from a template (with the price
+# disclaimer), so they never reach the LLM. Anything it isn't sure about
+# returns None and goes down the normal retrieval + model path.
+PRODUCT_LINE_RE = re.compile(r"^\s*(?:\d+\)|[-*•])\s*\*\*(?P<name>[^*]+?)\*\*\s*[—–:-]+\s*₹\s*(?P<price>[\d,]+)\s*(?P<rest>.*)$")
+SECTION_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*$")
+PACK_RE = re.compile(r"^(?P<family>.+?)\s+(?P<size>\d+(?:\.\d+)?)\s*(?P<unit>litres?|liters?|ltr|l|kg)$", re.IGNORECASE)
+MIN_ORDER_RE = re.compile(r"minimum(?:\s+online\s+bulk)?\s+order[^0-9]*(\d+\+?\s*[a-z]+)", re.IGNORECASE)
+PHONE_RE = re.compile(r"(?<!\d)0\d{10}(?!\d)")
+EMAIL_RE = re.compile(r"[\w.+-]+@[\w-]+\.[\w.]+")
+MAPS_RE = re.compile(r"https://maps\.app\.goo\.gl/\S+")
+WEBSITE_RE = re.compile(r"website\W*(https?://[^\s)*]+)", re.IGNORECASE)
+ADDRESS_RE = re.compile(r"location:\**\s*([^\n]+)", re.IGNORECASE)
+
+DEVANAGARI_RE = re.compile(r"[ऀ-ॿ]")
+HINGLISH_WORDS = {"kya", "hai", "hain", "kitna", "kitne", "kitni", "batao", "bataiye", "chahiye", "kaise",
+                  "kab", "kahan", "milega", "milegi", "daam", "kimat", "keemat", "wala", "wali", "mein", "aur"}
+
+# Devanagari spellings of product words, folded onto the English tokens in product names
+PRODUCT_ALIASES = {
+    "अल्ट्राटेक": "ultratech", "सुपर": "super", "पेपर": "paper", "बैग": "bag", "वेदर": "weather", "प्लस": "plus",
+    "प्रो": "pro", "आयरन": "iron", "रिंग": "ring", "सीमेंट": "cement", "वाटरप्रूफिंग": "waterproofing",
+    "वॉटरप्रूफिंग": "waterproofing", "waterproof": "waterproofing",
+}
+CATEGORY_WORDS = {"cement", "waterproofing"}
+BRAND_WORDS = {"ultratech"}
+
+PRICE_WORDS = {"price", "cost", "much", "mrp", "kitna", "kitne", "kitni", "कितना", "कितने", "कितनी"}
+BULK_WORDS = {"minimum", "min", "bulk", "moq", "order", "rule", "quantity"}
+CONTACT_WORDS = {"contact", "phone", "number", "numbers", "mobile", "call", "whatsapp", "email", "mail", "address",
+                 "location", "located", "where", "kahan", "kaha", "store", "shop", "website", "site", "maps",
+                 "details", "कहाँ", "कहां", "पता", "नंबर", "संपर्क", "फोन", "वेबसाइट", "दुकान"}
+# words that don't change what a price / contact question asks for
+FILLER_WORDS = {"how", "all", "current", "today", "todays", "approx", "approximate", "per", "bag", "piece", "l",
+                "now", "sir", "ji", "bhai", "hello", "hi", "plz", "pls", "give", "share", "send", "know", "want",
+                "need", "latest", "list", "lagbhag", "लगभग", "बताइए", "बताओ", "बताएं", "hota", "hoga", "hay", "h",
+                "aapka", "aapki", "apna", "apni", "your", "our", "you", "us", "he", "हैं", "हो", "one", "ek", "एक", "s",
+                "aur", "also", "or", "ya", "wala", "wali", "वाला", "वाली"}
+# any other word ("uses", "timing", "return", ...) means the question asks for more than the template says
+MAX_UNMATCHED_TOKENS = 0
+
+LANGUAGE_CODES = {"English": "en", "Hinglish": "hinglish", "Hindi": "hi"}
+
+TEMPLATES = {
+    "en": {
+        "price": "**{name}** — approx ₹{price}{unit}.",
+        "family": "{family} approx prices:",
+        "item": "- {name}: ₹{price}{unit} approx",
+        "min_order": "Bulk order only; minimum order: {min_order}.",
+        "disclaimer": "⚠️ Prices are approximate and may change with market rate, stock and delivery location. "
+                      "For final price, stock and payment confirmation, {contact}.",
+        "contact_via": "call/WhatsApp {phones} or email {email}",
+        "contact_fallback": "please contact the store",
+        "contact_title": "Contact {name}:",
+        "unit": {"bag": " per bag", "piece": " per piece", "pack": ""},
+    },
+    "hinglish": {
+        "price": "**{name}** ka approx rate ₹{price}{unit} hai.",
+        "family": "{family} ke approx rates:",
+        "item": "- {name}: ₹{price}{unit} approx",
+        "min_order": "Sirf bulk order; minimum order: {min_order}.",
+        "disclaimer": "⚠️ Rates approx hain, market, stock aur delivery location ke hisaab se badal sakte hain. "
+                      "Final rate aur payment confirm karne ke liye {contact}.",
+        "contact_via": "call/WhatsApp karein: {phones} ya email: {email}",
+        "contact_fallback": "store se contact karein",
+        "contact_title": "{name} se contact karein:",
+        "unit": {"bag": " per bag", "piece": " per piece", "pack": ""},
+    },
+    "hi": {
+        "price": "**{name}** का लगभग रेट ₹{price}{unit} है।",
+        "family": "{family} के लगभग रेट:",
+        "item": "- {name}: ₹{price}{unit} लगभग",
+        "min_order": "केवल bulk order; न्यूनतम ऑर्डर: {min_order}।",
+        "disclaimer": "⚠️ सभी रेट लगभग हैं और बाज़ार, स्टॉक व डिलीवरी लोकेशन के अनुसार बदल सकते हैं। "
+                      "फाइनल रेट और पेमेंट कन्फर्म करने के लिए {contact}।",
+        "contact_via": "कॉल/WhatsApp करें: {phones} या ईमेल: {email}",
+        "contact_fallback": "दुकान से संपर्क करें",
+        "contact_title": "{name} से संपर्क करें:",
+        "unit": {"bag": " प्रति बैग", "piece": " प्रति पीस", "pack": ""},
+    },
+}
+CONTACT_LABELS = {
+    "en": {"phones": "📞 Call/WhatsApp", "email": "📧 Email", "address": "📍 Address", "maps": "🗺️ Google Maps", "website": "🌐 Website"},
+    "hinglish": {"phones": "📞 Call/WhatsApp", "email": "📧 Email", "address": "📍 Address", "maps": "🗺️ Google Maps", "website": "🌐 Website"},
+    "hi": {"phones": "📞 कॉल/WhatsApp", "email": "📧 ईमेल", "address": "📍 पता", "maps": "🗺️ Google Maps", "website": "🌐 वेबसाइट"},
+}
+
+
+def detect_language(text: str) -> str:
+    """"hi" for Devanagari, "hinglish" for romanized Hindi, otherwise "en"."""
+    if DEVANAGARI_RE.search(text):
+        return "hi"
+    words = set(re.findall(r"[a-z]+", text.lower()))
+    return "hinglish" if words & HINGLISH_WORDS else "en"
+
+
+def query_tokens(text: str) -> List[str]:
+    return [PRODUCT_ALIASES.get(t, t) for t in tokenize(text)]
+
+
+def _clean_heading(heading: str) -> str:
+    return re.sub(r"^[^\w]*(?:[A-Z]\)|\d+\))?\s*", "", heading).strip()
+
+
+def extract_products(text: str) -> List[Dict]:
+    """Products from "**Name** — ₹price ..." list lines, with the bulk rules of their section."""
+    products: List[Dict] = []
+    seen: Set[str] = set()
+    section, section_products = "", []
+
+    for line in (text or "").splitlines():
+        heading = SECTION_RE.match(line)
+        if heading:
+            section, section_products = _clean_heading(heading.group(2)), []
+            continue
+        m = PRODUCT_LINE_RE.match(line)
+        if m:
+            name = " ".join(m.group("name").split())
+            if name.lower() in seen:
+                continue
+            seen.add(name.lower())
+            rest = m.group("rest").lower()
+            pack = PACK_RE.match(name)
+            unit = "piece" if "piece" in rest else "pack" if pack else "bag" if "bag" in section.lower() else "pack"
+            product = {
+                "name": name,
+                "family": pack.group("family").strip() if pack else name,
+                "pack_size": pack.group("size") if pack else "",
+                "price": int(m.group("price").replace(",", "")),
+                "unit": unit,
+                "category": next((c for c in CATEGORY_WORDS if c in section.lower()), ""),
+                "bulk_only": False,
+                "min_order": "",
+            }
+            products.append(product)
+            section_products.append(product)
+            continue
+        lowered = line.lower()
+        if section_products and "bulk" in lowered and "only" in lowered:
+            for product in section_products:
+                product["bulk_only"] = True
+        min_order = MIN_ORDER_RE.search(line.replace("*", ""))
+        if section_products and min_order:
+            for product in section_products:
+                product["min_order"] = min_order.group(1).strip()
+    return products
+
+
+def extract_contacts(text: str) -> Dict:
+    text = text or ""
+    contacts: Dict = {"phones": list(dict.fromkeys(PHONE_RE.findall(text)))}
+    email = EMAIL_RE.search(text)
+    maps = MAPS_RE.search(text)
+    website = WEBSITE_RE.search(text.replace("*", ""))
+    address = next((a.strip() for a in ADDRESS_RE.findall(text.replace("*", "")) if "http" not in a), "")
+    contacts.update({"email": email.group(0) if email else "", "maps": maps.group(0) if maps else "",
+                     "website": website.group(1) if website else "", "address": address})
+    return contacts
+
+
+class Catalog:
+    def __init__(self, products: List[Dict], contacts: Dict, business_name: str = "Shikhar Traders"):
+        self.products = products
+        self.contacts = contacts
+        self.business_name = business_name
+        self.families: Dict[str, List[Dict]] = {}
+        for p in products:
+            self.families.setdefault(p["family"], []).append(p)
+        # tokens that identify each family, and which of them no other family shares
+        self.family_tokens = {f: set(query_tokens(f)) - BRAND_WORDS - CATEGORY_WORDS - {"bag"} for f in self.families}
+        counts: Dict[str, int] = {}
+        for tokens in self.family_tokens.values():
+            for t in tokens:
+                counts[t] = counts.get(t, 0) + 1
+        self.unique_tokens = {t for t, n in counts.items() if n == 1}
+
+    def match(self, question: str) -> Optional[Dict]:
+        """{"intent": "price" | "contact", "products": [...]} for a confident match, else None."""
+        tokens = query_tokens(question)
+        if not tokens:
+            return None
+        token_set = set(tokens)
+        used = set(FILLER_WORDS | PRICE_WORDS | BULK_WORDS | BRAND_WORDS)
+
+        families = []
+        for family, keys in self.family_tokens.items():
+            hit = keys & token_set
+            if hit and (hit == keys or hit & self.unique_tokens):
+                families.append(family)
+                used |= hit
+        categories = (token_set & CATEGORY_WORDS) - {self.families[f][0]["category"] for f in families}
+        used |= token_set & CATEGORY_WORDS
+
+        numbers = {t for t in token_set if t.replace(".", "", 1).isdigit()}
+        products = []
+        for family in families:
+            packs = [p for p in self.families[family] if p["pack_size"]]
+            chosen = [p for p in packs if p["pack_size"] in numbers]
+            used |= {p["pack_size"] for p in chosen}
+            products += chosen or self.families[family]
+        for category in categories:
+            products += [p for p in self.products if p["category"] == category]
+        if numbers - used:
+            return None  # a quantity or pack size the catalog doesn't list
+
+        if products:
+            intent = "price"
+        elif token_set & CONTACT_WORDS and self.contacts.get("phones"):
+            intent = "contact"
+            used |= CONTACT_WORDS
+        else:
+            return None
+        if len([t for t in tokens if t not in used]) > MAX_UNMATCHED_TOKENS:
+            return None
+        return {"intent": intent, "products": list({p["name"]: p for p in products}.values())}
+
+    def contact_via(self, language: str) -> str:
+        t = TEMPLATES[language]
+        if not self.contacts.get("phones"):
+            return t["contact_fallback"]
+        return t["contact_via"].format(phones=" / ".join(self.contacts["phones"]), email=self.contacts.get("email") or "-")
+
+    def render(self, matched: Dict, language: str) -> str:
+        language = language if language in TEMPLATES else "en"
+        t = TEMPLATES[language]
+        if matched["intent"] == "contact":
+            labels = CONTACT_LABELS[language]
+            lines = [t["contact_title"].format(name=self.business_name)]
+            for key in ("phones", "email", "address", "maps", "website"):
+                value = self.contacts.get(key)
+                if value:
+                    lines.append(f"{labels[key]}: {' / '.join(value) if isinstance(value, list) else value}")
+            return "\n".join(lines)
+
+        products = matched["products"]
+        if len(products) == 1:
+            p = products[0]
+            lines = [t["price"].format(name=p["name"], price=p["price"], unit=t["unit"][p["unit"]])]
+        else:
+            lines = []
+            for family in dict.fromkeys(p["family"] for p in products):
+                if len([p for p in products if p["family"] == family]) > 1:
+                    lines.append(t["family"].format(family=family))
+                lines += [t["item"].format(name=p["name"], price=p["price"], unit=t["unit"][p["unit"]])
+                          for p in products if p["family"] == family]
+        for min_order in dict.fromkeys(p["min_order"] for p in products if p["bulk_only"] and p["min_order"]):
+            lines.append(t["min_order"].format(min_order=min_order))
+        lines.append("")
+        lines.append(t["disclaimer"].format(contact=self.contact_via(language)))
+        return "\n".join(lines)
+
+    def answer(self, question: str, language: str = "") -> Optional[str]:
+        """Template answer for a confident catalog/contact match, else None (use the model)."""
+        matched = self.match(question)
+        if not matched:
+            return None
+        return self.render(matched, language or detect_language(question))
+
+
+def build_catalog(text: str, contacts: Optional[Dict] = None) -> Catalog:
+    """Catalog from docs markdown; contacts (e.g. the app's BUSINESS dict) override what the docs list."""
+    builder = CatalogBuilder(contacts)
+    builder.add(text)
+    return builder.build()
+
+
+class CatalogBuilder:
+    """Builds a Catalog page by page (streaming ingestion), keeping only what was extracted, not the text."""
+
+    def __init__(self, contacts: Optional[Dict] = None):
+        self.overrides = contacts or {}
+        self.products: List[Dict] = []
+        self.seen: Set[str] = set()
+        self.contacts: Dict = {"phones": [], "email": "", "maps": "", "website": "", "address": ""}
+
+    def add(self, text: str):
+        for product in extract_products(text):
+            if product["name"].lower() not in self.seen:
+                self.seen.add(product["name"].lower())
+                self.products.append(product)
+        found = extract_contacts(text)
+        self.contacts["phones"] = list(dict.fromkeys(self.contacts["phones"] + found["phones"]))
+        for key, value in found.items():
+            if key != "phones" and not self.contacts[key]:
+                self.contacts[key] = value
+
+    def build(self) -> Catalog:
+        contacts = dict(self.contacts)
+        for key, value in self.overrides.items():
+            if key in contacts and value:
+                contacts[key] = value
+        name = self.overrides.get("name") or "Shikhar Traders"
+        return Catalog(list(self.products), contacts, business_name=name)
@@ -0,0 +1,105 @@
+import os
+import json
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional
+
+# -----------------------------
+# Local chunk text store (lean vector payloads)
+# -----------------------------
+# With PAYLOAD_MODE=lean the voice app keeps only small filterable fields in
+# each vector point's payload (URL, source root, language, heading, content
+# hash). The chunk text and the rest of the page metadata live here, in one
+# SQLite file on the app's disk, keyed by (collection, point ID). A search then
+# transfers IDs and a few short strings, and the app reads the texts it needs
+# locally. Every process that answers from the collection must see the same
+# file; a chunk missing from it is re-embedded on the next ingest.
+CHUNK_STORE_PATH = os.getenv("CHUNK_STORE_PATH", ".chunk_store.sqlite3")
+
+# SQLite's default limit on bound parameters is 999 in older builds
+_MAX_PARAMS = 900
+
+
+class ChunkStore:
+    def __init__(self, path: str = CHUNK_STORE_PATH):
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        # one connection shared by the ingest and answering threads, serialized by the lock
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.execute("PRAGMA journal_mode=WAL")  # readers in other processes don't block ingestion
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS chunks (collection TEXT NOT NULL, id TEXT NOT NULL, "
+                "content_hash TEXT NOT NULL, content TEXT NOT NULL, metadata TEXT NOT NULL, "
+                "PRIMARY KEY (collection, id)) WITHOUT ROWID"
+            )
+
+    def put(self, collection: str, rows: List[Dict]):
+        """Store {"id", "content_hash", "content", "metadata"} rows, replacing older versions."""
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (collection, id, content_hash, content, metadata) VALUES (?, ?, ?, ?, ?)",
+                [(collection, r["id"], r["content_hash"], r["content"], json.dumps(r.get("metadata") or {}, ensure_ascii=False))
+                 for r in rows]
+            )
+
+    def get(self, collection: str, ids: Iterable[str]) -> Dict[str, Dict]:
+        """Point ID -> {"content_hash", "content", **metadata} for the IDs that are stored."""
+        found = {}
+        ids = list(ids)
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start:start + _MAX_PARAMS]
+                rows = self._conn.execute(
+                    f"SELECT id, content_hash, content, metadata FROM chunks WHERE collection = ? "
+                    f"AND id IN ({','.join('?' * len(batch))})", [collection, *batch]
+                ).fetchall()
+                for pid, digest, content, metadata in rows:
+                    found[pid] = {**json.loads(metadata), "content_hash": digest, "content": content}
+        return found
+
+    def hashes(self, collection: str, ids: Iterable[str]) -> Dict[str, str]:
+        """Point ID -> content hash of the stored text, without reading the texts."""
+        found = {}
+        ids = list(ids)
+        with self._lock:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start:start + _MAX_PARAMS]
+                found.update(self._conn.execute(
+                    f"SELECT id, content_hash FROM chunks WHERE collection = ? AND id IN ({','.join('?' * len(batch))})",
+                    [collection, *batch]
+                ).fetchall())
+        return found
+
+    def delete(self, collection: str, ids: Iterable[str]):
+        ids = list(ids)
+        with self._lock, self._conn:
+            for start in range(0, len(ids), _MAX_PARAMS):
+                batch = ids[start:start + _MAX_PARAMS]
+                self._conn.execute(f"DELETE FROM chunks WHERE collection = ? AND id IN ({','.join('?' * len(batch))})",
+                                   [collection, *batch])
+
+    def count(self, collection: str) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM chunks WHERE collection = ?", (collection,)).fetchone()[0]
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+_stores: Dict[str, ChunkStore] = {}
+_stores_lock = threading.Lock()
+
+
+def get_chunk_store(path: Optional[str] = None) -> ChunkStore:
+    """Process-wide store per file (default CHUNK_STORE_PATH), shared by every session."""
+    path = os.path.abspath(path or CHUNK_STORE_PATH)
+    with _stores_lock:
+        if path not in _stores:
+            _stores[path] = ChunkStore(path)
+        return _stores[path]
@@ -0,0 +1,178 @@
+import re
+from typing import List, Dict, Tuple
+
+# -----------------------------
+# Markdown heading-aware chunking
+# -----------------------------
+HEADING_RE = re.compile(r"^(#{1,6})\s+(.+?)\s*#*\s*$")
+TABLE_ROW_RE = re.compile(r"^\s*\|.*\|\s*$")
+TABLE_SEPARATOR_RE = re.compile(r"^\s*\|?\s*:?-{2,}:?\s*(\|\s*:?-{2,}:?\s*)*\|?\s*$")
+RULE_RE = re.compile(r"^\s*(-{3,}|\*{3,}|_{3,})\s*$")
+FENCE_RE = re.compile(r"^\s*(```|~~~)")
+TOKEN_RE = re.compile(r"\w{1,6}|[^\w\s]")
+
+MAX_CHUNK_TOKENS = 400   # fastembed's default model truncates at 512
+CHUNK_OVERLAP_TOKENS = 50
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap subword-ish token estimate (no tokenizer dependency)."""
+    return len(TOKEN_RE.findall(text or ""))
+
+
+def split_sections(markdown: str) -> List[Tuple[List[str], List[str]]]:
+    """Split markdown into (heading_path, body_lines) sections."""
+    sections = []
+    stack: List[Tuple[int, str]] = []
+    body: List[str] = []
+    in_fence = False
+
+    for line in (markdown or "").splitlines():
+        if FENCE_RE.match(line):
+            in_fence = not in_fence
+        m = None if in_fence else HEADING_RE.match(line)
+        if not m:
+            body.append(line)
+            continue
+
+        sections.append(([h for _, h in stack], body))
+        level = len(m.group(1))
+        while stack and stack[-1][0] >= level:
+            stack.pop()
+        stack.append((level, line.strip()))
+        body = []
+
+    sections.append(([h for _, h in stack], body))
+    return [(path, lines) for path, lines in sections if any(l.strip() for l in lines)]
+
+
+def split_blocks(lines: List[str]) -> List[str]:
+    """Group body lines into paragraphs / lists / tables / code blocks."""
+    blocks, current = [], []
+    in_fence = False
+    in_table = False
+
+    def flush():
+        if current and any(l.strip() for l in current):
+            blocks.append("\n".join(current).strip("\n"))
+        current.clear()
+
+    for line in lines:
+        if FENCE_RE.match(line):
+            if not in_fence:
+                flush()
+            current.append(line)
+            in_fence = not in_fence
+            if not in_fence:
+                flush()
+            continue
+        if in_fence:
+            current.append(line)
+            continue
+
+        is_row = bool(TABLE_ROW_RE.match(line))
+        if is_row != in_table:
+            flush()
+            in_table = is_row
+        if not line.strip() or RULE_RE.match(line):
+            flush()
+            continue
+        current.append(line)
+
+    flush()
+    return blocks
+
+
+def _split_oversized(block: str, max_tokens: int) -> List[str]:
+    lines = block.split("\n")
+    header = []
+    if len(lines) > 2 and TABLE_ROW_RE.match(lines[0]) and TABLE_SEPARATOR_RE.match(lines[1]):
+        header, lines = lines[:2], lines[2:]
+
+    pieces, current, size = [], list(header), estimate_tokens("\n".join(header))
+    for line in lines:
+        line_tokens = estimate_tokens(line)
+        if line_tokens > max_tokens:
+            words = line.split()
+            step = max(1, len(words) * max_tokens // (line_tokens + 1))
+            parts = [" ".join(words[i:i + step]) for i in range(0, len(words), step)]
+        else:
+            parts = [line]
+        for part in parts:
+            part_tokens = estimate_tokens(part)
+            if current[len(header):] and size + part_tokens > max_tokens:
+                pieces.append("\n".join(current))
+                current, size = list(header), estimate_tokens("\n".join(header))
+            current.append(part)
+            size += part_tokens
+    if current[len(header):]:
+        pieces.append("\n".join(current))
+    return pieces
+
+
+def _overlap_tail(blocks: List[str], overlap_tokens: int) -> List[str]:
+    if overlap_tokens <= 0:
+        return []
+    tail, size = [], 0
+    for line in reversed("\n".join(blocks).split("\n")):
+        size += estimate_tokens(line)
+        # split tables already repeat their header, so never carry rows over
+        if size > overlap_tokens or TABLE_ROW_RE.match(line):
+            break
+        tail.insert(0, line)
+    return ["\n".join(tail)] if tail else []
+
+
+def chunk_markdown(markdown: str, max_tokens: int = MAX_CHUNK_TOKENS,
+                   overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Dict]:
+    """Split one markdown page into heading-scoped chunks under a token cap."""
+    chunks = []
+    for path, lines in split_sections(markdown):
+        heading_text = "\n".join(path)
+        budget = max(50, max_tokens - estimate_tokens(heading_text))
+
+        blocks = []
+        for block in split_blocks(lines):
+            if estimate_tokens(block) > budget:
+                blocks.extend(_split_oversized(block, budget))
+            else:
+                blocks.append(block)
+
+        current, size = [], 0
+        for block in blocks:
+            block_tokens = estimate_tokens(block)
+            if current and size + block_tokens > budget:
+                chunks.append((path, current))
+                current = _overlap_tail(current, min(overlap_tokens, budget - block_tokens))
+                size = sum(estimate_tokens(b) for b in current)
+            current.append(block)
+            size += block_tokens
+        if current:
+            chunks.append((path, current))
+
+    result = []
+    for path, blocks in chunks:
+        text = "\n\n".join(["\n".join(path)] + blocks) if path else "\n\n".join(blocks)
+        result.append({"content": text.strip(), "heading_path": path})
+    return result
+
+
+def chunk_pages(pages: List[Dict], max_tokens: int = MAX_CHUNK_TOKENS,
+                overlap_tokens: int = CHUNK_OVERLAP_TOKENS) -> List[Dict]:
+    """Chunk crawled pages; each chunk keeps its parent URL, metadata and heading path."""
+    chunks = []
+    for page in pages:
+        if not (page.get("content") or "").strip():
+            continue
+        for i, chunk in enumerate(chunk_markdown(page["content"], max_tokens, overlap_tokens)):
+            chunks.append({
+                "content": chunk["content"],
+                "url": page["url"],
+                "heading_path": chunk["heading_path"],
+                "chunk_index": i,
+                "metadata": {
+                    **page.get("metadata", {}),
+                    "heading": " > ".join(chunk["heading_path"]),
+                }
+            })
+    return chunks
@@ -0,0 +1,143 @@
+import os
+import re
+from typing import Dict, List, Tuple
+
+from chunking import estimate_tokens
+from retrieval import tokenize
+from speech_pipeline import speakable
+
+# -----------------------------
+# Conversation memory
+# -----------------------------
+# Per-session chat history with two bounded views:
+#   - for the model: the most recent turns that fit HISTORY_TOKEN_BUDGET, plus a
+#     rolling summary (one short line per older turn, capped at
+#     SUMMARY_TOKEN_BUDGET), so follow-ups like "and the 20 litre one?" work
+#     without resending the whole session;
+#   - for the UI: at most MAX_STORED_MESSAGES kept, the latest RENDER_WINDOW
+#     rendered per rerun and older pages shown on demand.
+# The summary is extractive (first sentence of each turn), so it costs no model call.
+HISTORY_TOKEN_BUDGET = int(os.getenv("HISTORY_TOKEN_BUDGET", "800"))
+SUMMARY_TOKEN_BUDGET = int(os.getenv("SUMMARY_TOKEN_BUDGET", "300"))
+MAX_STORED_MESSAGES = int(os.getenv("MAX_STORED_MESSAGES", "200"))
+RENDER_WINDOW = int(os.getenv("RENDER_WINDOW", "20"))
+
+GIST_MAX_CHARS = 160
+# words that name no product or intent of their own: a question made only of these (plus numbers)
+# leans on the previous one ("10L?", "kitna?", "how much for 2?"); "Cement price?" or
+# "Delivery time?" stand alone
+REFERRING_WORDS = {
+    "price", "cost", "much", "many", "how", "which", "why", "when", "then", "one", "ones", "l", "kg", "bag", "piece",
+    "he", "she", "they", "them", "its", "these", "those", "same", "ok", "okay", "yes", "no", "also", "too",
+    "kitna", "kitne", "kitni", "wala", "wali", "wale", "ye", "yeh", "wo", "woh", "vo", "haan", "nahi", "bhi",
+    "कितना", "कितने", "कितनी", "वाला", "वाली", "वाले", "ये", "वो", "भी",
+}
+FOLLOW_UP_RE = re.compile(r"^\s*(and|also|what about|how about|aur|or|same|that|this|it|us|uska|iska|वो|और)\b", re.IGNORECASE)
+SENTENCE_RE = re.compile(r"(?<=[.!?।])\s+")
+QUANTITY_RE = re.compile(r"\d+(?:\.\d+)?\s*[^\W\d]*")
+
+ROLE_LABELS = {"user": "Customer", "assistant": "Agent"}
+
+
+def gist(message: Dict) -> str:
+    """One summary line for a turn: role + first sentence, markdown stripped."""
+    text = speakable(message.get("content", ""))
+    first = SENTENCE_RE.split(text, maxsplit=1)[0]
+    if len(first) > GIST_MAX_CHARS:
+        first = first[:GIST_MAX_CHARS].rsplit(" ", 1)[0] + "…"
+    return f"{ROLE_LABELS.get(message['role'], message['role'])}: {first}"
+
+
+class ConversationMemory:
+    def __init__(self, history_tokens: int = HISTORY_TOKEN_BUDGET, summary_tokens: int = SUMMARY_TOKEN_BUDGET,
+                 max_messages: int = MAX_STORED_MESSAGES):
+        self.history_tokens = history_tokens
+        self.summary_tokens = summary_tokens
+        self.max_messages = max_messages
+        self.messages: List[Dict] = []
+        self.summary_lines: List[str] = []
+        self.summarized = 0  # messages[:summarized] are only in the summary as far as the model is concerned
+
+    def add(self, message: Dict) -> Dict:
+        """Append a turn. Messages with "memory": False (greetings, notices) are shown but never prompted."""
+        if message["role"] == "user" and message.get("memory", True):
+            # the standalone question a chain of follow-ups is about
+            message.setdefault("topic", self.topic() if self.is_follow_up(message["content"]) else message["content"])
+        self.messages.append(message)
+        self._fold()
+        if len(self.messages) > self.max_messages:
+            dropped = len(self.messages) - self.max_messages
+            del self.messages[:dropped]
+            self.summarized = max(0, self.summarized - dropped)
+        return message
+
+    def clear(self):
+        self.messages = []
+        self.summary_lines = []
+        self.summarized = 0
+
+    def _fold(self):
+        """Move turns that no longer fit the history budget into the rolling summary."""
+        recent = self.messages[self.summarized:]
+        tokens = sum(estimate_tokens(m["content"]) for m in recent if m.get("memory", True))
+        while tokens > self.history_tokens and self.summarized < len(self.messages) - 1:
+            message = self.messages[self.summarized]
+            self.summarized += 1
+            if message.get("memory", True):
+                tokens -= estimate_tokens(message["content"])
+                self.summary_lines.append(gist(message))
+        while self.summary_lines and sum(estimate_tokens(l) for l in self.summary_lines) > self.summary_tokens:
+            self.summary_lines.pop(0)
+
+    def summary(self) -> str:
+        return "\n".join(self.summary_lines)
+
+    def recent(self) -> List[Dict]:
+        return [{"role": m["role"], "content": m["content"]} for m in self.messages[self.summarized:] if m.get("memory", True)]
+
+    def prompt_messages(self) -> List[Dict]:
+        """Chat-completions messages for the conversation so far (summary first, then recent turns)."""
+        messages = []
+        if self.summary_lines:
+            messages.append({"role": "system", "content": f"Summary of the earlier conversation:\n{self.summary()}"})
+        return messages + self.recent()
+
+    def prompt_text(self) -> str:
+        """The same history as plain text, for single-string prompts."""
+        parts = []
+        if self.summary_lines:
+            parts.append(f"Earlier in this conversation:\n{self.summary()}")
+        recent = self.recent()
+        if recent:
+            parts.append("Recent conversation:\n" + "\n".join(f"{ROLE_LABELS[m['role']]}: {m['content']}" for m in recent))
+        return "\n\n".join(parts)
+
+    def topic(self) -> str:
+        return next((m.get("topic", m["content"]) for m in reversed(self.messages)
+                     if m["role"] == "user" and m.get("memory", True)), "")
+
+    def is_follow_up(self, question: str) -> bool:
+        """Leans on the earlier topic: opens like a follow-up ("and ...", "uska ...") or names no product or intent."""
+        if not self.topic():
+            return False
+        if FOLLOW_UP_RE.match(question):
+            return True
+        return all(token.isdigit() or token in REFERRING_WORDS for token in tokenize(question))
+
+    def contextual_query(self, question: str) -> str:
+        """Search query for a follow-up: the topic question supplies the missing product.
+
+        "and the 20 litre one?" after "Weather Pro 10L price?" becomes "Weather Pro price? and the
+        20 litre one?" (the follow-up's own pack size or quantity replaces the earlier one).
+        """
+        if not self.is_follow_up(question):
+            return question
+        topic = self.topic()
+        if re.search(r"\d", question):
+            topic = " ".join(QUANTITY_RE.sub(" ", topic).split())
+        return f"{topic} {question}"
+
+    def page(self, shown: int) -> Tuple[List[Dict], int]:
+        """The latest `shown` messages to render, and how many older ones are hidden."""
+        shown = max(1, shown)
+        return self.messages[-shown:], max(0, len(self.messages) - shown)
@@ -0,0 +1,136 @@
+import os
+import time
+import hashlib
+import logging
+import threading
+from typing import Any, Callable, Dict, Optional
+
+import requests
+
+from tracing import span, cache_event
+
+# -----------------------------
+# Process-wide documentation store
+# -----------------------------
+# Every session shares one snapshot per docs URL. Snapshots are immutable; a
+# refresh (at most every DOCS_REFRESH_SECONDS) is a conditional GET, so
+# unchanged docs cost a 304 with no body. Sessions keep a reference to a
+# snapshot, and anything derived from the text (search index, ...) is built
+# once per version via DocsSnapshot.derive().
+DOCS_REFRESH_SECONDS = int(os.getenv("DOCS_REFRESH_SECONDS", "300"))
+DOCS_FETCH_TIMEOUT = 25
+
+logger = logging.getLogger(__name__)
+
+
+class DocsSnapshot:
+    def __init__(self, url: str, text: str, etag: str = "", last_modified: str = ""):
+        self.url = url
+        self.text = text
+        self.version = hashlib.sha256(text.encode("utf-8")).hexdigest()[:12]
+        self.etag = etag
+        self.last_modified = last_modified
+        self.checked_at = time.monotonic()
+        self._derived: Dict[str, Any] = {}
+        self._derive_lock = threading.Lock()
+
+    def derive(self, name: str, build: Callable[[str], Any]) -> Any:
+        """build(text) once per snapshot, shared by every session holding it."""
+        with self._derive_lock:
+            if name not in self._derived:
+                self._derived[name] = build(self.text)
+            return self._derived[name]
+
+
+class DocsStore:
+    def __init__(self, refresh_seconds: int = DOCS_REFRESH_SECONDS):
+        self.refresh_seconds = refresh_seconds
+        self.session = requests.Session()
+        self._docs: Dict[str, DocsSnapshot] = {}
+        self._url_locks: Dict[str, threading.Lock] = {}
+        self._subscribers: Dict[str, Callable[[DocsSnapshot, Optional[DocsSnapshot]], None]] = {}
+        self._lock = threading.Lock()
+        self.fetches = 0
+        self.not_modified = 0
+
+    def subscribe(self, name: str, callback: Callable[[DocsSnapshot, Optional[DocsSnapshot]], None]):
+        """callback(new, previous) on every version change; re-subscribing a name replaces it."""
+        with self._lock:
+            self._subscribers[name] = callback
+
+    def get(self, url: str, force: bool = False) -> DocsSnapshot:
+        """Current snapshot for url, revalidated with the server once refresh_seconds have passed."""
+        with self._lock:
+            current = self._docs.get(url)
+            url_lock = self._url_locks.setdefault(url, threading.Lock())
+        if current and not force and time.monotonic() - current.checked_at < self.refresh_seconds:
+            return current
+
+        # one revalidation per URL at a time; other sessions wait and reuse its result
+        with url_lock:
+            with self._lock:
+                current = self._docs.get(url)
+            if current and not force and time.monotonic() - current.checked_at < self.refresh_seconds:
+                return current
+            try:
+                return self._refresh(url, current)
+            except Exception as e:
+                if current is None:
+                    raise
+                logger.warning("Docs refresh failed for %s, serving version %s: %s", url, current.version, e)
+                current.checked_at = time.monotonic()
+                return current
+
+    def _refresh(self, url: str, current: Optional[DocsSnapshot]) -> DocsSnapshot:
+        headers = {}
+        if current and current.etag:
+            headers["If-None-Match"] = current.etag
+        if current and current.last_modified:
+            headers["If-Modified-Since"] = current.last_modified
+
+        with span("docs_fetch", conditional=bool(headers)) as s:
+            r = self.session.get(url, headers=headers, timeout=DOCS_FETCH_TIMEOUT)
+            s["status_code"] = r.status_code
+            s["bytes_in"] = len(r.content)
+        self.fetches += 1
+        cache_event("docs", r.status_code == 304)
+        if r.status_code == 304 and current:
+            self.not_modified += 1
+            current.checked_at = time.monotonic()
+            return current
+        if r.status_code != 200:
+            raise ValueError(f"Docs fetch failed (HTTP {r.status_code}).")
+
+        snapshot = DocsSnapshot(url, r.text.strip(), r.headers.get("ETag", ""), r.headers.get("Last-Modified", ""))
+        if current and snapshot.version == current.version:
+            # same content under new validators: keep the old snapshot and what was derived from it
+            current.etag, current.last_modified = snapshot.etag, snapshot.last_modified
+            current.checked_at = snapshot.checked_at
+            return current
+
+        with self._lock:
+            self._docs[url] = snapshot
+            subscribers = list(self._subscribers.values())
+        for callback in subscribers:
+            try:
+                callback(snapshot, current)
+            except Exception:
+                logger.exception("Docs version subscriber failed")
+        return snapshot
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"urls": len(self._docs), "fetches": self.fetches, "not_modified": self.not_modified,
+                    "versions": {url: d.version for url, d in self._docs.items()}}
+
+
+_docs_store: Optional[DocsStore] = None
+_docs_store_lock = threading.Lock()
+
+
+def get_docs_store() -> DocsStore:
+    global _docs_store
+    with _docs_store_lock:
+        if _docs_store is None:
+            _docs_store = DocsStore()
+        return _docs_store
@@ -0,0 +1,144 @@
+import os
+import sys
+import json
+import asyncio
+import hashlib
+import argparse
+from typing import Dict, List
+
+from audio_cache import get_audio_cache, audio_key
+from audio_server import TTS_FORMAT
+from catalog import LANGUAGE_CODES, detect_language
+from docs_store import get_docs_store
+from faq_bundle import FAQ_BUNDLE_DIR, FAQ_CONCURRENCY, FAQ_QUESTIONS_FILE, build_bundle, bundle_dir, load_questions
+from prompts import fits_prefix
+from resources import get_embedding_model, get_vector_client, run_async
+from retrieval import build_docs_index, retrieve_context
+
+# -----------------------------
+# Headless FAQ batch runner
+# -----------------------------
+# Answers the most common questions outside Streamlit with each app's own code
+# path and writes them to that app's FAQ bundle (faq_bundle.py), which the apps
+# serve without any API call:
+#   chat   streamlit_app.py: the Quick Actions and the questions file in every
+#          listed language; docs store + BM25/prefix, openai_chat, openai_tts
+#   voice  ai_voice_agent_docs.py: the questions file against an existing index;
+#          hybrid_search for the context, answer_with_voice for text and audio
+# Only entries whose retrieved context (or answering settings) changed since the
+# last run are recomputed. Keys come from OPENAI_API_KEY / QDRANT_API_KEY.
+#
+#   python faq_batch.py chat --docs-url https://raw.githubusercontent.com/.../docs.md
+#   python faq_batch.py voice --index-backend local --voice coral
+
+
+def digest(value) -> str:
+    return hashlib.sha256(json.dumps(value, ensure_ascii=False, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+
+
+def chat_bundle(args, api_key: str, questions: List[Dict]) -> Dict:
+    import streamlit_app as app
+
+    # the store directly, like the benchmark: load_docs() only accepts GitHub raw URLs
+    docs = get_docs_store().get(args.docs_url.strip(), force=True)
+    prefix = docs.derive("prompt_prefix", app.prompt_prefix)
+    docs_in_prefix = docs.derive("docs_in_prefix", fits_prefix)
+    catalog = docs.derive("catalog", app.docs_catalog)
+    voice = "" if args.no_audio else (args.voice or "alloy")
+    items = [(text, lang) for _, text in app.QUICK_ACTIONS for lang in app.LANGUAGES]
+    items += [(q["question"], lang) for q in questions for lang in q["langs"] or app.LANGUAGES]
+
+    async def retrieve(question: str, lang: str) -> Dict:
+        # same order as the app: catalog template, else retrieved sections (or the docs, if opted into the prefix)
+        template = catalog.answer(question, LANGUAGE_CODES[lang])
+        if template is not None:
+            return {"context": f"template:{template}", "template": template}
+        if docs_in_prefix:
+            return {"context": docs.text, "sections": ""}
+        sections = await asyncio.to_thread(retrieve_context, docs.derive("bm25", build_docs_index), question,
+                                           app.RETRIEVAL_TOP_K)
+        return {"context": sections, "sections": sections}
+
+    async def answer(question: str, lang: str, retrieved: Dict) -> Dict:
+        text = retrieved.get("template") or await asyncio.to_thread(
+            app.openai_chat, api_key, question, retrieved["sections"], lang, None, prefix)
+        audio = None
+        if voice:
+            await asyncio.to_thread(app.openai_tts, api_key, text, voice)
+            audio = get_audio_cache().get(audio_key(text, voice, app.TTS_MODEL, response_format=TTS_FORMAT), TTS_FORMAT)
+        return {"text": text, "sources": [docs.url], "audio": audio}
+
+    settings = {"model": app.CHAT_MODEL, "instructions": digest(app.prompt_prefix()), "tts_model": app.TTS_MODEL,
+                "voice": voice, "format": TTS_FORMAT if voice else ""}
+    return run_async(build_bundle(bundle_dir("chat", args.out), "chat", docs.version, items, retrieve, answer,
+                                  settings, args.concurrency)).result()
+
+
+def voice_bundle(args, api_key: str, questions: List[Dict]) -> Dict:
+    import ai_voice_agent_docs as app
+
+    client = get_vector_client(args.index_backend, args.qdrant_url, os.getenv("QDRANT_API_KEY", ""))
+    version = app.collection_version(client, "docs_embeddings")
+    embedding_model = get_embedding_model()
+    agent = app.setup_agents(api_key)
+    session = {
+        "index_backend": args.index_backend,
+        "qdrant_url": args.qdrant_url,
+        "qdrant_api_key": os.getenv("QDRANT_API_KEY", ""),
+        "openai_api_key": api_key,
+        "selected_voice": args.voice or "coral",
+        "tts_format": args.format,
+        "index_version": version,
+        "processor_agent": agent,
+        "faq_bundle": False,  # recompute, don't read back the bundle being rebuilt
+    }
+    # the voice app keys answers by the language it detects, not a setting
+    items = [(q["question"], detect_language(q["question"])) for q in questions]
+
+    async def retrieve(question: str, lang: str) -> Dict:
+        embedding = await asyncio.to_thread(lambda: list(embedding_model.embed([question]))[0])
+        results = await asyncio.to_thread(app.hybrid_search, client, "docs_embeddings", version, question, embedding,
+                                          k=app.RETRIEVAL_TOP_K)
+        return {"context": json.dumps([[r.get("url", ""), r.get("content", "")] for r in results], ensure_ascii=False)}
+
+    async def answer(question: str, lang: str, retrieved: Dict) -> Dict:
+        result = await app.answer_with_voice(question, session)
+        if result is None:
+            raise ValueError("Nothing relevant is indexed.")
+        return {"text": result["text"], "sources": result["sources"], "audio": result["audio"]}
+
+    settings = {"instructions": digest(agent.instructions), "tts_model": app.TTS_MODEL,
+                "tts_instructions": digest(app.TTS_INSTRUCTIONS), "voice": session["selected_voice"], "format": args.format}
+    return run_async(build_bundle(bundle_dir("voice", args.out), "voice", version, items, retrieve, answer,
+                                  settings, args.concurrency)).result()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Pre-compute FAQ answers and audio into an app's FAQ bundle.")
+    parser.add_argument("app", choices=["chat", "voice"], help="streamlit_app.py (chat) or ai_voice_agent_docs.py (voice)")
+    parser.add_argument("--questions", default=FAQ_QUESTIONS_FILE, help="JSON list of questions")
+    parser.add_argument("--out", default=FAQ_BUNDLE_DIR, help="bundle root (one subdirectory per app)")
+    parser.add_argument("--concurrency", type=int, default=FAQ_CONCURRENCY, help="questions in flight at once")
+    parser.add_argument("--voice", help="TTS voice (default: the app's default voice)")
+    parser.add_argument("--docs-url", help="chat: documentation RAW URL")
+    parser.add_argument("--no-audio", action="store_true", help="chat: answers only, no clips")
+    parser.add_argument("--index-backend", choices=["qdrant", "local"], default="qdrant", help="voice: index to answer from")
+    parser.add_argument("--qdrant-url", default=os.getenv("QDRANT_URL", ""), help="voice: Qdrant URL (qdrant backend)")
+    parser.add_argument("--format", default=TTS_FORMAT, help="voice: audio format")
+    args = parser.parse_args()
+
+    api_key = os.getenv("OPENAI_API_KEY", "").strip()
+    if not api_key:
+        parser.error("OPENAI_API_KEY is not set.")
+    if args.app == "chat" and not args.docs_url:
+        parser.error("chat needs --docs-url.")
+    questions = load_questions(args.questions)
+
+    stats = chat_bundle(args, api_key, questions) if args.app == "chat" else voice_bundle(args, api_key, questions)
+    print(json.dumps(stats, indent=2, ensure_ascii=False))
+    if stats["failed"]:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,208 @@
+import os
+import json
+import time
+import shutil
+import asyncio
+import hashlib
+import logging
+import threading
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+from answer_cache import normalize_question
+from audio_cache import get_audio_cache
+from tracing import trace
+
+# -----------------------------
+# Pre-computed FAQ bundle
+# -----------------------------
+# faq_batch.py answers the most common questions ahead of time with the apps'
+# own code paths and writes one bundle per app to FAQ_BUNDLE_DIR/<app>/:
+#   manifest.json          version, docs version, voice/format and the entries
+#                          (question, language, answer, sources, audio clip,
+#                          and the hash of the context the answer was made from)
+#   audio/<key>.<format>   the entries' clips, named like the shared audio cache
+# The apps load the manifest at startup (and again whenever it is rewritten) and
+# answer an exact question match for the same docs version from it: no model,
+# TTS or retrieval call. A rebuild after a docs change reuses every entry whose
+# retrieved context is unchanged and only asks the API for the rest.
+FAQ_BUNDLE_DIR = os.getenv("FAQ_BUNDLE_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_bundle"))
+FAQ_QUESTIONS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "faq_questions.json")
+FAQ_CONCURRENCY = int(os.getenv("FAQ_CONCURRENCY", "4"))
+MANIFEST_FILE = "manifest.json"
+
+logger = logging.getLogger(__name__)
+
+
+def load_questions(path: str = FAQ_QUESTIONS_FILE) -> List[Dict]:
+    """[{"question", "langs"}] from a JSON list of questions or {"question": ..., "langs": [...]} objects."""
+    with open(path, encoding="utf-8") as f:
+        items = json.load(f)
+    questions = []
+    for item in items:
+        if isinstance(item, str):
+            item = {"question": item}
+        langs = item.get("langs") or []
+        questions.append({"question": item["question"], "langs": [langs] if isinstance(langs, str) else list(langs)})
+    return questions
+
+
+def context_key(settings: Dict, lang: str, question: str, context: str) -> str:
+    """What an answer depends on: the answering settings, the question and its retrieved context."""
+    raw = json.dumps([settings, lang, normalize_question(question), context], ensure_ascii=False, sort_keys=True)
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _entry_id(lang: str, question: str) -> Tuple[str, str]:
+    return lang, normalize_question(question)
+
+
+class FaqBundle:
+    """One app's bundle as the apps read it; the manifest is reloaded when it changes on disk."""
+
+    def __init__(self, directory: str):
+        self.directory = directory
+        self.manifest: Dict = {}
+        self._entries: Dict[Tuple[str, str], Dict] = {}
+        self._mtime = None
+        self._lock = threading.Lock()
+        self._refresh()
+
+    def _refresh(self):
+        try:
+            mtime = os.stat(os.path.join(self.directory, MANIFEST_FILE)).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        manifest = read_manifest(self.directory) if mtime else {}
+        with self._lock:
+            self.manifest = manifest
+            self._entries = {_entry_id(e["lang"], e["question"]): e for e in manifest.get("entries", [])}
+            self._mtime = mtime
+
+    def get(self, docs_version: str, lang: str, question: str) -> Optional[Dict]:
+        """The entry for this exact (normalized) question, if the bundle was built for docs_version."""
+        self._refresh()
+        with self._lock:
+            if not docs_version or self.manifest.get("docs_version") != docs_version:
+                return None
+            return self._entries.get(_entry_id(lang, question))
+
+    def audio(self, entry: Dict, voice: str, response_format: str) -> Optional[str]:
+        """The entry's clip as a shared audio cache path (copied back in if it was evicted).
+
+        None when the bundle was voiced differently or has no audio.
+        """
+        if not entry.get("audio") or (self.manifest.get("voice"), self.manifest.get("format")) != (voice, response_format):
+            return None
+        key = os.path.splitext(entry["audio"])[0]
+        audio_cache = get_audio_cache()
+        path = audio_cache.get(key, response_format)
+        if path is None:
+            try:
+                with open(os.path.join(self.directory, "audio", entry["audio"]), "rb") as f:
+                    path = audio_cache.put(key, f.read(), response_format)
+            except FileNotFoundError:
+                return None
+        return path
+
+    def stats(self) -> Dict:
+        with self._lock:
+            return {"version": self.manifest.get("version", ""), "docs_version": self.manifest.get("docs_version", ""),
+                    "entries": len(self._entries)}
+
+
+def read_manifest(directory: str) -> Dict:
+    try:
+        with open(os.path.join(directory, MANIFEST_FILE), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return {}
+    except ValueError as e:
+        logger.warning("Ignoring unreadable FAQ bundle in %s: %s", directory, e)
+        return {}
+
+
+def _write_manifest(directory: str, manifest: Dict):
+    path = os.path.join(directory, MANIFEST_FILE)
+    with open(path + ".tmp", "w", encoding="utf-8") as f:
+        json.dump(manifest, f, ensure_ascii=False, indent=1)
+    os.replace(path + ".tmp", path)  # readers see the old bundle or the new one, never a mix
+
+
+async def build_bundle(directory: str, app: str, docs_version: str, items: List[Tuple[str, str]],
+                       retrieve: Callable[[str, str], Awaitable[Dict]],
+                       answer: Callable[[str, str, Dict], Awaitable[Dict]],
+                       settings: Dict, concurrency: int = FAQ_CONCURRENCY) -> Dict:
+    """Answer every (question, lang) in items into the bundle at directory, reusing unchanged entries.
+
+    retrieve(question, lang) returns a dict whose "context" string is everything the answer
+    depends on besides settings; answer(question, lang, retrieved) returns {"text", "sources",
+    "audio": clip path or None}. At most `concurrency` questions are in flight (the API calls
+    themselves are paced by the shared rate limiters). Returns the build stats.
+    """
+    started = time.perf_counter()
+    audio_dir = os.path.join(directory, "audio")
+    os.makedirs(audio_dir, exist_ok=True)
+    previous = {}
+    old = read_manifest(directory)
+    if old.get("app") == app:
+        previous = {_entry_id(e["lang"], e["question"]): e for e in old.get("entries", [])}
+    unique = list(dict.fromkeys(items))
+    semaphore = asyncio.Semaphore(concurrency)
+    stats = {"questions": len(unique), "reused": 0, "computed": 0, "failed": 0, "errors": []}
+
+    async def build_entry(question: str, lang: str) -> Optional[Dict]:
+        async with semaphore:
+            with trace("faq_entry", app=app, lang=lang):
+                try:
+                    retrieved = await retrieve(question, lang)
+                    key = context_key(settings, lang, question, retrieved["context"])
+                    old_entry = previous.get(_entry_id(lang, question))
+                    if (old_entry and old_entry["context_key"] == key
+                            and (not old_entry.get("audio") or os.path.exists(os.path.join(audio_dir, old_entry["audio"])))):
+                        stats["reused"] += 1
+                        return old_entry
+                    result = await answer(question, lang, retrieved)
+                    clip = ""
+                    if result.get("audio"):
+                        clip = os.path.basename(result["audio"])
+                        await asyncio.to_thread(shutil.copyfile, result["audio"], os.path.join(audio_dir, clip))
+                    stats["computed"] += 1
+                    return {"question": question, "lang": lang, "context_key": key, "answer": result["text"],
+                            "sources": result.get("sources", []), "audio": clip}
+                except Exception as e:
+                    # a failed entry is left out (its old answer may no longer match the docs); the rest still ship
+                    logger.warning("FAQ entry %r (%s) failed: %s", question, lang, e)
+                    stats["failed"] += 1
+                    stats["errors"].append(f"{question} ({lang}): {e}")
+                    return None
+
+    entries = [e for e in await asyncio.gather(*(build_entry(q, lang) for q, lang in unique)) if e]
+    version = hashlib.sha256(json.dumps([[e["lang"], e["question"], e["context_key"], e["audio"]] for e in entries],
+                                        ensure_ascii=False).encode("utf-8")).hexdigest()[:12]
+    _write_manifest(directory, {"app": app, "version": version, "docs_version": docs_version, "created": time.time(),
+                                "voice": settings.get("voice", ""), "format": settings.get("format", ""),
+                                "settings": settings, "entries": entries})
+    kept = {e["audio"] for e in entries if e["audio"]}
+    for name in os.listdir(audio_dir):
+        if name not in kept:
+            os.remove(os.path.join(audio_dir, name))
+    return {**stats, "entries": len(entries), "version": version, "docs_version": docs_version,
+            "seconds": round(time.perf_counter() - started, 3)}
+
+
+_bundles: Dict[str, FaqBundle] = {}
+_bundles_lock = threading.Lock()
+
+
+def bundle_dir(app: str, root: str = FAQ_BUNDLE_DIR) -> str:
+    return os.path.join(root, app)
+
+
+def get_faq_bundle(app: str) -> FaqBundle:
+    """Process-wide bundle for an app ("chat" or "voice"), shared by every Streamlit session."""
+    with _bundles_lock:
+        if app not in _bundles:
+            _bundles[app] = FaqBundle(bundle_dir(app))
+        return _bundles[app]
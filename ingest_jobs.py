@@ -0,0 +1,146 @@
+import os
+import json
+import time
+import uuid
+import logging
+import tempfile
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+# -----------------------------
+# Background ingestion jobs
+# -----------------------------
+# "Initialize System" used to crawl, embed and index inside the Streamlit script
+# thread, freezing the session, and every rerun or second click started over.
+# Jobs now run on a small worker pool owned by the server process; sessions
+# only submit and poll. Each job has a JSON record in INGEST_JOBS_DIR:
+#   state (queued -> crawling -> embedding -> done | failed), pages, chunks,
+#   errors, timestamps and the ingest stats,
+# written on every transition, so status survives reruns and reconnects. A
+# submit for a key that already has a queued or running job returns that job.
+# Secrets never go into the record; they stay in the job's closure.
+INGEST_JOBS_DIR = os.getenv("INGEST_JOBS_DIR", os.path.join(tempfile.gettempdir(), "shikhartraders_ingest_jobs"))
+INGEST_WORKERS = int(os.getenv("INGEST_WORKERS", "1"))
+MAX_JOB_RECORDS = 50
+MAX_JOB_ERRORS = 20
+
+QUEUED, CRAWLING, EMBEDDING, DONE, FAILED = "queued", "crawling", "embedding", "done", "failed"
+ACTIVE_STATES = (QUEUED, CRAWLING, EMBEDDING)
+
+logger = logging.getLogger(__name__)
+
+
+class IngestJobs:
+    def __init__(self, directory: str = INGEST_JOBS_DIR, workers: int = INGEST_WORKERS):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._pool = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="ingest")
+        self._jobs: Dict[str, Dict] = {}
+        # in-process results that can't be persisted (e.g. the built catalog), by job id
+        self._outputs: Dict[str, Any] = {}
+        for name in os.listdir(directory):
+            if name.endswith(".json"):
+                try:
+                    with open(os.path.join(directory, name), encoding="utf-8") as f:
+                        job = json.load(f)
+                except (OSError, ValueError):
+                    continue
+                if job.get("state") in ACTIVE_STATES:
+                    # the process that ran it is gone
+                    job.update(state=FAILED, errors=job.get("errors", []) + ["Interrupted by a server restart."])
+                    self._save(job)
+                self._jobs[job["id"]] = job
+
+    def _save(self, job: Dict):
+        path = os.path.join(self.directory, f"{job['id']}.json")
+        with open(path + ".tmp", "w", encoding="utf-8") as f:
+            json.dump(job, f, ensure_ascii=False)
+        os.replace(path + ".tmp", path)
+
+    def _prune(self):
+        finished = sorted((j for j in self._jobs.values() if j["state"] not in ACTIVE_STATES), key=lambda j: j["updated"])
+        for job in finished[:max(0, len(self._jobs) - MAX_JOB_RECORDS)]:
+            self._jobs.pop(job["id"], None)
+            self._outputs.pop(job["id"], None)
+            try:
+                os.remove(os.path.join(self.directory, f"{job['id']}.json"))
+            except FileNotFoundError:
+                pass
+
+    def submit(self, key: str, params: Dict, run: Callable[[Callable[..., None]], Dict]) -> Dict:
+        """Queue run(update) for key, unless a job for key is already queued or running (that one is returned).
+
+        run reports progress with update(state=..., pages=..., ...) and returns the stats to
+        keep in the record; an "output" entry in them is held in memory only (see output()).
+        """
+        with self._lock:
+            active = self._active(key)
+            if active:
+                return dict(active)
+            now = time.time()
+            job = {"id": uuid.uuid4().hex[:12], "key": key, "params": params, "state": QUEUED, "pages": 0,
+                   "chunks": 0, "errors": [], "created": now, "updated": now, "started": None, "result": None}
+            self._jobs[job["id"]] = job
+            self._save(job)
+            self._prune()
+        self._pool.submit(self._run, job["id"], run)
+        return dict(job)
+
+    def _active(self, key: str) -> Optional[Dict]:
+        return next((j for j in self._jobs.values() if j["key"] == key and j["state"] in ACTIVE_STATES), None)
+
+    def _update(self, job_id: str, **fields):
+        with self._lock:
+            job = self._jobs[job_id]
+            error = fields.pop("error", None)
+            if error:
+                job["errors"] = (job["errors"] + [error])[-MAX_JOB_ERRORS:]
+            job.update(fields, updated=time.time())
+            self._save(job)
+
+    def _run(self, job_id: str, run: Callable[[Callable[..., None]], Dict]):
+        self._update(job_id, state=CRAWLING, started=time.time())
+        try:
+            result = dict(run(lambda **fields: self._update(job_id, **fields)) or {})
+        except Exception as e:
+            logger.exception("Ingest job %s failed", job_id)
+            self._update(job_id, state=FAILED, error=str(e) or type(e).__name__)
+            return
+        output = result.pop("output", None)
+        with self._lock:
+            if output is not None:
+                self._outputs[job_id] = output
+        self._update(job_id, state=DONE, result=result)
+
+    def get(self, job_id: str) -> Optional[Dict]:
+        with self._lock:
+            job = self._jobs.get(job_id)
+            return json.loads(json.dumps(job)) if job else None
+
+    def latest(self, key: str) -> Optional[Dict]:
+        """The most recent job for key (active or finished)."""
+        with self._lock:
+            jobs = [j for j in self._jobs.values() if j["key"] == key]
+            return dict(max(jobs, key=lambda j: j["created"])) if jobs else None
+
+    def output(self, job_id: str) -> Any:
+        with self._lock:
+            return self._outputs.get(job_id)
+
+    def jobs(self) -> List[Dict]:
+        with self._lock:
+            return sorted((dict(j) for j in self._jobs.values()), key=lambda j: j["created"], reverse=True)
+
+
+_ingest_jobs: Optional[IngestJobs] = None
+_ingest_jobs_lock = threading.Lock()
+
+
+def get_ingest_jobs() -> IngestJobs:
+    global _ingest_jobs
+    with _ingest_jobs_lock:
+        if _ingest_jobs is None:
+            _ingest_jobs = IngestJobs()
+        return _ingest_jobs
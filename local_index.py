@@ -0,0 +1,231 @@
+import os
+import json
+import threading
+from typing import Dict, List, Optional, Tuple
+
+import numpy as np
+from qdrant_client.http import models
+
+# -----------------------------
+# Embedded vector index (no Qdrant server)
+# -----------------------------
+# For a corpus of a few dozen pages a brute-force cosine search over a NumPy
+# matrix takes microseconds, far less than a network round trip to a Qdrant
+# cluster. LocalVectorIndex implements the subset of the QdrantClient API the
+# app uses (create_collection, scroll, upsert, delete, query_points), so
+# ingestion and answering work unchanged on either backend.
+#
+# Per collection, normalized float32 vectors live in <name>.vectors.npy (opened
+# memory-mapped) and the chunk texts/payloads, row-aligned, in <name>.chunks.jsonl.
+# Upserts append to an in-memory matrix with spare capacity (doubled when full)
+# and are searchable at once; the files are rewritten only by flush(), which
+# ingestion calls once at the end and close() calls too. Writes and searches
+# share one lock, so a search never sees a half-applied batch.
+LOCAL_INDEX_DIR = os.getenv("LOCAL_INDEX_DIR", ".local_index")
+
+
+class _Collection:
+    def __init__(self, vectors: np.ndarray, ids: List[str], payloads: List[Dict]):
+        self.buffer = vectors  # rows past len(ids) are spare capacity; read-only while still the memory map
+        self.ids = ids
+        self.payloads = payloads
+        self.rows = {pid: i for i, pid in enumerate(ids)}
+        self.dirty = False  # changed since the files were written
+
+    @property
+    def vectors(self) -> np.ndarray:
+        return self.buffer[:len(self.ids)]
+
+    def reserve(self, extra: int):
+        """Make room for extra more rows in a writable buffer, doubling it when it runs out."""
+        needed = len(self.ids) + extra
+        if needed <= len(self.buffer) and self.buffer.flags.writeable:
+            return
+        buffer = np.empty((max(needed, 2 * len(self.buffer), 64), self.buffer.shape[1]), dtype=np.float32)
+        buffer[:len(self.ids)] = self.vectors
+        self.buffer = buffer
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
+
+
+def _matches(payload: Dict, condition) -> bool:
+    if isinstance(condition, models.Filter):
+        if condition.must and not all(_matches(payload, c) for c in condition.must):
+            return False
+        if condition.should and not any(_matches(payload, c) for c in condition.should):
+            return False
+        if condition.must_not and any(_matches(payload, c) for c in condition.must_not):
+            return False
+        return True
+    if isinstance(condition, models.FieldCondition):
+        value = payload.get(condition.key)
+        if isinstance(condition.match, models.MatchValue):
+            return value == condition.match.value
+        if isinstance(condition.match, models.MatchAny):
+            return value in condition.match.any
+    raise ValueError(f"Unsupported filter for the local index: {condition!r}")
+
+
+def _select_payload(payload: Dict, with_payload) -> Optional[Dict]:
+    if with_payload is True:
+        return dict(payload)
+    if isinstance(with_payload, list):
+        return {k: payload[k] for k in with_payload if k in payload}
+    return None
+
+
+class LocalVectorIndex:
+    def __init__(self, path: str = LOCAL_INDEX_DIR):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+        self._collections: Dict[str, _Collection] = {}
+        self._lock = threading.Lock()
+        for name in os.listdir(path):
+            if name.endswith(".vectors.npy"):
+                collection_name = name[:-len(".vectors.npy")]
+                self._collections[collection_name] = self._load(collection_name)
+
+    def _files(self, collection_name: str) -> Tuple[str, str]:
+        base = os.path.join(self.path, collection_name)
+        return f"{base}.vectors.npy", f"{base}.chunks.jsonl"
+
+    def _load(self, collection_name: str) -> _Collection:
+        vectors_path, chunks_path = self._files(collection_name)
+        vectors = np.load(vectors_path, mmap_mode="r")
+        ids, payloads = [], []
+        if os.path.exists(chunks_path):
+            with open(chunks_path, encoding="utf-8") as f:
+                for line in f:
+                    record = json.loads(line)
+                    ids.append(record["id"])
+                    payloads.append(record["payload"])
+        if len(ids) != len(vectors):
+            raise ValueError(f"Local index {collection_name!r} is corrupt: {len(vectors)} vectors, {len(ids)} chunks.")
+        return _Collection(vectors, ids, payloads)
+
+    def _save(self, collection_name: str, collection: _Collection):
+        # write-then-rename, so a crash mid-save leaves the previous version readable
+        vectors_path, chunks_path = self._files(collection_name)
+        with open(vectors_path + ".tmp", "wb") as f:
+            np.save(f, np.ascontiguousarray(collection.vectors, dtype=np.float32))
+        with open(chunks_path + ".tmp", "w", encoding="utf-8") as f:
+            for pid, payload in zip(collection.ids, collection.payloads):
+                f.write(json.dumps({"id": pid, "payload": payload}, ensure_ascii=False) + "\n")
+        os.replace(chunks_path + ".tmp", chunks_path)
+        os.replace(vectors_path + ".tmp", vectors_path)
+        collection.dirty = False
+
+    def _get(self, collection_name: str) -> _Collection:
+        collection = self._collections.get(collection_name)
+        if collection is None:
+            raise ValueError(f"Collection {collection_name} not found")
+        return collection
+
+    def create_collection(self, collection_name: str, vectors_config: models.VectorParams, **kwargs):
+        if vectors_config.distance != models.Distance.COSINE:
+            raise ValueError("The local index only supports cosine distance.")
+        with self._lock:
+            if collection_name in self._collections:
+                raise ValueError(f"Collection {collection_name} already exists")
+            collection = _Collection(np.zeros((0, vectors_config.size), dtype=np.float32), [], [])
+            self._save(collection_name, collection)
+            self._collections[collection_name] = collection
+        return True
+
+    def create_payload_index(self, collection_name: str, field_name: str, field_schema=None, **kwargs):
+        # filters scan payloads in memory; nothing to build
+        self._get(collection_name)
+
+    def upsert(self, collection_name: str, points: List[models.PointStruct], wait: bool = True, **kwargs):
+        if not points:
+            return
+        with self._lock:
+            collection = self._get(collection_name)
+            new_vectors = _normalize(np.asarray([p.vector for p in points], dtype=np.float32))
+            size = collection.buffer.shape[1]
+            if new_vectors.shape[1] != size:
+                raise ValueError(f"Vector size {new_vectors.shape[1]} does not match collection size {size}.")
+
+            # in place: O(batch), amortized over the buffer's doublings, instead of copying the matrix
+            collection.reserve(len({str(p.id) for p in points} - collection.rows.keys()))
+            for point, vector in zip(points, new_vectors):
+                pid = str(point.id)
+                row = collection.rows.get(pid)
+                if row is None:
+                    row = collection.rows[pid] = len(collection.ids)
+                    collection.ids.append(pid)
+                    collection.payloads.append({})
+                collection.buffer[row] = vector
+                collection.payloads[row] = point.payload or {}
+            collection.dirty = True
+
+    def delete(self, collection_name: str, points_selector: models.PointIdsList, wait: bool = True, **kwargs):
+        with self._lock:
+            current = self._get(collection_name)
+            drop = {str(pid) for pid in points_selector.points}
+            keep = [i for i, pid in enumerate(current.ids) if pid not in drop]
+            if len(keep) == len(current.ids):
+                return
+            collection = _Collection(
+                np.asarray(current.vectors[keep], dtype=np.float32).reshape(len(keep), current.buffer.shape[1]),
+                [current.ids[i] for i in keep],
+                [current.payloads[i] for i in keep]
+            )
+            collection.dirty = True
+            self._collections[collection_name] = collection
+
+    def scroll(self, collection_name: str, scroll_filter: Optional[models.Filter] = None, limit: int = 10,
+               offset: Optional[int] = None, with_payload=True, with_vectors: bool = False, **kwargs):
+        """Same contract as QdrantClient.scroll: (records, next offset or None)."""
+        with self._lock:
+            collection = self._get(collection_name)
+            rows = [i for i, payload in enumerate(collection.payloads)
+                    if scroll_filter is None or _matches(payload, scroll_filter)]
+            start = int(offset or 0)
+            page = rows[start:start + limit]
+            records = [models.Record(
+                id=collection.ids[i],
+                payload=_select_payload(collection.payloads[i], with_payload),
+                vector=collection.vectors[i].tolist() if with_vectors else None
+            ) for i in page]
+        next_offset = start + limit if start + limit < len(rows) else None
+        return records, next_offset
+
+    def query_points(self, collection_name: str, query: List[float], limit: int = 10, with_payload=True,
+                     query_filter: Optional[models.Filter] = None, **kwargs) -> models.QueryResponse:
+        """Exact cosine top-k: one matrix-vector product and an argpartition."""
+        vector = _normalize(np.asarray([query], dtype=np.float32))[0]
+        with self._lock:
+            collection = self._get(collection_name)
+            if not collection.ids or limit <= 0:
+                return models.QueryResponse(points=[])
+            scores = collection.vectors @ vector
+            if query_filter is not None:
+                allowed = np.array([_matches(p, query_filter) for p in collection.payloads])
+                scores = np.where(allowed, scores, -np.inf)
+            k = min(limit, len(scores))
+            top = np.argpartition(-scores, k - 1)[:k]
+            top = top[np.argsort(-scores[top])]
+            return models.QueryResponse(points=[models.ScoredPoint(
+                id=collection.ids[i],
+                version=0,
+                score=float(scores[i]),
+                payload=_select_payload(collection.payloads[i], with_payload)
+            ) for i in top if np.isfinite(scores[i])])
+
+    def count(self, collection_name: str, **kwargs) -> models.CountResult:
+        with self._lock:
+            return models.CountResult(count=len(self._get(collection_name).ids))
+
+    def flush(self):
+        """Write every collection changed since the last flush to disk."""
+        with self._lock:
+            for collection_name, collection in self._collections.items():
+                if collection.dirty:
+                    self._save(collection_name, collection)
+
+    def close(self, **kwargs):
+        self.flush()
@@ -0,0 +1,172 @@
+import os
+import time
+import random
+import threading
+import email.utils
+from typing import Dict, Optional, Tuple
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from chunking import estimate_tokens
+from tracing import metrics
+
+# -----------------------------
+# Shared OpenAI HTTP layer
+# -----------------------------
+# One keep-alive session per process (no TCP+TLS handshake per call) and one
+# requests/tokens-per-minute budget per (API key, endpoint), shared by every
+# Streamlit session, so the app runs up to the quota instead of a fixed cooldown.
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "20"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "4"))
+RETRY_BASE_SECONDS = 0.5
+RETRY_MAX_SECONDS = 30.0
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+# (requests per minute, tokens per minute); set these to the account's tier limits
+ENDPOINT_LIMITS = {
+    "chat/completions": (int(os.getenv("OPENAI_CHAT_RPM", "500")), int(os.getenv("OPENAI_CHAT_TPM", "200000"))),
+    "audio/speech": (int(os.getenv("OPENAI_TTS_RPM", "500")), int(os.getenv("OPENAI_TTS_TPM", "50000"))),
+}
+DEFAULT_LIMITS = (500, 200000)
+
+# tokens reserved for the reply when budgeting a chat request
+COMPLETION_TOKEN_ESTIMATE = 400
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at capacity per minute."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.tokens = self.capacity
+        self.updated = time.monotonic()
+        self.blocked_until = 0.0
+        self._cond = threading.Condition()
+
+    def _refill(self, now: float):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def acquire(self, amount: float = 1.0):
+        """Block until amount is available; requests larger than the bucket wait for a full one."""
+        amount = min(float(amount), self.capacity)
+        with self._cond:
+            while True:
+                now = time.monotonic()
+                self._refill(now)
+                wait = self.blocked_until - now
+                if wait <= 0:
+                    if self.tokens >= amount:
+                        self.tokens -= amount
+                        return
+                    wait = (amount - self.tokens) / self.rate
+                self._cond.wait(wait)
+
+    def block(self, seconds: float):
+        """Pause every caller, e.g. after the server answered 429 with Retry-After."""
+        with self._cond:
+            self.blocked_until = max(self.blocked_until, time.monotonic() + seconds)
+            self._cond.notify_all()
+
+
+class RateLimiter:
+    def __init__(self, rpm: int, tpm: int):
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+
+    def acquire(self, tokens: int = 0):
+        self.requests.acquire(1)
+        if tokens:
+            self.tokens.acquire(tokens)
+
+    def block(self, seconds: float):
+        self.requests.block(seconds)
+
+
+_lock = threading.Lock()
+_session: Optional[requests.Session] = None
+_limiters: Dict[Tuple[str, str], RateLimiter] = {}
+
+
+def get_session() -> requests.Session:
+    global _session
+    with _lock:
+        if _session is None:
+            _session = requests.Session()
+            adapter = HTTPAdapter(pool_connections=4, pool_maxsize=OPENAI_POOL_SIZE)
+            _session.mount("https://", adapter)
+            _session.mount("http://", adapter)
+        return _session
+
+
+def get_rate_limiter(api_key: str, endpoint: str) -> RateLimiter:
+    """Process-wide limiter for one endpoint of one API key (quotas are per key)."""
+    key = (api_key, endpoint)
+    with _lock:
+        if key not in _limiters:
+            _limiters[key] = RateLimiter(*ENDPOINT_LIMITS.get(endpoint, DEFAULT_LIMITS))
+        return _limiters[key]
+
+
+def estimate_request_tokens(payload: Dict) -> int:
+    if "messages" in payload:
+        prompt = sum(estimate_tokens(str(m.get("content", ""))) for m in payload["messages"])
+        return prompt + int(payload.get("max_tokens") or COMPLETION_TOKEN_ESTIMATE)
+    return estimate_tokens(str(payload.get("input", "")))
+
+
+def retry_after_seconds(response: requests.Response) -> Optional[float]:
+    """Server-requested delay from retry-after-ms / Retry-After (seconds or HTTP date)."""
+    value = response.headers.get("retry-after-ms")
+    if value:
+        try:
+            return float(value) / 1000
+        except ValueError:
+            pass
+    value = response.headers.get("Retry-After")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parsed = email.utils.parsedate_to_datetime(value)
+        return max(0.0, parsed.timestamp() - time.time()) if parsed else None
+
+
+def backoff_seconds(attempt: int) -> float:
+    """Exponential backoff with full jitter."""
+    return random.uniform(0, min(RETRY_MAX_SECONDS, RETRY_BASE_SECONDS * 2 ** attempt))
+
+
+def openai_post(api_key: str, endpoint: str, payload: Dict, timeout: float = 30, stream: bool = False) -> requests.Response:
+    """POST to an OpenAI endpoint through the pooled session and the shared rate limiter.
+
+    429s and transient 5xx are retried up to OPENAI_MAX_RETRIES times; the last response is
+    returned either way, so callers still use raise_for_status().
+    """
+    url = f"{OPENAI_BASE_URL}/{endpoint}"
+    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
+    limiter = get_rate_limiter(api_key, endpoint)
+    tokens = estimate_request_tokens(payload)
+
+    for attempt in range(OPENAI_MAX_RETRIES + 1):
+        limiter.acquire(tokens if attempt == 0 else 0)
+        r = get_session().post(url, headers=headers, json=payload, timeout=timeout, stream=stream)
+        if r.status_code not in RETRY_STATUSES or attempt == OPENAI_MAX_RETRIES:
+            return r
+
+        delay = retry_after_seconds(r)
+        if delay is None:
+            delay = backoff_seconds(attempt)
+        else:
+            delay += random.uniform(0, RETRY_BASE_SECONDS)  # don't let every waiter retry at once
+        metrics.increment("openai_retries", help_text="Retried OpenAI calls by endpoint and status.",
+                          endpoint=endpoint, status=r.status_code)
+        if r.status_code == 429:
+            limiter.block(delay)
+        r.close()
+        time.sleep(delay)
+    return r
@@ -0,0 +1,103 @@
+import os
+from typing import Dict, List, Optional
+
+from chunking import estimate_tokens
+from tracing import cache_event
+
+try:
+    import tiktoken
+except ImportError:  # optional: fall back to the chunker's estimate
+    tiktoken = None
+
+# -----------------------------
+# Prompt assembly for provider-side prompt caching
+# -----------------------------
+# OpenAI caches the longest previously seen prompt prefix (in 128-token steps,
+# from 1024 tokens on), which cuts time to first token and bills those tokens at
+# the cached rate. So every request is laid out as
+#   [static system prefix: instructions + contacts]          identical for every request
+#   [conversation history]                                  grows turn by turn
+#   [variable suffix: language, retrieved top-k sections, question]
+# and nothing per-request (language, question, timestamps) goes into the prefix.
+# Prompts are counted locally before sending and trimmed to PROMPT_TOKEN_BUDGET.
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "12000"))
+# opt-in for tiny docs (a few hundred tokens): docs up to this size go whole into the prefix
+# instead of retrieving sections; 0 (default) always retrieves
+DOCS_PREFIX_MAX_TOKENS = int(os.getenv("DOCS_PREFIX_MAX_TOKENS", "0"))
+TOKEN_ENCODING = "o200k_base"  # gpt-4o / gpt-4o-mini
+MESSAGE_OVERHEAD_TOKENS = 4
+
+_encoding = None
+
+
+class PromptBudgetExceeded(ValueError):
+    pass
+
+
+def count_tokens(text: str) -> int:
+    """Tokens as the model counts them (tiktoken), or the chunker's estimate without it."""
+    global _encoding
+    if tiktoken is None:
+        return estimate_tokens(text)
+    if _encoding is None:
+        _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+    return len(_encoding.encode(text or ""))
+
+
+def count_message_tokens(messages: List[Dict]) -> int:
+    return sum(count_tokens(m.get("content") or "") + MESSAGE_OVERHEAD_TOKENS for m in messages)
+
+
+def fits_prefix(docs_text: str) -> bool:
+    return DOCS_PREFIX_MAX_TOKENS > 0 and count_tokens(docs_text) <= DOCS_PREFIX_MAX_TOKENS
+
+
+def assemble_messages(prefix: str, suffix: str, history: Optional[List[Dict]] = None,
+                      budget: int = PROMPT_TOKEN_BUDGET, reserve: int = 0) -> List[Dict]:
+    """[system prefix] + history + [user suffix], dropping the oldest history until it fits.
+
+    reserve is kept free for the completion. Raises PromptBudgetExceeded if prefix and
+    suffix alone don't fit.
+    """
+    history = list(history or [])
+    head = [{"role": "system", "content": prefix}]
+    tail = [{"role": "user", "content": suffix}]
+    fixed = count_message_tokens(head + tail) + reserve
+    if fixed > budget:
+        raise PromptBudgetExceeded(f"Prompt needs {fixed} tokens, budget is {budget}.")
+    sizes = [count_message_tokens([m]) for m in history]
+    while history and fixed + sum(sizes) > budget:
+        history.pop(0)
+        sizes.pop(0)
+    return head + history + tail
+
+
+def record_cached_tokens(span_data: Dict, prompt_tokens: int, cached_tokens: int):
+    """Note prompt cache usage on a tracing span; the prompt cache hit rate is counted per request."""
+    span_data["prompt_tokens"] = prompt_tokens
+    span_data["cached_tokens"] = cached_tokens
+    if prompt_tokens:
+        span_data["prompt_cache_ratio"] = round(cached_tokens / prompt_tokens, 3)
+    cache_event("prompt", cached_tokens > 0)
+
+
+def assemble_text(history: str, context_blocks: List[str], suffix: str,
+                  budget: int = PROMPT_TOKEN_BUDGET, reserve: int = 0) -> str:
+    """Single-string variant for agent inputs: history, then context blocks (best first), then suffix.
+
+    Over budget, the history goes first, then the lowest-ranked blocks. Raises
+    PromptBudgetExceeded if the suffix alone (or it with no context left) doesn't fit.
+    """
+    blocks = list(context_blocks)
+    sizes = [count_tokens(b) for b in blocks]
+    fixed = count_tokens(suffix) + reserve
+    if fixed > budget:
+        raise PromptBudgetExceeded(f"Prompt needs {fixed} tokens, budget is {budget}.")
+    if history and fixed + count_tokens(history) + sum(sizes) > budget:
+        history = ""
+    while blocks and fixed + sum(sizes) > budget:
+        blocks.pop()
+        sizes.pop()
+    if context_blocks and not blocks:
+        raise PromptBudgetExceeded(f"No retrieved context fits the {budget} token budget.")
+    return "\n\n".join([p for p in [history, *blocks] if p] + [suffix])
@@ -0,0 +1,194 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+from typing import TYPE_CHECKING, Callable, Coroutine, Dict, Optional, Tuple
+
+from openai_http import OPENAI_MAX_RETRIES
+from startup import lazy_import, timed_load
+
+if TYPE_CHECKING:
+    from qdrant_client import QdrantClient
+    from fastembed import TextEmbedding
+    from fastembed.rerank.cross_encoder import TextCrossEncoder
+    from openai import AsyncOpenAI
+    from local_index import LocalVectorIndex
+
+# -----------------------------
+# Process-wide shared resources
+# -----------------------------
+# Streamlit re-runs the app script for every session and rerun, but imported
+# modules live for the whole server process, so heavy objects are kept here
+# and shared by every session instead of being rebuilt per "Initialize".
+# The client libraries themselves are imported on first use (see startup.py).
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "BAAI/bge-small-en-v1.5")
+RERANK_MODEL = os.getenv("RERANK_MODEL", "Xenova/ms-marco-MiniLM-L-6-v2")
+RESOURCE_IDLE_SECONDS = int(os.getenv("RESOURCE_IDLE_SECONDS", "1800"))
+# where fastembed keeps downloaded models (default: FASTEMBED_CACHE_PATH or its temp dir)
+MODEL_CACHE_DIR = os.getenv("MODEL_CACHE_DIR") or None
+# load the embedding model from MODEL_CACHE_DIR in the background at server start (0 disables)
+MODEL_PREWARM = os.getenv("MODEL_PREWARM", "1") == "1"
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_entries: Dict[Tuple, Dict] = {}
+_build_locks: Dict[Tuple, threading.Lock] = {}
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_prewarm_started = False
+
+
+def _get_or_create(key: Tuple, factory: Callable, close: Optional[Callable] = None, releasable: bool = True):
+    """Shared value for key, built once. releasable=False keeps it past RESOURCE_IDLE_SECONDS
+    (for values holding state that can't be rebuilt, like an in-memory index)."""
+    release_idle()
+    with _lock:
+        entry = _entries.get(key)
+        if entry:
+            entry["last_used"] = time.monotonic()
+            return entry["value"]
+        build_lock = _build_locks.setdefault(key, threading.Lock())
+
+    # one loader per key; concurrent sessions wait instead of loading a second copy
+    with build_lock:
+        with _lock:
+            entry = _entries.get(key)
+            if entry:
+                entry["last_used"] = time.monotonic()
+                return entry["value"]
+        value = factory()
+        with _lock:
+            _entries[key] = {"value": value, "last_used": time.monotonic(), "close": close, "releasable": releasable}
+            # later callers find the entry first; those already waiting re-check it under the old lock
+            _build_locks.pop(key, None)
+        return value
+
+
+def release_idle(max_idle_seconds: int = RESOURCE_IDLE_SECONDS) -> int:
+    """Drop resources nobody has used for max_idle_seconds. Returns how many were released."""
+    now = time.monotonic()
+    with _lock:
+        idle = [k for k, e in _entries.items() if e["releasable"] and now - e["last_used"] > max_idle_seconds]
+        released = [_entries.pop(k) for k in idle]
+    for entry in released:
+        if entry["close"]:
+            try:
+                entry["close"](entry["value"])
+            except Exception:
+                pass
+    return len(released)
+
+
+def load_embedding_model(model_name: str, local_files_only: bool = False) -> "TextEmbedding":
+    text_embedding = lazy_import("fastembed").TextEmbedding
+    with timed_load(f"embedding:{model_name}"):
+        return text_embedding(model_name=model_name, cache_dir=MODEL_CACHE_DIR, local_files_only=local_files_only)
+
+
+def get_embedding_model(model_name: str = EMBEDDING_MODEL) -> "TextEmbedding":
+    return _get_or_create(("embedding", model_name), lambda: load_embedding_model(model_name))
+
+
+def prewarm_embedding_model(model_name: str = EMBEDDING_MODEL) -> bool:
+    """Unless MODEL_PREWARM=0, load the embedding model on a background thread (once per process).
+
+    Only from the local model cache: a model that isn't there is left for the first question
+    that needs it, so server start never waits on a download. Returns whether a prewarm started.
+    """
+    global _prewarm_started
+    with _lock:
+        if not MODEL_PREWARM or _prewarm_started:
+            return False
+        _prewarm_started = True
+
+    def prewarm():
+        try:
+            _get_or_create(("embedding", model_name), lambda: load_embedding_model(model_name, local_files_only=True))
+        except Exception as e:
+            logger.warning("Embedding model not prewarmed (not in the local model cache?): %s", e)
+
+    threading.Thread(target=prewarm, name="model-prewarm", daemon=True).start()
+    return True
+
+
+def get_reranker(model_name: str = RERANK_MODEL) -> "TextCrossEncoder":
+    def load():
+        text_cross_encoder = lazy_import("fastembed.rerank.cross_encoder").TextCrossEncoder
+        with timed_load(f"reranker:{model_name}"):
+            return text_cross_encoder(model_name=model_name, cache_dir=MODEL_CACHE_DIR)
+
+    return _get_or_create(("reranker", model_name), load)
+
+
+def get_qdrant_client(url: str, api_key: str) -> "QdrantClient":
+    """Client for a Qdrant server URL, or ":memory:" for an in-process index (benchmarks)."""
+    qdrant_client = lazy_import("qdrant_client").QdrantClient
+    if url == ":memory:":
+        # never released when idle: closing it would throw the whole index away
+        return _get_or_create(("qdrant", url), lambda: qdrant_client(location=":memory:"), close=lambda client: client.close(),
+                              releasable=False)
+    return _get_or_create(
+        ("qdrant", url, api_key),
+        lambda: qdrant_client(url=url, api_key=api_key),
+        close=lambda client: client.close()
+    )
+
+
+def is_remote_qdrant(client) -> bool:
+    """A Qdrant server client, as opposed to in-process Qdrant (":memory:" or a path) or the embedded index."""
+    options = getattr(client, "init_options", None)
+    return bool(options) and options.get("location") != ":memory:" and not options.get("path")
+
+
+def get_local_index(path: str = "") -> "LocalVectorIndex":
+    """Embedded NumPy index persisted under path (default LOCAL_INDEX_DIR); one instance per directory per process."""
+    local_index = lazy_import("local_index")
+    path = path or local_index.LOCAL_INDEX_DIR
+    return _get_or_create(("local_index", os.path.abspath(path)), lambda: local_index.LocalVectorIndex(path),
+                          close=lambda client: client.close())
+
+
+def get_vector_client(backend: str, url: str = "", api_key: str = ""):
+    """Vector index for the sidebar's backend choice: "local" (embedded) or "qdrant" (server)."""
+    if backend == "local":
+        return get_local_index()
+    return get_qdrant_client(url, api_key)
+
+
+def embedding_dim(model_name: str = EMBEDDING_MODEL) -> int:
+    """Vector size from fastembed's model metadata (no probe embedding)."""
+    for info in lazy_import("fastembed").TextEmbedding.list_supported_models():
+        if info.get("model") == model_name and info.get("dim"):
+            return int(info["dim"])
+    return len(list(get_embedding_model(model_name).embed(["dimension probe"]))[0])
+
+
+def get_event_loop() -> asyncio.AbstractEventLoop:
+    """One long-lived event loop per process, running on a daemon thread.
+
+    Async clients keep their connection pools bound to the loop they were first used on,
+    so every coroutine that touches them must run here instead of under asyncio.run().
+    """
+    global _loop
+    with _lock:
+        if _loop is None:
+            _loop = asyncio.new_event_loop()
+            threading.Thread(target=_loop.run_forever, name="async-runtime", daemon=True).start()
+        return _loop
+
+
+def run_async(coro: Coroutine) -> Future:
+    """Schedule a coroutine on the shared loop; the caller waits on the returned future."""
+    return asyncio.run_coroutine_threadsafe(coro, get_event_loop())
+
+
+def get_async_openai(api_key: str) -> "AsyncOpenAI":
+    """Pooled AsyncOpenAI client per API key; only use it from coroutines on get_event_loop()."""
+    async_openai = lazy_import("openai").AsyncOpenAI
+    return _get_or_create(
+        ("async_openai", api_key),
+        lambda: async_openai(api_key=api_key, max_retries=OPENAI_MAX_RETRIES),
+        close=lambda client: run_async(client.close())
+    )
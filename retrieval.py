@@ -0,0 +1,101 @@
+import re
+import math
+from collections import Counter
+from typing import List, Dict, Tuple
+
+from chunking import chunk_markdown
+
+# -----------------------------
+# Lightweight lexical retrieval (BM25)
+# -----------------------------
+WORD_RE = re.compile(r"[\wऀ-ॿ]+")
+NUMBER_UNIT_RE = re.compile(r"^(\d+)([a-z]+)$")
+
+# "20L", "20 litre", "20 ltr" and "20 लीटर" should all match the same pack
+TOKEN_ALIASES = {
+    "litre": "l", "litres": "l", "liter": "l", "liters": "l", "ltr": "l", "lit": "l", "लीटर": "l",
+    "pcs": "piece", "pieces": "piece", "pc": "piece", "पीस": "piece",
+    "rate": "price", "rates": "price", "prices": "price", "daam": "price", "dam": "price", "kimat": "price",
+    "keemat": "price", "कीमत": "price", "रेट": "price", "दाम": "price",
+    "bags": "bag",
+}
+STOPWORDS = {
+    "a", "an", "the", "is", "are", "am", "of", "to", "for", "in", "on", "and", "or", "me", "my", "i", "you",
+    "your", "we", "it", "this", "that", "what", "tell", "please", "do", "does", "can", "with", "about",
+    "ka", "ki", "ke", "hai", "kya", "hain", "mein", "se", "ko", "batao", "bataiye",
+    "का", "की", "के", "है", "क्या", "में", "से", "को",
+}
+
+SECTION_MAX_TOKENS = 300
+
+# standard RRF damping constant: keeps one retriever's #1 from drowning the other's list
+RRF_K = 60
+
+
+def tokenize(text: str) -> List[str]:
+    tokens = []
+    for word in WORD_RE.findall((text or "").lower()):
+        m = NUMBER_UNIT_RE.match(word)
+        for part in (m.groups() if m else (word,)):
+            part = TOKEN_ALIASES.get(part, part)
+            if part not in STOPWORDS:
+                tokens.append(part)
+    return tokens
+
+
+class BM25Index:
+    """Okapi BM25 over a list of {"content": ...} sections."""
+
+    def __init__(self, sections: List[Dict], k1: float = 1.5, b: float = 0.75):
+        self.sections = sections
+        self.k1 = k1
+        self.b = b
+        self.term_freqs = [Counter(tokenize(s["content"])) for s in sections]
+        self.lengths = [sum(tf.values()) for tf in self.term_freqs]
+        self.avg_length = (sum(self.lengths) / len(self.lengths)) if self.lengths else 0.0
+
+        doc_freq = Counter()
+        for tf in self.term_freqs:
+            doc_freq.update(tf.keys())
+        n = len(sections)
+        self.idf = {t: math.log(1 + (n - df + 0.5) / (df + 0.5)) for t, df in doc_freq.items()}
+
+    def search(self, query: str, k: int = 4) -> List[Tuple[float, Dict]]:
+        terms = [t for t in set(tokenize(query)) if t in self.idf]
+        scored = []
+        for i, tf in enumerate(self.term_freqs):
+            score = 0.0
+            norm = self.k1 * (1 - self.b + self.b * self.lengths[i] / (self.avg_length or 1))
+            for t in terms:
+                f = tf.get(t)
+                if f:
+                    score += self.idf[t] * f * (self.k1 + 1) / (f + norm)
+            if score > 0:
+                scored.append((score, self.sections[i]))
+        scored.sort(key=lambda x: x[0], reverse=True)
+        return scored[:k]
+
+
+def build_docs_index(docs_text: str, max_tokens: int = SECTION_MAX_TOKENS) -> BM25Index:
+    """Split the knowledge base into heading-scoped sections and index them."""
+    sections = chunk_markdown(docs_text, max_tokens=max_tokens, overlap_tokens=0)
+    for i, section in enumerate(sections):
+        section["position"] = i
+    return BM25Index(sections)
+
+
+def retrieve_context(index: BM25Index, question: str, k: int = 4) -> str:
+    """Top-k sections for the question, falling back to the first sections when nothing matches."""
+    hits = [section for _, section in index.search(question, k)]
+    if not hits:
+        hits = index.sections[:k]
+    return "\n\n---\n\n".join(s["content"] for s in hits)
+
+
+def reciprocal_rank_fusion(rankings: List[List[str]], k: int = RRF_K) -> List[Tuple[str, float]]:
+    """Fuse ranked ID lists (best first) by sum of 1 / (k + rank); returns (id, score) best first."""
+    scores: Dict[str, float] = {}
+    for ranking in rankings:
+        for rank, item in enumerate(ranking, start=1):
+            scores[item] = scores.get(item, 0.0) + 1.0 / (k + rank)
+    return sorted(scores.items(), key=lambda x: x[1], reverse=True)
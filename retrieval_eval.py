@@ -0,0 +1,160 @@
+import os
+import json
+import time
+import argparse
+import tempfile
+from typing import Callable, Dict, List
+
+# -----------------------------
+# Retrieval evaluation
+# -----------------------------
+# Indexes the bundled knowledge base into a temporary embedded index with the
+# real embedding model and scores each retriever of the voice app on labeled
+# customer questions: dense only, BM25 only, hybrid (RRF) and hybrid + rerank.
+# A chunk counts as relevant when it contains the expected answer fragment.
+#
+#   python retrieval_eval.py --k 3 --rerank --output retrieval_eval.json
+DOCS_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "shikhartraders_support_docs_all_in_one.md")
+COLLECTION = "eval_docs"
+
+# (question, fragment the retrieved context must contain to answer it)
+EVAL_CASES = [
+    ("What is the price of UltraTech Weather Plus?", "₹420"),
+    ("UltraTech Super cement ka rate kya hai?", "₹415"),
+    ("Weather Pro 20L ka rate kya hai?", "₹2500"),
+    ("5 litre Weather Pro price?", "₹750"),
+    ("Iron ring minimum order kitna hai?", "120"),
+    ("How much is one iron ring piece?", "₹12"),
+    ("What payment methods do you accept?", "UPI"),
+    ("Payment confirmation ke liye kis number pe call karein?", "07355969446"),
+    ("How long does delivery take?", "Next day"),
+    ("Do you provide a GST bill?", "GST number"),
+    ("Can I return cement bags?", "non-returnable"),
+    ("Where is your shop located?", "maps.app.goo.gl"),
+    ("What details should I send to place an order?", "landmark"),
+    ("सीमेंट का रेट क्या है?", "₹405"),
+    ("Weather Pro 10 litre kitne ka hai?", "₹1450"),
+]
+
+
+def load_eval_index(app, embedding_model, path: str, payload_mode: str = "full"):
+    """Chunk the bundled docs the way ingestion does and index them into a fresh local index."""
+    from chunking import chunk_pages
+    from chunk_store import get_chunk_store
+    from local_index import LocalVectorIndex
+    from qdrant_client.http.models import Distance, VectorParams
+
+    with open(DOCS_FILE, encoding="utf-8") as f:
+        text = f.read()
+    chunks = chunk_pages([{"content": text, "url": "docs", "metadata": {"title": "Shikhar Traders docs"}}])
+    client = LocalVectorIndex(path)
+    dim = len(list(embedding_model.embed(["dimension probe"]))[0])
+    client.create_collection(COLLECTION, vectors_config=VectorParams(size=dim, distance=Distance.COSINE))
+    chunk_store = get_chunk_store(os.path.join(path, "chunks.sqlite3"))
+    stats = app.store_embeddings(client, embedding_model, chunks, COLLECTION, source_root="eval",
+                                 payload_mode=payload_mode, chunk_store=chunk_store)
+    return client, chunk_store, stats
+
+
+def score(ranked: List[Dict], fragment: str, k: int) -> Dict:
+    relevant = [fragment.lower() in (c.get("content") or "").lower() for c in ranked]
+    first = next((i for i, hit in enumerate(relevant) if hit), None)
+    return {
+        "hit": first is not None and first < k,
+        "reciprocal_rank": 1.0 / (first + 1) if first is not None else 0.0,
+        "precision": sum(relevant[:k]) / k,
+    }
+
+
+def evaluate(retrievers: Dict[str, Callable[[str, object], List[Dict]]], embedding_model, k: int) -> Dict:
+    from chunking import estimate_tokens
+
+    rows = {name: [] for name in retrievers}
+    for question, fragment in EVAL_CASES:
+        embedding = list(embedding_model.embed([question]))[0]
+        for name, retrieve in retrievers.items():
+            started = time.perf_counter()
+            ranked = retrieve(question, embedding)
+            elapsed = time.perf_counter() - started
+            rows[name].append({"question": question, "ms": elapsed * 1000,
+                               "context_tokens": sum(estimate_tokens(c.get("content", "")) for c in ranked[:k]),
+                               **score(ranked, fragment, k)})
+
+    summary = {}
+    for name, results in rows.items():
+        n = len(results)
+        summary[name] = {
+            f"hit@{k}": round(sum(r["hit"] for r in results) / n, 3),
+            "mrr": round(sum(r["reciprocal_rank"] for r in results) / n, 3),
+            f"precision@{k}": round(sum(r["precision"] for r in results) / n, 3),
+            "avg_context_tokens": round(sum(r["context_tokens"] for r in results) / n, 1),
+            "avg_ms": round(sum(r["ms"] for r in results) / n, 2),
+            "misses": [r["question"] for r in results if not r["hit"]],
+        }
+    return summary
+
+
+def run_eval(app, embedding_model, path: str, args) -> Dict:
+    """Index the docs under path and score every retriever on EVAL_CASES."""
+    client, chunk_store, stats = load_eval_index(app, embedding_model, path, args.payload_mode)
+    version = stats["version"]
+
+    def dense(question, embedding):
+        response = client.query_points(COLLECTION, query=embedding.tolist(), limit=args.candidates, with_payload=True)
+        return app.with_content(COLLECTION, [{**p.payload, "id": str(p.id)} for p in response.points], chunk_store)
+
+    def sparse(question, embedding):
+        index = app.sparse_index(client, COLLECTION, version, chunk_store)
+        return [s for _, s in index.search(question, args.candidates)]
+
+    def hybrid(question, embedding):
+        return app.hybrid_search(client, COLLECTION, version, question, embedding, k=args.candidates,
+                                 candidates=args.candidates, chunk_store=chunk_store)
+
+    def hybrid_rerank(question, embedding):
+        return app.hybrid_search(client, COLLECTION, version, question, embedding, k=args.candidates,
+                                 candidates=args.candidates, use_reranker=True, chunk_store=chunk_store)
+
+    retrievers = {"dense": dense, "bm25": sparse, "hybrid_rrf": hybrid}
+    if args.rerank:
+        retrievers["hybrid_rrf_rerank"] = hybrid_rerank
+
+    try:
+        return {"chunks": stats["chunks"], "payload_mode": args.payload_mode, "cases": len(EVAL_CASES), "k": args.k,
+                "candidates": args.candidates, "retrievers": evaluate(retrievers, embedding_model, args.k)}
+    finally:
+        chunk_store.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Evaluate dense, BM25 and hybrid retrieval on labeled questions.")
+    parser.add_argument("--k", type=int, default=3, help="chunks sent to the model")
+    parser.add_argument("--candidates", type=int, default=20, help="candidates per retriever before fusion")
+    parser.add_argument("--rerank", action="store_true", help="also evaluate hybrid + cross-encoder rerank")
+    parser.add_argument("--payload-mode", choices=["full", "lean"], default="full",
+                        help="index chunk texts in the payloads or in the local chunk store")
+    parser.add_argument("--output", help="write JSON results here")
+    args = parser.parse_args()
+
+    import ai_voice_agent_docs as app
+    from resources import get_embedding_model
+
+    embedding_model = get_embedding_model()
+    # the index, its vectors and the chunk store only live for this run
+    with tempfile.TemporaryDirectory(prefix="retrieval_eval_") as path:
+        results = run_eval(app, embedding_model, path, args)
+
+    print(f"{'retriever':<20}{'hit@k':>8}{'MRR':>8}{'P@k':>8}{'ctx tok':>10}{'ms':>8}")
+    for name, r in results["retrievers"].items():
+        print(f"{name:<20}{r[f'hit@{args.k}']:>8.3f}{r['mrr']:>8.3f}{r[f'precision@{args.k}']:>8.3f}"
+              f"{r['avg_context_tokens']:>10.1f}{r['avg_ms']:>8.2f}")
+        for question in r["misses"]:
+            print(f"    miss: {question}")
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+            f.write("\n")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,249 @@
+import os
+import re
+import time
+import asyncio
+import itertools
+import contextvars
+from concurrent.futures import ThreadPoolExecutor
+from functools import partial
+from typing import Awaitable, Callable, List, Optional, Union
+
+# -----------------------------
+# Sentence-pipelined speech synthesis
+# -----------------------------
+# While the answer is still streaming, every completed sentence is sent to TTS
+# (at most TTS_MAX_PARALLEL at a time) and the clips are played back in order,
+# so the first audio starts after the first sentence instead of the full answer.
+# With a stream (audio_server.SegmentedStream) the segments are instead written,
+# in order and as their bytes arrive, into one live clip the browser plays by URL;
+# synthesize then takes a second argument, a callback for each received chunk.
+TTS_MAX_PARALLEL = int(os.getenv("TTS_MAX_PARALLEL", "3"))
+MIN_SEGMENT_CHARS = 40
+
+SENTENCE_END_RE = re.compile(r"(?<=[.!?।])[\"')\]]*\s+|\n+")
+MARKDOWN_RE = re.compile(r"[*_`#>|]+|^\s*[-•]\s+|^\s*\d+\)\s+", re.MULTILINE)
+
+# MPEG audio frame header tables (kbps), used to estimate clip length for paced playback
+MPEG1_L3_BITRATES = [0, 32, 40, 48, 56, 64, 80, 96, 112, 128, 160, 192, 224, 256, 320, 0]
+MPEG2_L3_BITRATES = [0, 8, 16, 24, 32, 40, 48, 56, 64, 80, 96, 112, 128, 144, 160, 0]
+ADTS_SAMPLE_RATES = [96000, 88200, 64000, 48000, 44100, 32000, 24000, 22050, 16000, 12000, 11025, 8000, 7350]
+OPUS_GRANULE_RATE = 48000
+
+
+class SentenceSplitter:
+    """Turns a stream of text deltas into speakable segments of at least min_chars."""
+
+    def __init__(self, min_chars: int = MIN_SEGMENT_CHARS):
+        self.min_chars = min_chars
+        self.buffer = ""
+
+    def feed(self, delta: str) -> List[str]:
+        self.buffer += delta
+        segments, start = [], 0
+        for m in SENTENCE_END_RE.finditer(self.buffer):
+            candidate = self.buffer[start:m.end()].strip()
+            if len(candidate) >= self.min_chars:
+                segments.append(candidate)
+                start = m.end()
+        self.buffer = self.buffer[start:]
+        return segments
+
+    def flush(self) -> List[str]:
+        rest, self.buffer = self.buffer.strip(), ""
+        return [rest] if rest else []
+
+
+def speakable(text: str) -> str:
+    """Strip markdown markup so TTS doesn't read out asterisks and bullets."""
+    return " ".join(MARKDOWN_RE.sub(" ", text).split())
+
+
+def mp3_duration(data: bytes) -> float:
+    """Approximate length in seconds of a CBR MP3 clip, from its first frame header."""
+    offset = 0
+    if data[:3] == b"ID3" and len(data) > 10:
+        size = data[6:10]
+        offset = 10 + ((size[0] & 0x7F) << 21 | (size[1] & 0x7F) << 14 | (size[2] & 0x7F) << 7 | (size[3] & 0x7F))
+    while offset + 4 <= len(data):
+        if data[offset] == 0xFF and data[offset + 1] & 0xE0 == 0xE0:
+            version = (data[offset + 1] >> 3) & 0x03   # 3 = MPEG1, 2 = MPEG2, 0 = MPEG2.5
+            table = MPEG1_L3_BITRATES if version == 3 else MPEG2_L3_BITRATES
+            kbps = table[data[offset + 2] >> 4]
+            if kbps:
+                return (len(data) - offset) * 8 / (kbps * 1000)
+        offset += 1
+    return len(data) / 16000  # ~128 kbps guess
+
+
+def ogg_opus_duration(data: bytes) -> float:
+    """Length in seconds of an Ogg Opus clip: last page's granule position minus the pre-skip."""
+    last = data.rfind(b"OggS")
+    head = data.find(b"OpusHead")
+    if last < 0 or len(data) < last + 14:
+        return len(data) / 4000  # ~32 kbps guess
+    granule = int.from_bytes(data[last + 6:last + 14], "little")
+    pre_skip = int.from_bytes(data[head + 10:head + 12], "little") if head >= 0 else 0
+    return max(0, granule - pre_skip) / OPUS_GRANULE_RATE
+
+
+def adts_duration(data: bytes) -> float:
+    """Length in seconds of an ADTS AAC clip (1024 samples per frame)."""
+    offset, seconds = 0, 0.0
+    while offset + 7 <= len(data) and data[offset] == 0xFF and data[offset + 1] & 0xF0 == 0xF0:
+        rate_index = (data[offset + 2] >> 2) & 0x0F
+        length = ((data[offset + 3] & 0x03) << 11) | (data[offset + 4] << 3) | (data[offset + 5] >> 5)
+        if length < 7 or rate_index >= len(ADTS_SAMPLE_RATES):
+            break
+        seconds += 1024 / ADTS_SAMPLE_RATES[rate_index]
+        offset += length
+    return seconds or len(data) / 8000
+
+
+def clip_duration(data: bytes, response_format: str = "mp3") -> float:
+    if response_format == "opus":
+        return ogg_opus_duration(data)
+    if response_format == "aac":
+        return adts_duration(data)
+    return mp3_duration(data)
+
+
+class SpeechPipeline:
+    """Thread-pool variant for synchronous TTS functions (streamlit_app.py)."""
+
+    def __init__(self, synthesize: Callable[..., bytes], max_parallel: int = TTS_MAX_PARALLEL,
+                 response_format: str = "mp3", stream=None):
+        self.synthesize = synthesize
+        self.response_format = response_format
+        self.stream = stream
+        self.splitter = SentenceSplitter()
+        self.pool = ThreadPoolExecutor(max_workers=max_parallel)
+        self.futures = []
+        self.next_index = 0
+        self.busy_until = 0.0
+
+    def _synthesize_into(self, text: str, index: int) -> bytes:
+        try:
+            return self.synthesize(text, partial(self.stream.write, index))
+        finally:
+            self.stream.end(index)
+
+    def _submit(self, segments: List[str]):
+        for segment in segments:
+            text = speakable(segment)
+            if text:
+                # run in the caller's context so tracing spans join the request's trace
+                if self.stream is not None:
+                    job = (self._synthesize_into, text, self.stream.add())
+                else:
+                    job = (self.synthesize, text)
+                self.futures.append(self.pool.submit(contextvars.copy_context().run, *job))
+
+    def feed(self, delta: str):
+        self._submit(self.splitter.feed(delta))
+
+    def finish(self):
+        self._submit(self.splitter.flush())
+        self.pool.shutdown(wait=False)
+        if self.stream is not None:
+            self.stream.finish()
+
+    def cancel(self):
+        """Drop segments not yet started and close the live clip; calls already running end on their own."""
+        self.pool.shutdown(wait=False, cancel_futures=True)
+        if self.stream is not None:
+            self.stream.finish(error="cancelled")
+
+    def play_ready(self, play: Callable[[bytes], None], block: bool = False):
+        """Hand finished clips to play() in order, each one once the previous has played out.
+
+        Non-blocking calls return as soon as the next clip isn't ready or the previous is still
+        playing; block=True waits until the last clip has started.
+        """
+        if self.stream is not None:
+            return  # the live clip is playing already
+        while self.next_index < len(self.futures):
+            future = self.futures[self.next_index]
+            if not block and (not future.done() or time.monotonic() < self.busy_until):
+                return
+            data = future.result()
+            time.sleep(max(0.0, self.busy_until - time.monotonic()))
+            play(data)
+            self.busy_until = time.monotonic() + clip_duration(data, self.response_format)
+            self.next_index += 1
+
+    def audio(self) -> bytes:
+        """All segments joined into one clip (MP3/AAC frames concatenate cleanly; Ogg files chain)."""
+        return b"".join(f.result() for f in self.futures)
+
+
+class AsyncSpeechPipeline:
+    """asyncio variant for the AsyncOpenAI client (ai_voice_agent_docs.py)."""
+
+    def __init__(self, synthesize: Callable[..., Awaitable[bytes]], max_parallel: int = TTS_MAX_PARALLEL,
+                 response_format: str = "mp3", stream=None):
+        self.synthesize = synthesize
+        self.response_format = response_format
+        self.stream = stream
+        self.splitter = SentenceSplitter()
+        self.semaphore = asyncio.Semaphore(max_parallel)
+        self.tasks = []
+        self.queue: "asyncio.Queue[Optional[asyncio.Task]]" = asyncio.Queue()
+
+    async def _run(self, text: str, index: Optional[int]) -> bytes:
+        async with self.semaphore:
+            if index is None:
+                return await self.synthesize(text)
+            try:
+                return await self.synthesize(text, partial(self.stream.write, index))
+            finally:
+                self.stream.end(index)
+
+    def _submit(self, segments: List[str]):
+        for segment in segments:
+            text = speakable(segment)
+            if text:
+                index = self.stream.add() if self.stream is not None else None
+                task = asyncio.create_task(self._run(text, index))
+                self.tasks.append(task)
+                self.queue.put_nowait(task)
+
+    def feed(self, delta: str):
+        self._submit(self.splitter.feed(delta))
+
+    def finish(self):
+        self._submit(self.splitter.flush())
+        self.queue.put_nowait(None)
+        if self.stream is not None:
+            self.stream.finish()
+
+    async def play(self, play: Callable[[bytes], None]):
+        """Play clips in order as they finish; returns once the last clip has started."""
+        busy_until = 0.0
+        while True:
+            task = await self.queue.get()
+            if task is None:
+                return
+            data = await task
+            await asyncio.sleep(max(0.0, busy_until - time.monotonic()))
+            play(data)
+            busy_until = time.monotonic() + clip_duration(data, self.response_format)
+
+    async def audio(self) -> bytes:
+        return b"".join(await asyncio.gather(*self.tasks))
+
+    def cancel(self):
+        for task in self.tasks:
+            task.cancel()
+        if self.stream is not None:
+            self.stream.finish(error="cancelled")
+
+
+def segment_player(slot, mime: str = "audio/mpeg", turn: int = 0) -> Callable[[Union[bytes, str]], None]:
+    """Play callback that swaps each segment (bytes, or the URL of a live clip) into the same slot with autoplay.
+    Each segment is its own element, keyed by turn and segment index, so a repeated clip plays again."""
+    segments = itertools.count(1)
+
+    def play(data: Union[bytes, str]):
+        # st.audio takes no key, but an autoplaying player's element ID includes alt, so alt is the key
+        slot.audio(data, format=mime, autoplay=True, alt=f"Answer {turn}, part {next(segments)}")
+    return play
@@ -0,0 +1,76 @@
+import sys
+import time
+import logging
+import importlib
+import threading
+from contextlib import contextmanager
+from typing import Dict, Iterator
+
+from tracing import metrics
+
+# -----------------------------
+# Cold-start profile
+# -----------------------------
+# The voice app imports its heavy clients (qdrant_client, fastembed, agents,
+# openai, firecrawl) on first use instead of at script load, so the sidebar
+# renders before any of them is needed. Every first import and model load in
+# the process is timed here:
+#   - startup_report() / format_startup_report(): per module and per model,
+#     plus milestones such as the first rendered page
+#   - the metrics endpoint: shikhar_startup_seconds{stage, item}
+# so a slow new import or a model that started downloading again shows up by name.
+PROCESS_STARTED = time.perf_counter()  # when the app first loaded this module
+
+logger = logging.getLogger(__name__)
+
+_lock = threading.Lock()
+_profile: Dict[str, Dict[str, float]] = {"milestone": {}, "import": {}, "load": {}}
+
+
+def record(stage: str, name: str, seconds: float):
+    """Keep the first timing per (stage, name); later ones are warm and say nothing about cold start."""
+    with _lock:
+        if name in _profile[stage]:
+            return
+        _profile[stage][name] = seconds
+    metrics.observe("startup_seconds", seconds, help_text="Cold-start imports, model loads and milestones.",
+                    stage=stage, item=name)
+    logger.info("startup %s %s: %.3fs", stage, name, seconds)
+
+
+def lazy_import(name: str):
+    """importlib.import_module(name), timing the first import in this process."""
+    module = sys.modules.get(name)
+    if module is not None:
+        return module
+    started = time.perf_counter()
+    module = importlib.import_module(name)
+    record("import", name, time.perf_counter() - started)
+    return module
+
+
+@contextmanager
+def timed_load(name: str) -> Iterator[None]:
+    """Time a model or client load (only recorded if it completes)."""
+    started = time.perf_counter()
+    yield
+    record("load", name, time.perf_counter() - started)
+
+
+def milestone(name: str):
+    """Seconds from process start to the first time name is reached (e.g. "first_render")."""
+    record("milestone", name, time.perf_counter() - PROCESS_STARTED)
+
+
+def startup_report() -> Dict[str, Dict[str, float]]:
+    """{"milestone" | "import" | "load": {name: ms}}, slowest first."""
+    with _lock:
+        return {stage: {name: round(seconds * 1000, 1) for name, seconds in sorted(items.items(), key=lambda i: -i[1])}
+                for stage, items in _profile.items()}
+
+
+def format_startup_report() -> str:
+    lines = []
+    for stage, items in startup_report().items():
+        lines += [f"{stage} {name}: {ms / 1000:.2f}s" for name, ms in items.items()]
+    return "\n".join(lines) or "Nothing loaded yet."
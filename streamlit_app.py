@@ -1,21 +1,255 @@
 import streamlit as st
-import requests
 import time
+import json
+import hashlib
+
+from retrieval import build_docs_index, retrieve_context
+from catalog import build_catalog, LANGUAGE_CODES
+from conversation import ConversationMemory, RENDER_WINDOW
+from answer_cache import get_answer_cache, text_vector
+from audio_cache import get_audio_cache, audio_key
+from audio_server import (AUDIO_CHUNK_BYTES, TTS_FORMAT, SegmentedStream, audio_source, clip_mime, live_url, mime_type,
+                          open_live_clip, start_audio_server)
+from speech_pipeline import SpeechPipeline, segment_player
+from openai_http import openai_post, COMPLETION_TOKEN_ESTIMATE
+from prompts import assemble_messages, count_message_tokens, fits_prefix, record_cached_tokens
+from docs_store import DocsSnapshot, get_docs_store
+from faq_bundle import get_faq_bundle
+from tracing import trace, span, cache_event, format_breakdown, start_metrics_server
 
 # =========================
-# PAGE CONFIG
+# BUSINESS DATA
 # =========================
-st.set_page_config(
-    page_title="Shikhar Traders | Voice AI",
-    page_icon="🎙️",
-    layout="wide",
-    initial_sidebar_state="expanded"
+BUSINESS = {
+    "name": "Shikhar Traders",
+    "phones": ["07355969446", "09450805567"],
+    "email": "shikhartraders@zohomail.com",
+    "maps": "https://maps.app.goo.gl/22dertGs5oZxrWMb8",
+    "website": "https://shikhartradersbs.odoo.com/",
+    "note": "Prices are approximate. Final price/stock/payment confirmation must be done via call/WhatsApp/email."
+}
+
+LANGUAGES = ["English", "Hinglish", "Hindi"]
+# (button, prompt); faq_batch.py pre-computes these in every language
+QUICK_ACTIONS = [
+    ("🧱 Cement Price", "Tell me UltraTech cement prices."),
+    ("🛡️ Waterproofing", "Tell me Weather Pro waterproofing prices and uses."),
+    ("🔩 Iron Ring", "Tell me iron ring price and bulk order rule."),
+    ("📍 Store Info", "Tell me store location, timing, and contact details."),
+]
+
+RETRIEVAL_TOP_K = 4
+TTS_MODEL = "gpt-4o-mini-tts"
+CHAT_MODEL = "gpt-4o-mini"
+
+# Static instructions: the language and question go in the per-request suffix, so this stays cacheable
+SYSTEM_INSTRUCTIONS = (
+    f"You are the official AI support assistant of {BUSINESS['name']} (UltraTech only).\n"
+    "Answer strictly using the DOCUMENTATION provided.\n"
+    "Reply in the language named in the customer's message.\n"
+    f"If user asks final price, stock, delivery charge, or payment -> ask them to call/WhatsApp "
+    f"{BUSINESS['phones'][0]} / {BUSINESS['phones'][1]} or email {BUSINESS['email']}.\n"
+    "Keep replies short, clear, and professional."
 )
 
 # =========================
-# PREMIUM CLEAN CSS
+# HELPERS
 # =========================
-st.markdown("""
+def load_docs(raw_url: str) -> DocsSnapshot:
+    """Docs from RAW github link, via the shared store (revalidated with a conditional GET)"""
+    raw_url = (raw_url or "").strip()
+    if not raw_url:
+        raise ValueError("RAW docs URL is empty.")
+
+    if "raw.githubusercontent.com" not in raw_url:
+        raise ValueError("Please paste RAW GitHub URL (raw.githubusercontent.com).")
+
+    docs = get_docs_store().get(raw_url, force=True)
+    if len(docs.text) < 50:
+        raise ValueError("Docs loaded but looks empty/too short.")
+    return docs
+
+
+def docs_catalog(text: str):
+    """Price/contact catalog from the docs; the BUSINESS contacts win over what the docs list"""
+    return build_catalog(text, contacts=BUSINESS)
+
+
+def current_docs() -> DocsSnapshot:
+    """This session's docs moved to the latest shared version (derived indexes are built once per version)"""
+    docs = get_docs_store().get(st.session_state.docs.url)
+    st.session_state.docs = docs
+    return docs
+
+
+def contact_block() -> str:
+    """Fixed contact details sent with every question, whatever sections were retrieved"""
+    return (
+        f"Call/WhatsApp: {BUSINESS['phones'][0]} / {BUSINESS['phones'][1]}\n"
+        f"Email: {BUSINESS['email']}\n"
+        f"Store location: {BUSINESS['maps']}\n"
+        f"Website: {BUSINESS['website']}\n"
+        f"Note: {BUSINESS['note']}"
+    )
+
+
+def prompt_prefix(docs_text: str = "") -> str:
+    """Static system prefix: instructions and contacts (plus the whole docs only if DOCS_PREFIX_MAX_TOKENS admits them)"""
+    parts = [SYSTEM_INSTRUCTIONS, f"CONTACT:\n{contact_block()}"]
+    if docs_text and fits_prefix(docs_text):
+        parts.append(f"DOCUMENTATION:\n{docs_text}")
+    return "\n\n".join(parts)
+
+
+def chat_payload(question: str, context: str, lang: str, history=None, prefix: str = "") -> dict:
+    """Cache-friendly layout: static prefix, then history, then language + retrieved context + question"""
+    prefix = prefix or prompt_prefix()
+    suffix = f"Reply in {lang}.\n\n"
+    if context:
+        suffix += f"DOCUMENTATION:\n{context}\n\n"
+    suffix += f"USER QUESTION:\n{question}"
+
+    return {
+        "model": CHAT_MODEL,
+        "messages": assemble_messages(prefix, suffix, history, reserve=COMPLETION_TOKEN_ESTIMATE),
+        "temperature": 0.4,
+        # routes requests sharing this prefix to the same cache
+        "prompt_cache_key": hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+    }
+
+
+def record_usage(s: dict, usage: dict):
+    """Copy chat completion token usage (incl. prompt cache hits) onto a tracing span"""
+    s["completion_tokens"] = usage.get("completion_tokens", 0)
+    record_cached_tokens(s, usage.get("prompt_tokens", 0), (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0))
+
+
+def openai_chat(api_key: str, question: str, context: str, lang: str, history=None, prefix: str = "") -> str:
+    payload = chat_payload(question, context, lang, history, prefix)
+    with span("chat", prompt_tokens_local=count_message_tokens(payload["messages"])) as s:
+        r = openai_post(api_key, "chat/completions", payload, timeout=30)
+        r.raise_for_status()
+        data = r.json()
+        record_usage(s, data.get("usage") or {})
+    return data["choices"][0]["message"]["content"].strip()
+
+
+def openai_chat_stream(api_key: str, question: str, context: str, lang: str, history=None, prefix: str = ""):
+    """Yield answer text deltas as they arrive on the chat completions SSE stream"""
+    started = time.perf_counter()
+    payload = {**chat_payload(question, context, lang, history, prefix), "stream": True, "stream_options": {"include_usage": True}}
+
+    with span("chat", stream=True, prompt_tokens_local=count_message_tokens(payload["messages"])) as s, openai_post(api_key, "chat/completions", payload, timeout=30, stream=True) as r:
+        r.raise_for_status()
+        for line in r.iter_lines():
+            line = line.decode("utf-8").strip()
+            if not line.startswith("data:"):
+                continue
+            data = line[len("data:"):].strip()
+            if data == "[DONE]":
+                break
+            chunk = json.loads(data)
+            if chunk.get("usage"):
+                record_usage(s, chunk["usage"])
+            choices = chunk.get("choices") or []
+            delta = (choices[0].get("delta") or {}).get("content") if choices else None
+            if delta:
+                if "ttft_ms" not in s:
+                    s["ttft_ms"] = round((time.perf_counter() - started) * 1000, 2)
+                yield delta
+
+
+def openai_tts(api_key: str, text: str, voice: str = "alloy", sink=None) -> bytes:
+    """Speech for text, served from the shared audio cache when this exact clip was made before.
+
+    sink, if given, receives the audio bytes as they arrive (the whole clip at once on a cache hit).
+    """
+    synthesized = []
+
+    def synthesize() -> bytes:
+        payload = {"model": TTS_MODEL, "voice": voice, "input": text, "response_format": TTS_FORMAT}
+        # streamed, so a live clip can play this segment while it is still being synthesized
+        r = openai_post(api_key, "audio/speech", payload, timeout=60, stream=True)
+        r.raise_for_status()
+        chunks = []
+        for chunk in r.iter_content(AUDIO_CHUNK_BYTES):
+            chunks.append(chunk)
+            if sink:
+                sink(chunk)
+        data = b"".join(chunks)
+        synthesized.append(len(data))
+        return data
+
+    with span("tts", chars=len(text), format=TTS_FORMAT) as s:
+        path = get_audio_cache().get_or_create(audio_key(text, voice, TTS_MODEL, response_format=TTS_FORMAT),
+                                               synthesize, TTS_FORMAT)
+        with open(path, "rb") as f:
+            data = f.read()
+        s["bytes_in"] = sum(synthesized)
+    cache_event("audio", not synthesized)
+    if sink and not synthesized:
+        sink(data)
+    return data
+
+
+def speech_pipeline(api_key: str, voice: str):
+    """A SpeechPipeline and the player to hand it: one live clip when the audio server can stream
+    TTS_FORMAT (the player is started once, right away), else a clip-by-clip segment player."""
+    clip = open_live_clip(TTS_FORMAT)
+    pipeline = SpeechPipeline(lambda text, sink=None: openai_tts(api_key, text, voice=voice, sink=sink),
+                              response_format=TTS_FORMAT, stream=SegmentedStream(clip) if clip else None)
+    st.session_state.audio_turn += 1
+    play = segment_player(st.empty(), mime_type(TTS_FORMAT), st.session_state.audio_turn)
+    if clip:
+        play(live_url(clip))
+    return pipeline, play
+
+
+def bubble_html(role: str, content: str) -> str:
+    if role == "user":
+        return f"<div class='chat-bubble user-bubble'><b>You:</b><br>{content}</div>"
+    return f"<div class='chat-bubble agent-bubble'><b>Agent:</b><br>{content}</div>"
+
+
+def speak_pipelined(pipeline: SpeechPipeline, text: str, voice: str, play) -> str:
+    """Finish a pipeline, play the remaining segments in order and cache the full clip"""
+    pipeline.finish()
+    try:
+        pipeline.play_ready(play, block=True)
+        with span("audio_write") as s:
+            data = pipeline.audio()
+            s["bytes_out"] = len(data)
+    except BaseException:
+        pipeline.cancel()
+        raise
+    return get_audio_cache().put(audio_key(text, voice, TTS_MODEL, response_format=TTS_FORMAT), data, TTS_FORMAT)
+
+
+def show_audio(path: str):
+    # by URL, so reruns don't resend the clip; None once it has been evicted from the shared audio cache
+    source = audio_source(path)
+    if source:
+        st.audio(source, format=clip_mime(path))
+
+
+def main():
+    start_metrics_server()
+    start_audio_server()
+
+    # =========================
+    # PAGE CONFIG
+    # =========================
+    st.set_page_config(
+        page_title="Shikhar Traders | Voice AI",
+        page_icon="🎙️",
+        layout="wide",
+        initial_sidebar_state="expanded"
+    )
+
+    # =========================
+    # PREMIUM CLEAN CSS
+    # =========================
+    st.markdown("""
 <style>
 @import url('https://fonts.googleapis.com/css2?family=Inter:wght@300;400;600;800&display=swap');
 
@@ -86,128 +320,69 @@ html, body, [class*="css"] { font-family: 'Inter', sans-serif; }
 </style>
 """, unsafe_allow_html=True)
 
-# =========================
-# BUSINESS DATA
-# =========================
-BUSINESS = {
-    "name": "Shikhar Traders",
-    "phones": ["07355969446", "09450805567"],
-    "email": "shikhartraders@zohomail.com",
-    "maps": "https://maps.app.goo.gl/22dertGs5oZxrWMb8",
-    "website": "https://shikhartradersbs.odoo.com/",
-    "note": "Prices are approximate. Final price/stock/payment confirmation must be done via call/WhatsApp/email."
-}
-
-# =========================
-# HELPERS
-# =========================
-def fetch_docs_text(raw_url: str) -> str:
-    """Download docs from RAW github link"""
-    raw_url = (raw_url or "").strip()
-    if not raw_url:
-        raise ValueError("RAW docs URL is empty.")
-
-    if "raw.githubusercontent.com" not in raw_url:
-        raise ValueError("Please paste RAW GitHub URL (raw.githubusercontent.com).")
-
-    r = requests.get(raw_url, timeout=25)
-    if r.status_code != 200:
-        raise ValueError(f"Docs fetch failed (HTTP {r.status_code}).")
-
-    text = r.text.strip()
-    if len(text) < 50:
-        raise ValueError("Docs loaded but looks empty/too short.")
-    return text
-
-
-def openai_chat(api_key: str, question: str, docs_text: str, lang: str) -> str:
-    url = "https://api.openai.com/v1/chat/completions"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-
-    system_prompt = f"""
-You are the official AI support assistant of {BUSINESS['name']} (UltraTech only).
-Reply in {lang}.
-Answer strictly using the DOCUMENTATION provided.
-If user asks final price, stock, delivery charge, or payment -> ask them to call/WhatsApp {BUSINESS['phones'][0]} / {BUSINESS['phones'][1]} or email {BUSINESS['email']}.
-Keep replies short, clear, and professional.
-"""
-
-    payload = {
-        "model": "gpt-4o-mini",
-        "messages": [
-            {"role": "system", "content": system_prompt.strip()},
-            {"role": "user", "content": f"DOCUMENTATION:\n{docs_text}\n\nUSER QUESTION:\n{question}"}
-        ],
-        "temperature": 0.4
-    }
-
-    r = requests.post(url, headers=headers, json=payload, timeout=30)
-    r.raise_for_status()
-    return r.json()["choices"][0]["message"]["content"].strip()
-
-
-def openai_tts(api_key: str, text: str, voice: str = "alloy") -> bytes:
-    url = "https://api.openai.com/v1/audio/speech"
-    headers = {"Authorization": f"Bearer {api_key}", "Content-Type": "application/json"}
-    payload = {"model": "gpt-4o-mini-tts", "voice": voice, "input": text}
-    r = requests.post(url, headers=headers, json=payload, timeout=60)
-    r.raise_for_status()
-    return r.content
-
-
-# =========================
-# SESSION STATE
-# =========================
-if "messages" not in st.session_state:
-    st.session_state.messages = []
-if "last_answer" not in st.session_state:
-    st.session_state.last_answer = ""
-if "tts_last_time" not in st.session_state:
-    st.session_state.tts_last_time = 0
-if "docs_text" not in st.session_state:
-    st.session_state.docs_text = ""
-if "docs_loaded" not in st.session_state:
-    st.session_state.docs_loaded = False
-
-# =========================
-# SIDEBAR
-# =========================
-with st.sidebar:
-    st.markdown("### ⚙️ Settings")
-
-    api_key = st.text_input("OpenAI API Key", type="password")
-
-    docs_url = st.text_input(
-        "Documentation RAW URL",
-        placeholder="https://raw.githubusercontent.com/.../shikhartraders_support_docs_all_in_one.md"
-    )
-
-    lang = st.selectbox("Language", ["English", "Hinglish", "Hindi"])
-    voice = st.selectbox("Voice", ["alloy", "coral", "sage", "verse"])
-    auto_voice = st.toggle("Auto Voice Reply", value=False)
-
-    if st.button("📥 Load Documentation"):
-        try:
-            with st.spinner("Loading documentation..."):
-                st.session_state.docs_text = fetch_docs_text(docs_url)
-                st.session_state.docs_loaded = True
-            st.success("✅ Documentation loaded successfully!")
-        except Exception as e:
-            st.session_state.docs_loaded = False
-            st.session_state.docs_text = ""
-            st.error(f"❌ Docs not loaded: {e}")
-
-    st.markdown("---")
-
-    if st.button("🧹 Clear Chat"):
-        st.session_state.messages = []
+    # =========================
+    # SESSION STATE
+    # =========================
+    if "memory" not in st.session_state:
+        st.session_state.memory = ConversationMemory()
+    if "history_shown" not in st.session_state:
+        st.session_state.history_shown = RENDER_WINDOW
+    if "last_answer" not in st.session_state:
         st.session_state.last_answer = ""
-        st.rerun()
+    if "audio_turn" not in st.session_state:
+        st.session_state.audio_turn = 0  # numbers the voiced answers, keeping their players distinct
+    if "docs" not in st.session_state:
+        st.session_state.docs = None  # reference to a shared DocsSnapshot, never a copy
+
+    answer_cache = get_answer_cache("chat")
+    # answers pre-computed by faq_batch.py, loaded once per process
+    faq_bundle = get_faq_bundle("chat")
+    # runs once per docs version change, whichever session noticed it
+    get_docs_store().subscribe("chat-answer-cache", lambda new, old: answer_cache.set_version(new.url, new.version))
+
+    # =========================
+    # SIDEBAR
+    # =========================
+    with st.sidebar:
+        st.markdown("### ⚙️ Settings")
+
+        api_key = st.text_input("OpenAI API Key", type="password")
+
+        docs_url = st.text_input(
+            "Documentation RAW URL",
+            placeholder="https://raw.githubusercontent.com/.../shikhartraders_support_docs_all_in_one.md"
+        )
 
-# =========================
-# HEADER
-# =========================
-st.markdown(f"""
+        lang = st.selectbox("Language", LANGUAGES)
+        voice = st.selectbox("Voice", ["alloy", "coral", "sage", "verse"])
+        auto_voice = st.toggle("Auto Voice Reply", value=False)
+        show_timings = st.toggle("Show timing breakdown", value=False)
+
+        if st.button("📥 Load Documentation"):
+            try:
+                with st.spinner("Loading documentation..."):
+                    docs = load_docs(docs_url)
+                    docs.derive("bm25", build_docs_index)
+                    docs.derive("catalog", docs_catalog)
+                    docs.derive("prompt_prefix", prompt_prefix)
+                    st.session_state.docs = docs
+                st.success(f"✅ Documentation loaded successfully! (version {docs.version})")
+            except Exception as e:
+                st.session_state.docs = None
+                st.error(f"❌ Docs not loaded: {e}")
+
+        st.markdown("---")
+
+        if st.button("🧹 Clear Chat"):
+            st.session_state.memory.clear()
+            st.session_state.history_shown = RENDER_WINDOW
+            st.session_state.last_answer = ""
+            st.rerun()
+
+    # =========================
+    # HEADER
+    # =========================
+    st.markdown(f"""
 <div class="glass-card">
     <div class="hero-title">{BUSINESS['name']} Voice AI</div>
     <div style="margin-bottom:12px;">
@@ -224,98 +399,160 @@ st.markdown(f"""
 </div>
 """, unsafe_allow_html=True)
 
-# =========================
-# QUICK ACTIONS
-# =========================
-st.markdown("### ⚡ Quick Actions")
-c1, c2, c3, c4 = st.columns(4)
-
-if c1.button("🧱 Cement Price"):
-    st.session_state.messages.append({"role": "user", "content": "Tell me UltraTech cement prices."})
-if c2.button("🛡️ Waterproofing"):
-    st.session_state.messages.append({"role": "user", "content": "Tell me Weather Pro waterproofing prices and uses."})
-if c3.button("🔩 Iron Ring"):
-    st.session_state.messages.append({"role": "user", "content": "Tell me iron ring price and bulk order rule."})
-if c4.button("📍 Store Info"):
-    st.session_state.messages.append({"role": "user", "content": "Tell me store location, timing, and contact details."})
-
-# =========================
-# CHAT UI
-# =========================
-st.markdown("### 💬 Chat")
-
-if len(st.session_state.messages) == 0:
-    st.session_state.messages.append({
-        "role": "assistant",
-        "content": "Hi 👋 I’m Shikhar Traders Voice AI.\n\n➡️ First: Paste RAW docs link in sidebar and click **Load Documentation**."
-    })
-
-for m in st.session_state.messages:
-    if m["role"] == "user":
-        st.markdown(
-            f"<div class='chat-bubble user-bubble'><b>You:</b><br>{m['content']}</div>",
-            unsafe_allow_html=True
-        )
-    else:
-        st.markdown(
-            f"<div class='chat-bubble agent-bubble'><b>Agent:</b><br>{m['content']}</div>",
-            unsafe_allow_html=True
-        )
-
-prompt = st.chat_input("Ask about products / delivery / payment...")
-
-if prompt:
-    if not api_key.strip():
-        st.error("Please add OpenAI API Key in sidebar.")
-    elif not st.session_state.docs_loaded or not st.session_state.docs_text.strip():
-        st.error("Docs not loaded. Paste RAW docs link and click **Load Documentation**.")
-    else:
-        st.session_state.messages.append({"role": "user", "content": prompt})
-
-        try:
-            with st.spinner("Thinking..."):
-                reply = openai_chat(api_key.strip(), prompt, st.session_state.docs_text, lang)
-
-            st.session_state.messages.append({"role": "assistant", "content": reply})
-            st.session_state.last_answer = reply
-
-            # Auto voice reply with cooldown
-            if auto_voice:
-                now = time.time()
-                if now - st.session_state.tts_last_time < 10:
-                    st.warning("⏳ Voice cooldown: wait 10 seconds (to avoid 429).")
-                else:
-                    try:
-                        audio = openai_tts(api_key.strip(), reply[:700], voice=voice)
-                        st.audio(audio, format="audio/mp3")
-                        st.session_state.tts_last_time = now
-                    except:
-                        st.error("🔊 Voice error (rate limit). Wait 10 sec & try again.")
-
-        except Exception as e:
-            st.error(f"Error: {e}")
-
+    # =========================
+    # QUICK ACTIONS
+    # =========================
+    st.markdown("### ⚡ Quick Actions")
+    quick_prompt = None
+    for column, (label, text) in zip(st.columns(len(QUICK_ACTIONS)), QUICK_ACTIONS):
+        if column.button(label):
+            quick_prompt = text
+
+    # =========================
+    # CHAT UI
+    # =========================
+    st.markdown("### 💬 Chat")
+
+    memory = st.session_state.memory
+    if not memory.messages:
+        memory.add({
+            "role": "assistant",
+            "content": "Hi 👋 I’m Shikhar Traders Voice AI.\n\n➡️ First: Paste RAW docs link in sidebar and click **Load Documentation**.",
+            "memory": False
+        })
+
+    # only the latest messages are rendered on each rerun; older ones on request
+    visible, hidden = memory.page(st.session_state.history_shown)
+    if hidden and st.button(f"⬆️ Show {min(hidden, RENDER_WINDOW)} older messages"):
+        st.session_state.history_shown += RENDER_WINDOW
         st.rerun()
 
-# =========================
-# SPEAK LAST ANSWER
-# =========================
-st.markdown("---")
-if st.button("🎙️ Speak Last Answer"):
-    if not api_key.strip():
-        st.warning("Add OpenAI API key first.")
-    elif not st.session_state.last_answer.strip():
-        st.info("No answer yet.")
-    else:
-        now = time.time()
-        if now - st.session_state.tts_last_time < 10:
-            st.warning("⏳ Wait 10 seconds to avoid 429.")
+    for m in visible:
+        st.markdown(bubble_html(m["role"], m["content"]), unsafe_allow_html=True)
+        if m.get("ttft") is not None:
+            st.caption(f"⏱️ First token in {m['ttft']:.2f}s")
+        if show_timings and m.get("timings"):
+            st.caption(f"🧭 {m['timings']}")
+        show_audio(m.get("audio"))
+
+    prompt = st.chat_input("Ask about products / delivery / payment...") or quick_prompt
+
+    if prompt:
+        if not api_key.strip():
+            st.error("Please add OpenAI API Key in sidebar.")
+        elif st.session_state.docs is None:
+            st.error("Docs not loaded. Paste RAW docs link and click **Load Documentation**.")
+        else:
+            # history and the follow-up's search query are taken before this question joins the memory
+            history = memory.prompt_messages()
+            query = memory.contextual_query(prompt)
+            follow_up = query != prompt
+            memory.add({"role": "user", "content": prompt})
+            st.markdown(bubble_html("user", prompt), unsafe_allow_html=True)
+
+            message = None
+            with trace("chat_answer", lang=lang, auto_voice=auto_voice) as answer_trace:
+                try:
+                    started = time.perf_counter()
+                    docs = current_docs()
+                    catalog = docs.derive("catalog", docs_catalog)
+                    question_vector = text_vector(prompt)
+                    # pre-computed FAQ answers come with their clip; catalog prices and contacts come
+                    # from a template; neither reaches the model
+                    faq = None
+                    if not follow_up:
+                        faq = faq_bundle.get(docs.version, lang, prompt)
+                        cache_event("faq", faq is not None)
+                    faq_audio = faq_bundle.audio(faq, voice, TTS_FORMAT) if faq and auto_voice else None
+                    with span("fast_path") as s:
+                        reply = faq["answer"] if faq else catalog.answer(prompt, LANGUAGE_CODES[lang])
+                        if reply is None and follow_up:
+                            reply = catalog.answer(query, LANGUAGE_CODES[lang])
+                        s["matched"] = reply is not None
+                    # follow-ups depend on the conversation, so they are neither served from nor stored in the cache
+                    if reply is None and not follow_up:
+                        reply = answer_cache.get(docs.version, lang, prompt, question_vector)
+                        cache_event("answer", reply is not None)
+                    ttft = time.perf_counter() - started
+
+                    # Auto voice reply; sentences are voiced while the answer streams (openai_http paces the calls)
+                    bubble = st.empty()
+                    pipeline, play = speech_pipeline(api_key.strip(), voice) if auto_voice and not faq_audio else (None, None)
+                    try:
+                        if reply is None:
+                            # the top-k retrieved sections follow the cached prefix (tiny docs only ride in it when opted in)
+                            prefix = docs.derive("prompt_prefix", prompt_prefix)
+                            context = ""
+                            if not docs.derive("docs_in_prefix", fits_prefix):
+                                with span("retrieve"):
+                                    context = retrieve_context(docs.derive("bm25", build_docs_index), query, k=RETRIEVAL_TOP_K)
+                            bubble.markdown(bubble_html("agent", "Thinking..."), unsafe_allow_html=True)
+                            parts = []
+                            for delta in openai_chat_stream(api_key.strip(), prompt, context, lang, history, prefix):
+                                if not parts:
+                                    ttft = time.perf_counter() - started
+                                parts.append(delta)
+                                bubble.markdown(bubble_html("agent", "".join(parts) + " ▌"), unsafe_allow_html=True)
+                                if pipeline:
+                                    pipeline.feed(delta)
+                                    pipeline.play_ready(play)
+                            reply = "".join(parts).strip()
+                            if not reply:
+                                raise ValueError("Model returned an empty answer.")
+                            if not follow_up:
+                                answer_cache.put(docs.version, lang, prompt, reply, question_vector)
+                        elif pipeline:
+                            pipeline.feed(reply)
+                    except BaseException:
+                        # a failed answer (network error, 429 after retries) must not leave speech or the live clip running
+                        if pipeline:
+                            pipeline.cancel()
+                        raise
+
+                    bubble.markdown(bubble_html("agent", reply), unsafe_allow_html=True)
+                    st.caption(f"⏱️ First token in {ttft:.2f}s")
+                    message = {"role": "assistant", "content": reply, "ttft": ttft}
+                    st.session_state.last_answer = reply
+
+                    if faq_audio:
+                        st.audio(audio_source(faq_audio), format=clip_mime(faq_audio), autoplay=True)
+                        message["audio"] = faq_audio
+                    elif pipeline:
+                        try:
+                            message["audio"] = speak_pipelined(pipeline, reply, voice, play)
+                        except Exception as e:
+                            st.error(f"🔊 Voice error: {e}")
+                    memory.add(message)
+
+                except Exception as e:
+                    answer_trace.status = type(e).__name__
+                    st.error(f"Error: {e}")
+
+            if message is not None:
+                message["timings"] = format_breakdown(answer_trace)
+                if show_timings:
+                    st.caption(f"🧭 {message['timings']}")
+
+    # =========================
+    # SPEAK LAST ANSWER
+    # =========================
+    st.markdown("---")
+    if st.button("🎙️ Speak Last Answer"):
+        if not api_key.strip():
+            st.warning("Add OpenAI API key first.")
+        elif not st.session_state.last_answer.strip():
+            st.info("No answer yet.")
         else:
             try:
-                audio = openai_tts(api_key.strip(), st.session_state.last_answer[:700], voice=voice)
-                st.audio(audio, format="audio/mp3")
-                st.session_state.tts_last_time = now
-            except:
-                st.error("🔊 TTS rate limit hit. Please wait & try again.")
+                with trace("speak_last_answer", voice=voice):
+                    pipeline, play = speech_pipeline(api_key.strip(), voice)
+                    pipeline.feed(st.session_state.last_answer)
+                    speak_pipelined(pipeline, st.session_state.last_answer, voice, play)
+            except Exception as e:
+                st.error(f"🔊 TTS error: {e}")
+
+    st.caption(f"⚠️ {BUSINESS['note']}")
+
 
-st.caption(f"⚠️ {BUSINESS['note']}")
\ No newline at end of file
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,8 @@
+import os
+import sys
+
+# the app modules live at the repository root, not in a package
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+DOCS_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))),
+                         "shikhartraders_support_docs_all_in_one.md")
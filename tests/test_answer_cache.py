@@ -0,0 +1,79 @@
+import answer_cache
+from answer_cache import AnswerCache, normalize_question, text_vector
+
+
+def test_exact_question_hits_after_normalization():
+    cache = AnswerCache()
+    cache.put("v1", "en", "What is the price of cement?", "₹415")
+    assert cache.get("v1", "en", "  what is the PRICE of cement ") == "₹415"
+    assert normalize_question("Cement ka rate?") == "cement ka rate"
+
+
+def test_entries_are_scoped_to_docs_version_and_language():
+    cache = AnswerCache()
+    cache.put("v1", "en", "delivery time", "next day")
+    assert cache.get("v2", "en", "delivery time") is None
+    assert cache.get("v1", "hi", "delivery time") is None
+
+
+def test_entries_expire_after_the_ttl(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(answer_cache.time, "time", lambda: now[0])
+    cache = AnswerCache(ttl_seconds=60)
+    cache.put("v1", "en", "delivery time", "next day")
+    now[0] += 59
+    assert cache.get("v1", "en", "delivery time") == "next day"
+    now[0] += 2
+    assert cache.get("v1", "en", "delivery time") is None
+    assert cache.stats()["entries"] == 0
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.put("v1", "en", "first", 1)
+    cache.put("v1", "en", "second", 2)
+    assert cache.get("v1", "en", "first") == 1  # now "second" is the least recently used
+    cache.put("v1", "en", "third", 3)
+    assert cache.get("v1", "en", "second") is None
+    assert cache.get("v1", "en", "first") == 1
+    assert cache.get("v1", "en", "third") == 3
+
+
+def test_similar_question_hits_semantically():
+    cache = AnswerCache(similarity_threshold=0.8)
+    question = "what is the price of weather pro 20l"
+    cache.put("v1", "en", question, "₹2500", text_vector(question))
+    paraphrase = "weather pro 20l price"
+    assert cache.get("v1", "en", paraphrase, text_vector(paraphrase)) == "₹2500"
+    assert cache.stats()["semantic_hits"] == 1
+
+
+def test_questions_with_different_numbers_never_match():
+    cache = AnswerCache(similarity_threshold=0.1)
+    question = "weather pro 20l price"
+    cache.put("v1", "en", question, "₹2500", text_vector(question))
+    other = "weather pro 10l price"
+    assert cache.get("v1", "en", other, text_vector(other)) is None
+    # a dense-style vector identical to the cached one still doesn't bridge different numbers
+    cache.put("v1", "en", "cement 50 bags", "bulk", [1.0, 0.0])
+    assert cache.get("v1", "en", "cement 60 bags", [1.0, 0.0]) is None
+
+
+def test_new_docs_version_drops_the_old_entries():
+    cache = AnswerCache()
+    cache.set_version("docs", "v1")
+    cache.put("v1", "en", "delivery time", "next day")
+    cache.set_version("docs", "v2")
+    assert cache.stats()["entries"] == 0
+
+
+def test_dense_lookup_picks_the_nearest_live_entry():
+    cache = AnswerCache(max_entries=3, similarity_threshold=0.9)
+    cache.put("v1", "en", "cement price", "cement", [1.0, 0.0, 0.0])
+    cache.put("v1", "en", "cement rate", "rate", [0.95, 0.3, 0.0])
+    cache.put("v2", "en", "cement cost", "old docs", [1.0, 0.0, 0.0])
+    assert cache.get("v1", "en", "price of cement", [0.99, 0.05, 0.0]) == "cement"
+    assert cache.get("v1", "en", "cement rates", [0.9, 0.35, 0.0]) == "rate"
+    cache.put("v1", "en", "delivery", "next day", [0.0, 0.0, 1.0])  # evicts the least recently used, v2's entry
+    assert cache.get("v2", "en", "price of cement", [1.0, 0.0, 0.0]) is None
+    assert cache.get("v1", "en", "delivery time", [0.0, 0.1, 1.0]) == "next day"
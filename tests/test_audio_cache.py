@@ -0,0 +1,70 @@
+import os
+import time
+import threading
+
+import pytest
+
+from audio_cache import AudioCache, audio_key
+
+
+def test_key_depends_on_every_speech_setting():
+    base = audio_key("hello", "coral", "tts", "calm", "mp3")
+    assert base == audio_key("hello", "coral", "tts", "calm", "mp3")
+    assert len({base, audio_key("hello", "alloy", "tts", "calm", "mp3"), audio_key("hello", "coral", "tts", "", "mp3"),
+                audio_key("hello", "coral", "tts", "calm", "opus"), audio_key("hello!", "coral", "tts", "calm", "mp3")}) == 5
+
+
+def test_put_and_get(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    assert cache.get("k") is None
+    path = cache.put("k", b"abc", "opus")
+    assert path.endswith("k.opus") and cache.get("k", "opus") == path
+    assert cache.get("k", "mp3") is None
+
+
+def test_concurrent_callers_synthesize_once(tmp_path):
+    cache = AudioCache(str(tmp_path))
+    calls = []
+    start = threading.Barrier(16)
+
+    def synthesize():
+        calls.append(1)
+        time.sleep(0.1)
+        return b"clip"
+
+    def worker(results):
+        start.wait()
+        results.append(cache.get_or_create("same", synthesize))
+
+    results = []
+    threads = [threading.Thread(target=worker, args=(results,)) for _ in range(16)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(calls) == 1
+    assert len(set(results)) == 1 and len(results) == 16
+    assert cache._key_locks == {}
+
+
+def test_failed_synthesis_releases_the_key(tmp_path):
+    cache = AudioCache(str(tmp_path))
+
+    def fail():
+        raise RuntimeError("tts down")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_create("k", fail)
+    assert cache._key_locks == {}
+    assert cache.get_or_create("k", lambda: b"ok") == cache.get("k")
+
+
+def test_least_recently_used_clips_are_evicted(tmp_path):
+    cache = AudioCache(str(tmp_path), max_bytes=300)
+    for i, key in enumerate(("a", "b", "c")):
+        os.utime(cache.put(key, b"x" * 100), (1000 + i, 1000 + i))
+    os.utime(cache.path_for("a"), (2000, 2000))  # a was played recently
+    cache.max_bytes = 250
+    cache.evict()
+    assert cache.get("b") is None
+    assert cache.get("a") and cache.get("c")
@@ -0,0 +1,143 @@
+import threading
+import urllib.error
+import urllib.request
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import audio_server
+from audio_cache import AudioCache
+
+KEY = "ab" * 32
+DATA = bytes(range(256)) * 40
+
+
+@pytest.fixture
+def base_url(tmp_path, monkeypatch):
+    cache = AudioCache(str(tmp_path))
+    cache.put(KEY, DATA, "mp3")
+    monkeypatch.setattr(audio_server, "get_audio_cache", lambda: cache)
+    server = ThreadingHTTPServer(("127.0.0.1", 0), audio_server._AudioHandler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    yield f"http://127.0.0.1:{server.server_address[1]}"
+    server.shutdown()
+
+
+def get(url, method="GET", **headers):
+    request = urllib.request.Request(url, headers={k.replace("_", "-"): v for k, v in headers.items()}, method=method)
+    try:
+        with urllib.request.urlopen(request) as response:
+            return response.status, response.headers, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.headers, e.read()
+
+
+def test_full_clip_is_immutable_and_range_capable(base_url):
+    status, headers, body = get(f"{base_url}/audio/{KEY}.mp3")
+    assert status == 200 and body == DATA
+    assert headers["Content-Type"] == "audio/mpeg"
+    assert headers["Accept-Ranges"] == "bytes"
+    assert headers["ETag"] == f'"{KEY}"'
+    assert "immutable" in headers["Cache-Control"]
+
+
+@pytest.mark.parametrize("requested, start, end", [
+    ("bytes=100-199", 100, 199),
+    ("bytes=10000-", 10000, len(DATA) - 1),
+    ("bytes=-16", len(DATA) - 16, len(DATA) - 1),
+    ("bytes=10200-99999", 10200, len(DATA) - 1),  # end past the file is clamped
+])
+def test_range_requests_get_206(base_url, requested, start, end):
+    status, headers, body = get(f"{base_url}/audio/{KEY}.mp3", Range=requested)
+    assert status == 206
+    assert headers["Content-Range"] == f"bytes {start}-{end}/{len(DATA)}"
+    assert body == DATA[start:end + 1]
+
+
+def test_unsatisfiable_range_gets_416(base_url):
+    status, headers, _ = get(f"{base_url}/audio/{KEY}.mp3", Range=f"bytes={len(DATA)}-")
+    assert status == 416
+    assert headers["Content-Range"] == f"bytes */{len(DATA)}"
+
+
+def test_matching_etag_gets_304(base_url):
+    status, headers, body = get(f"{base_url}/audio/{KEY}.mp3", If_None_Match=f'"{KEY}"')
+    assert status == 304 and body == b""
+    assert headers["ETag"] == f'"{KEY}"'
+    assert get(f"{base_url}/audio/{KEY}.mp3", If_None_Match='"other"')[0] == 200
+
+
+def test_head_and_unknown_paths(base_url):
+    status, headers, body = get(f"{base_url}/audio/{KEY}.mp3", method="HEAD")
+    assert status == 200 and body == b"" and headers["Content-Length"] == str(len(DATA))
+    assert get(f"{base_url}/audio/{'cd' * 32}.mp3")[0] == 404
+    assert get(f"{base_url}/audio/../secret.mp3")[0] == 404
+    assert get(f"{base_url}/live/{'0' * 32}")[0] == 404
+
+
+def test_segments_stream_in_order():
+    clip = audio_server.LiveClip("mp3")
+    stream = audio_server.SegmentedStream(clip)
+    first, second = stream.add(), stream.add()
+    stream.write(second, b"B1")  # buffered until the first segment ends
+    stream.write(first, b"A1")
+    stream.end(second)
+    stream.write(first, b"A2")
+    stream.finish()
+    assert not clip.done
+    stream.end(first)
+    assert clip.done and b"".join(clip.read(timeout=1)) == b"A1A2B1"
+
+
+def test_server_stays_off_without_a_public_url(monkeypatch):
+    monkeypatch.setattr(audio_server, "AUDIO_PUBLIC_URL", "")
+    monkeypatch.setattr(audio_server, "_server", None)
+    assert audio_server.start_audio_server(port=0) is None
+    assert audio_server.start_audio_server(port=18598, host="127.0.0.1") is None
+    assert audio_server.open_live_clip("mp3") is None
+
+
+def test_responses_carry_no_cors_header_unless_configured(base_url, monkeypatch):
+    assert "Access-Control-Allow-Origin" not in get(f"{base_url}/audio/{KEY}.mp3")[1]
+    monkeypatch.setattr(audio_server, "AUDIO_ALLOW_ORIGIN", "https://app.example")
+    assert get(f"{base_url}/audio/{KEY}.mp3")[1]["Access-Control-Allow-Origin"] == "https://app.example"
+
+
+@pytest.fixture
+def static_options(monkeypatch):
+    from streamlit import config
+
+    options = {"server.enableStaticServing": True, "server.baseUrlPath": ""}
+    monkeypatch.setattr(config, "get_option", options.__getitem__)
+    monkeypatch.setattr(audio_server, "_server", None)
+    return options
+
+
+def test_cached_clips_are_played_through_static_serving(tmp_path, monkeypatch, static_options):
+    monkeypatch.setattr(audio_server, "APP_STATIC_DIR", str(tmp_path))
+    path = AudioCache(str(tmp_path / "tts_cache")).put(KEY, DATA)
+    assert audio_server.audio_source(path) == f"/app/static/tts_cache/{KEY}.mp3"
+    static_options["server.enableStaticServing"] = False
+    assert audio_server.audio_source(path) == path
+
+
+def test_clips_outside_static_fall_back_to_the_file(tmp_path, monkeypatch, static_options):
+    monkeypatch.setattr(audio_server, "APP_STATIC_DIR", str(tmp_path / "static"))
+    path = AudioCache(str(tmp_path / "elsewhere")).put(KEY, DATA)
+    assert audio_server.audio_source(path) == path
+    assert audio_server.audio_source(str(tmp_path / "evicted.mp3")) is None
+
+
+def test_abandoned_live_clips_are_dropped(monkeypatch):
+    monkeypatch.setattr(audio_server, "_server", object())
+    monkeypatch.setattr(audio_server, "_live", {})
+    monkeypatch.setattr(audio_server, "MAX_LIVE_CLIPS", 3)
+    clips = [audio_server.open_live_clip("mp3") for _ in range(3)]
+    clips[0].opened_at -= audio_server.LIVE_CLIP_MAX_AGE_SECONDS + 1  # opened long ago, never closed
+    newest = audio_server.open_live_clip("mp3")
+    assert clips[0].done and clips[0].error == "expired"
+    assert list(audio_server._live) == [clips[1].id, clips[2].id, newest.id]
+
+    audio_server.open_live_clip("mp3")  # over the cap: the oldest goes
+    assert clips[1].done and clips[1].id not in audio_server._live
+    assert len(audio_server._live) == 3
@@ -0,0 +1,118 @@
+import pytest
+
+from catalog import CatalogBuilder, build_catalog, detect_language
+
+from conftest import DOCS_FILE
+
+
+@pytest.fixture(scope="module")
+def docs():
+    with open(DOCS_FILE, encoding="utf-8") as f:
+        return f.read()
+
+
+@pytest.fixture(scope="module")
+def catalog(docs):
+    return build_catalog(docs)
+
+
+def test_products_are_parsed_from_the_docs(catalog):
+    prices = {p["name"]: (p["price"], p["unit"]) for p in catalog.products}
+    assert prices == {
+        "UltraTech Paper Bag": (405, "bag"),
+        "UltraTech Super": (415, "bag"),
+        "UltraTech Weather Plus": (420, "bag"),
+        "Weather Pro 1 Litre": (175, "pack"),
+        "Weather Pro 5 Litre": (750, "pack"),
+        "Weather Pro 10 Litre": (1450, "pack"),
+        "Weather Pro 20 Litre": (2500, "pack"),
+        "Iron Ring": (12, "piece"),
+    }
+    iron_ring = next(p for p in catalog.products if p["name"] == "Iron Ring")
+    assert iron_ring["bulk_only"] and iron_ring["min_order"] == "120+ pieces"
+    assert catalog.contacts["phones"] == ["07355969446", "09450805567"]
+    assert catalog.contacts["email"] == "shikhartraders@zohomail.com"
+
+
+@pytest.mark.parametrize("question, expected", [
+    ("What is the price of UltraTech Super cement?", "**UltraTech Super** — approx ₹415 per bag."),
+    ("UltraTech Super cement ka rate kya hai?", "**UltraTech Super** ka approx rate ₹415 per bag hai."),
+    ("Weather Plus price?", "**UltraTech Weather Plus** — approx ₹420 per bag."),
+    ("Weather Pro 20L ka rate kya hai?", "**Weather Pro 20 Litre** ka approx rate ₹2500 hai."),
+    ("Weather Pro 10 litre kitne ka hai?", "**Weather Pro 10 Litre** ka approx rate ₹1450 hai."),
+    ("Weather Pro 5 ltr price", "**Weather Pro 5 Litre** — approx ₹750."),
+    ("वेदर प्रो 20 लीटर का रेट", "**Weather Pro 20 Litre** का लगभग रेट ₹2500 है।"),
+    ("Iron ring price?", "**Iron Ring** — approx ₹12 per piece."),
+])
+def test_price_and_pack_questions_get_the_listed_price(catalog, question, expected):
+    answer = catalog.answer(question)
+    assert answer.split("\n")[0] == expected
+    assert "07355969446" in answer  # every price comes with the disclaimer and the numbers to confirm it
+
+
+def test_bulk_products_state_the_minimum_order(catalog):
+    assert "minimum order: 120+ pieces" in catalog.answer("How much is one iron ring piece?")
+
+
+def test_family_and_category_questions_list_every_product(catalog):
+    weather_pro = catalog.answer("Weather Pro price")
+    for price in ("₹175", "₹750", "₹1450", "₹2500"):
+        assert price in weather_pro
+    cement = catalog.answer("सीमेंट का रेट क्या है?")
+    assert cement.startswith("- UltraTech Paper Bag: ₹405 प्रति बैग लगभग")
+    assert "₹415" in cement and "₹420" in cement and "Weather Pro" not in cement
+
+
+@pytest.mark.parametrize("question", [
+    # comparisons and advice need the model
+    "Which is better, UltraTech Super or Weather Plus?",
+    "Compare UltraTech Super and Paper Bag prices",
+    "UltraTech Super vs Weather Plus",
+    # pack sizes and quantities the catalog doesn't list
+    "Weather Pro 15L price?",
+    "Weather Pro 3 litre ka rate",
+    "Iron ring 100 pieces price",
+    # other brands
+    "ACC cement price?",
+    "Ambuja cement ka rate kya hai?",
+    "Asian Paints Apex price",
+    "Berger waterproofing price",
+    # not price or contact questions
+    "How long does delivery take?",
+    "Can I return cement bags?",
+    "What are the uses of Weather Pro?",
+    "",
+])
+def test_anything_else_falls_through_to_the_model(catalog, question):
+    assert catalog.answer(question) is None
+
+
+def test_contact_questions_list_the_store_contacts(catalog):
+    answer = catalog.answer("What is your phone number?")
+    assert answer.startswith("Contact Shikhar Traders:")
+    assert "07355969446 / 09450805567" in answer
+    assert "maps.app.goo.gl" in catalog.answer("Where is your shop located?")
+
+
+def test_answer_language_follows_the_question_or_setting(catalog):
+    assert detect_language("Weather Pro 20L ka rate kya hai?") == "hinglish"
+    assert detect_language("सीमेंट का रेट क्या है?") == "hi"
+    assert detect_language("What is the price?") == "en"
+    assert catalog.answer("Iron ring price?", "hi").startswith("**Iron Ring** का लगभग रेट ₹12 प्रति पीस है।")
+
+
+def test_streamed_pages_build_the_same_catalog(docs, catalog):
+    builder = CatalogBuilder()
+    pages = docs.split("\n## ")
+    builder.add(pages[0])
+    for page in pages[1:]:
+        builder.add("## " + page)
+    streamed = builder.build()
+    assert streamed.products == catalog.products
+    assert streamed.contacts == catalog.contacts
+
+
+def test_override_contacts_win(docs):
+    catalog = build_catalog(docs, {"name": "Shop", "phones": ["01234567890"]})
+    assert catalog.answer("phone number?").startswith("Contact Shop:")
+    assert "01234567890" in catalog.answer("Iron ring price?")
@@ -0,0 +1,41 @@
+from chunk_store import ChunkStore, get_chunk_store
+
+
+def rows(n: int, version: str = "h"):
+    return [{"id": f"id-{i}", "content_hash": f"{version}{i}", "content": f"text {i}", "metadata": {"title": f"T{i}"}}
+            for i in range(n)]
+
+
+def test_put_get_and_replace(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.sqlite3"))
+    store.put("docs", rows(3))
+    assert store.get("docs", ["id-1", "id-9"]) == {"id-1": {"title": "T1", "content_hash": "h1", "content": "text 1"}}
+    store.put("docs", [{"id": "id-1", "content_hash": "new", "content": "changed"}])
+    assert store.get("docs", ["id-1"])["id-1"]["content"] == "changed"
+    assert store.hashes("docs", ["id-0", "id-1"]) == {"id-0": "h0", "id-1": "new"}
+
+
+def test_collections_are_separate(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.sqlite3"))
+    store.put("a", rows(2))
+    assert store.get("b", ["id-0"]) == {}
+    assert store.count("a") == 2 and store.count("b") == 0
+
+
+def test_large_id_lists_and_delete(tmp_path):
+    store = ChunkStore(str(tmp_path / "chunks.sqlite3"))
+    store.put("docs", rows(2500))  # more IDs than one SQL statement may bind
+    ids = [f"id-{i}" for i in range(2500)]
+    assert len(store.get("docs", ids)) == 2500
+    store.delete("docs", ids[:2000])
+    assert store.count("docs") == 500
+    assert len(store.hashes("docs", ids)) == 500
+
+
+def test_store_persists_and_is_shared_per_path(tmp_path):
+    path = str(tmp_path / "chunks.sqlite3")
+    store = ChunkStore(path)
+    store.put("docs", rows(1))
+    store.close()
+    assert get_chunk_store(path) is get_chunk_store(path)
+    assert get_chunk_store(path).get("docs", ["id-0"])["id-0"]["content"] == "text 0"
@@ -0,0 +1,85 @@
+from chunking import chunk_markdown, chunk_pages, estimate_tokens, split_sections, _split_oversized
+
+PAGE = """# Products
+
+Intro to the catalog.
+
+## Cement
+
+### UltraTech Super
+
+Price is about ₹415 per bag.
+
+## Paints
+
+Weather Pro comes in 10L and 20L packs.
+"""
+
+
+def test_sections_carry_their_heading_path():
+    paths = [path for path, _ in split_sections(PAGE)]
+    assert paths == [["# Products"], ["# Products", "## Cement", "### UltraTech Super"], ["# Products", "## Paints"]]
+
+
+def test_chunks_start_with_their_headings():
+    chunks = chunk_markdown(PAGE)
+    super_chunk = next(c for c in chunks if "₹415" in c["content"])
+    assert super_chunk["heading_path"] == ["# Products", "## Cement", "### UltraTech Super"]
+    assert super_chunk["content"].startswith("# Products\n## Cement\n### UltraTech Super")
+    # a sibling section doesn't inherit the previous one's deeper heading
+    paints = next(c for c in chunks if "Weather Pro" in c["content"])
+    assert paints["heading_path"] == ["# Products", "## Paints"]
+
+
+def test_headings_inside_code_fences_are_body_text():
+    page = "# Setup\n\n```\n# not a heading\n```\n"
+    assert [path for path, _ in split_sections(page)] == [["# Setup"]]
+
+
+def test_long_sections_stay_under_the_token_cap():
+    paragraphs = "\n\n".join(f"Paragraph {i} " + "word " * 40 for i in range(40))
+    chunks = chunk_markdown(f"# Guide\n\n## Details\n\n{paragraphs}", max_tokens=120, overlap_tokens=20)
+    assert len(chunks) > 5
+    for chunk in chunks:
+        assert chunk["heading_path"] == ["# Guide", "## Details"]
+        assert estimate_tokens(chunk["content"]) <= 120
+    # every paragraph survives the split
+    text = "\n".join(c["content"] for c in chunks)
+    assert all(f"Paragraph {i} " in text for i in range(40))
+
+
+def test_consecutive_chunks_overlap():
+    paragraphs = "\n\n".join(f"Sentence number {i} is here." for i in range(60))
+    chunks = chunk_markdown(paragraphs, max_tokens=60, overlap_tokens=15)
+    assert len(chunks) > 2
+    first_tail = chunks[0]["content"].split("\n\n")[-1]
+    assert first_tail in chunks[1]["content"]
+
+
+def test_oversized_table_repeats_its_header():
+    header = "| Product | Pack | Price |\n|---|---|---|"
+    rows = "\n".join(f"| Weather Pro {i} | {i}L | ₹{100 + i} |" for i in range(60))
+    pieces = _split_oversized(f"{header}\n{rows}", max_tokens=80)
+    assert len(pieces) > 2
+    for piece in pieces:
+        assert piece.startswith(header + "\n")
+        assert estimate_tokens(piece) <= 80
+    body_rows = [line for piece in pieces for line in piece.split("\n")[2:]]
+    assert body_rows == rows.split("\n")
+
+
+def test_tables_are_not_carried_over_as_overlap():
+    header = "| Product | Price |\n|---|---|"
+    rows = "\n".join(f"| Item {i} | ₹{i} |" for i in range(80))
+    chunks = chunk_markdown(f"# Prices\n\n{header}\n{rows}", max_tokens=100, overlap_tokens=30)
+    for chunk in chunks:
+        table = [line for line in chunk["content"].split("\n") if line.startswith("|")]
+        assert table[:2] == header.split("\n")
+
+
+def test_chunk_pages_keeps_page_metadata():
+    pages = [{"content": PAGE, "url": "https://docs/x", "metadata": {"title": "X"}}, {"content": "  ", "url": "empty"}]
+    chunks = chunk_pages(pages)
+    assert {c["url"] for c in chunks} == {"https://docs/x"}
+    assert [c["chunk_index"] for c in chunks] == list(range(len(chunks)))
+    assert chunks[1]["metadata"] == {"title": "X", "heading": "# Products > ## Cement > ### UltraTech Super"}
@@ -0,0 +1,39 @@
+from conversation import ConversationMemory
+
+
+def memory_after(*questions: str) -> ConversationMemory:
+    memory = ConversationMemory()
+    for question in questions:
+        memory.add({"role": "user", "content": question})
+        memory.add({"role": "assistant", "content": "Approx ₹1450."})
+    return memory
+
+
+def test_first_question_is_never_a_follow_up():
+    assert ConversationMemory().contextual_query("10L?") == "10L?"
+
+
+def test_self_contained_short_questions_are_not_rewritten():
+    memory = memory_after("Weather Pro 10L price?")
+    for question in ("Cement price?", "Delivery time?", "Payment methods?", "सीमेंट का रेट?"):
+        assert not memory.is_follow_up(question)
+        assert memory.contextual_query(question) == question
+
+
+def test_questions_without_a_product_or_intent_lean_on_the_topic():
+    memory = memory_after("Weather Pro 10L price?")
+    assert memory.contextual_query("20L?") == "Weather Pro price? 20L?"
+    assert memory.contextual_query("Kitna?") == "Weather Pro 10L price? Kitna?"
+
+
+def test_follow_up_openers_lean_on_the_topic():
+    memory = memory_after("Weather Pro 10L price?")
+    assert memory.contextual_query("and the 20 litre one?") == "Weather Pro price? and the 20 litre one?"
+    assert memory.is_follow_up("uska delivery time?")
+
+
+def test_a_chain_of_follow_ups_keeps_the_standalone_topic():
+    memory = memory_after("Weather Pro 10L price?", "20L?", "and 1L?")
+    assert memory.topic() == "Weather Pro 10L price?"
+    memory.add({"role": "user", "content": "Cement price?"})
+    assert memory.topic() == "Cement price?"
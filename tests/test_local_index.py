@@ -0,0 +1,126 @@
+import warnings
+
+import numpy as np
+import pytest
+from qdrant_client import QdrantClient
+from qdrant_client.http import models
+
+from local_index import LocalVectorIndex
+
+DIM = 16
+
+
+def points(n: int, seed: int = 0):
+    rng = np.random.default_rng(seed)
+    return [models.PointStruct(id=f"00000000-0000-0000-0000-{i:012d}", vector=rng.normal(size=DIM).tolist(),
+                               payload={"url": f"page-{i % 4}", "chunk_index": i, "content": f"chunk {i}"})
+            for i in range(n)]
+
+
+@pytest.fixture
+def clients(tmp_path):
+    """The embedded index and an in-process Qdrant with the same collection."""
+    qdrant = QdrantClient(location=":memory:")
+    local = LocalVectorIndex(str(tmp_path / "index"))
+    for client in (qdrant, local):
+        client.create_collection("docs", vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    yield qdrant, local
+    qdrant.close()
+
+
+def search(client, query, **kwargs):
+    with warnings.catch_warnings():
+        warnings.simplefilter("ignore")  # in-process Qdrant notes it does exact search
+        response = client.query_points("docs", query=query, **kwargs)
+    return [(str(p.id), round(p.score, 5), p.payload) for p in response.points]
+
+
+def test_search_matches_qdrant(clients):
+    qdrant, local = clients
+    for client in clients:
+        client.upsert("docs", points=points(50), wait=True)
+    rng = np.random.default_rng(1)
+    for _ in range(5):
+        query = rng.normal(size=DIM).tolist()
+        assert search(local, query, limit=7) == search(qdrant, query, limit=7)
+
+
+def test_filtered_search_and_scroll_match_qdrant(clients):
+    qdrant, local = clients
+    for client in clients:
+        client.upsert("docs", points=points(30), wait=True)
+    only = models.Filter(must=[models.FieldCondition(key="url", match=models.MatchAny(any=["page-1", "page-2"]))])
+    query = np.random.default_rng(2).normal(size=DIM).tolist()
+    assert search(local, query, limit=5, query_filter=only) == search(qdrant, query, limit=5, query_filter=only)
+
+    def scroll_all(client):
+        found, offset = {}, None
+        while True:
+            records, offset = client.scroll("docs", scroll_filter=only, with_payload=["chunk_index"], limit=4, offset=offset)
+            found.update({str(r.id): r.payload for r in records})
+            if offset is None:
+                return found
+
+    assert scroll_all(local) == scroll_all(qdrant)
+
+
+def test_upsert_overwrites_and_delete_removes(clients):
+    qdrant, local = clients
+    first, second = points(10, seed=0), points(10, seed=3)
+    for client in clients:
+        client.upsert("docs", points=first, wait=True)
+        client.upsert("docs", points=second[:4], wait=True)  # same IDs, new vectors
+        client.delete("docs", points_selector=models.PointIdsList(points=[first[9].id, first[8].id]), wait=True)
+    assert local.count("docs").count == qdrant.count("docs").count == 8
+    query = second[0].vector
+    assert search(local, query, limit=3) == search(qdrant, query, limit=3)
+    assert search(local, query, limit=1)[0][0] == second[0].id
+
+
+def test_index_survives_a_reopen(tmp_path):
+    path = str(tmp_path / "index")
+    local = LocalVectorIndex(path)
+    local.create_collection("docs", vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    local.upsert("docs", points=points(12), wait=True)
+    query = points(1, seed=9)[0].vector
+    before = search(local, query, limit=4)
+    local.close()
+    assert search(LocalVectorIndex(path), query, limit=4) == before
+
+
+def test_collection_errors(tmp_path):
+    local = LocalVectorIndex(str(tmp_path / "index"))
+    config = models.VectorParams(size=DIM, distance=models.Distance.COSINE)
+    local.create_collection("docs", vectors_config=config)
+    with pytest.raises(ValueError, match="already exists"):
+        local.create_collection("docs", vectors_config=config)
+    with pytest.raises(ValueError, match="not found"):
+        local.query_points("missing", query=[0.0] * DIM)
+    assert local.query_points("docs", query=[1.0] * DIM, limit=5).points == []  # empty collection
+    local.upsert("docs", points=points(3), wait=True)
+    assert local.query_points("docs", query=[1.0] * DIM, limit=0).points == []
+    unsupported = models.Filter(must=[models.FieldCondition(key="chunk_index", range=models.Range(gte=1))])
+    with pytest.raises(ValueError, match="Unsupported filter"):
+        local.query_points("docs", query=[1.0] * DIM, query_filter=unsupported)
+    with pytest.raises(ValueError, match="Vector size"):
+        local.upsert("docs", points=[models.PointStruct(id=1, vector=[1.0, 0.0], payload={})])
+
+
+def test_upserts_stay_in_memory_until_flush(tmp_path):
+    path = str(tmp_path / "index")
+    local = LocalVectorIndex(path)
+    local.create_collection("docs", vectors_config=models.VectorParams(size=DIM, distance=models.Distance.COSINE))
+    batch = points(200)
+    for start in range(0, len(batch), 7):  # many small batches grow the buffer several times
+        local.upsert("docs", points=batch[start:start + 7], wait=True)
+    query = batch[123].vector
+    assert search(local, query, limit=1)[0][0] == batch[123].id
+    assert LocalVectorIndex(path).count("docs").count == 0  # nothing written yet
+
+    local.flush()
+    reopened = LocalVectorIndex(path)
+    assert reopened.count("docs").count == 200
+    assert search(reopened, query, limit=5) == search(local, query, limit=5)
+    reopened.upsert("docs", points=points(3, seed=4), wait=True)  # the loaded memory map is copied before writing
+    assert reopened.count("docs").count == 200
+    assert search(reopened, points(3, seed=4)[2].vector, limit=1)[0][0] == batch[2].id
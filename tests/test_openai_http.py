@@ -0,0 +1,110 @@
+import json
+import time
+import threading
+import email.utils
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+import requests
+
+import openai_http
+from openai_http import TokenBucket, get_rate_limiter, openai_post, retry_after_seconds
+
+
+def test_bucket_refills_at_its_per_minute_rate(monkeypatch):
+    now = [100.0]
+    monkeypatch.setattr(openai_http.time, "monotonic", lambda: now[0])
+    bucket = TokenBucket(per_minute=60)
+    bucket.acquire(60)
+    assert bucket.tokens == 0
+    now[0] += 30
+    bucket._refill(now[0])
+    assert bucket.tokens == pytest.approx(30)
+    now[0] += 600
+    bucket._refill(now[0])
+    assert bucket.tokens == 60  # never above capacity
+
+
+def test_acquire_waits_for_the_refill():
+    bucket = TokenBucket(per_minute=6000)  # 100 tokens per second
+    bucket.acquire(6000)
+    started = time.monotonic()
+    bucket.acquire(10)
+    assert 0.05 <= time.monotonic() - started < 1.0
+
+
+def test_block_pauses_every_caller():
+    bucket = TokenBucket(per_minute=6000)
+    bucket.block(0.2)
+    started = time.monotonic()
+    bucket.acquire(1)
+    assert time.monotonic() - started >= 0.15
+
+
+def test_retry_after_headers():
+    response = requests.Response()
+    response.headers["retry-after-ms"] = "250"
+    assert retry_after_seconds(response) == 0.25
+    response = requests.Response()
+    response.headers["Retry-After"] = "3"
+    assert retry_after_seconds(response) == 3.0
+    response = requests.Response()
+    response.headers["Retry-After"] = email.utils.formatdate(time.time() + 20, usegmt=True)
+    assert 15 <= retry_after_seconds(response) <= 21
+    assert retry_after_seconds(requests.Response()) is None
+
+
+@pytest.fixture
+def openai_server(monkeypatch):
+    """Answers POSTs with the queued (status, headers) replies, then 200."""
+    replies, calls = [], []
+
+    class Handler(BaseHTTPRequestHandler):
+        def log_message(self, *args):
+            pass
+
+        def do_POST(self):
+            calls.append(json.loads(self.rfile.read(int(self.headers["Content-Length"]))))
+            status, headers = replies.pop(0) if replies else (200, {})
+            body = json.dumps({"ok": status == 200}).encode()
+            self.send_response(status)
+            for name, value in headers.items():
+                self.send_header(name, value)
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, kwargs={"poll_interval": 0.05}, daemon=True).start()
+    monkeypatch.setattr(openai_http, "OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_address[1]}")
+    monkeypatch.setattr(openai_http, "RETRY_BASE_SECONDS", 0.01)
+    yield replies, calls
+    server.shutdown()
+
+
+def test_post_retries_a_429_after_the_requested_delay(openai_server):
+    replies, calls = openai_server
+    replies.append((429, {"retry-after-ms": "200"}))
+    started = time.monotonic()
+    response = openai_post("sk-test-429", "chat/completions", {"messages": [{"content": "hi"}]})
+    assert response.status_code == 200
+    assert len(calls) == 2
+    assert time.monotonic() - started >= 0.2
+    # the 429 paused the shared limiter for every other caller of this key and endpoint
+    assert get_rate_limiter("sk-test-429", "chat/completions").requests.blocked_until > 0
+
+
+def test_post_returns_the_last_response_when_retries_run_out(openai_server, monkeypatch):
+    replies, calls = openai_server
+    monkeypatch.setattr(openai_http, "OPENAI_MAX_RETRIES", 2)
+    replies.extend([(503, {})] * 5)
+    response = openai_post("sk-test-503", "audio/speech", {"input": "hello"})
+    assert response.status_code == 503
+    assert len(calls) == 3
+
+
+def test_post_does_not_retry_client_errors(openai_server):
+    replies, calls = openai_server
+    replies.append((400, {}))
+    assert openai_post("sk-test-400", "chat/completions", {"messages": []}).status_code == 400
+    assert len(calls) == 1
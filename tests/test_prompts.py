@@ -0,0 +1,28 @@
+import pytest
+
+import prompts
+from conftest import DOCS_FILE
+from prompts import PromptBudgetExceeded, assemble_messages, count_message_tokens, fits_prefix
+
+
+def test_docs_stay_out_of_the_prefix_by_default():
+    with open(DOCS_FILE, encoding="utf-8") as f:
+        docs = f.read()
+    assert not fits_prefix(docs)
+    assert not fits_prefix("tiny docs")
+
+
+def test_tiny_docs_fit_only_when_opted_in(monkeypatch):
+    monkeypatch.setattr(prompts, "DOCS_PREFIX_MAX_TOKENS", 50)
+    assert fits_prefix("tiny docs")
+    assert not fits_prefix("word " * 500)
+
+
+def test_oldest_history_is_dropped_to_fit_the_budget():
+    history = [{"role": "user", "content": f"question {i} " * 20} for i in range(10)]
+    messages = assemble_messages("prefix", "suffix", history, budget=200)
+    assert messages[0]["content"] == "prefix" and messages[-1]["content"] == "suffix"
+    assert count_message_tokens(messages) <= 200
+    assert 2 < len(messages) < 12 and messages[1:-1] == history[len(history) - (len(messages) - 2):]
+    with pytest.raises(PromptBudgetExceeded):
+        assemble_messages("prefix " * 100, "suffix", budget=50)
@@ -0,0 +1,46 @@
+import threading
+import time
+
+from qdrant_client import QdrantClient
+
+import resources
+from local_index import LocalVectorIndex
+from resources import is_remote_qdrant
+
+
+def test_only_server_clients_count_as_remote(tmp_path):
+    assert is_remote_qdrant(QdrantClient(url="http://qdrant.invalid:6333", check_compatibility=False))
+    assert not is_remote_qdrant(QdrantClient(location=":memory:"))
+    assert not is_remote_qdrant(QdrantClient(path=str(tmp_path / "qdrant")))
+    assert not is_remote_qdrant(LocalVectorIndex(str(tmp_path / "index")))
+
+
+def test_idle_resources_are_released_but_not_the_in_memory_index(monkeypatch):
+    monkeypatch.setattr(resources, "_entries", {})
+    closed = []
+    resources._get_or_create(("model",), object, close=closed.append)
+    index = resources.get_qdrant_client(":memory:", "")
+    assert resources.release_idle(max_idle_seconds=-1) == 1
+    assert len(closed) == 1
+    assert resources.get_qdrant_client(":memory:", "") is index
+
+
+def test_build_locks_are_dropped_once_built(monkeypatch):
+    monkeypatch.setattr(resources, "_entries", {})
+    monkeypatch.setattr(resources, "_build_locks", {})
+    builds = []
+
+    def build():
+        builds.append(1)
+        time.sleep(0.05)
+        return object()
+
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(resources._get_or_create(("slow",), build)))
+               for _ in range(8)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert len(builds) == 1 and len({id(r) for r in results}) == 1
+    assert resources._build_locks == {}
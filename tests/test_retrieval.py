@@ -0,0 +1,41 @@
+from retrieval import BM25Index, build_docs_index, reciprocal_rank_fusion, retrieve_context, tokenize
+
+from conftest import DOCS_FILE
+
+
+def test_rrf_rewards_agreement_between_rankings():
+    fused = reciprocal_rank_fusion([["a", "b", "c"], ["b", "d", "a"]])
+    # b is near the top of both lists, a tops one but is last in the other, d and c are in one list each
+    assert [pid for pid, _ in fused] == ["b", "a", "d", "c"]
+    scores = dict(fused)
+    assert scores["b"] == 1 / 62 + 1 / 61
+    assert scores["c"] == 1 / 63
+
+
+def test_rrf_keeps_a_single_ranking_in_order():
+    assert [pid for pid, _ in reciprocal_rank_fusion([["x", "y", "z"]])] == ["x", "y", "z"]
+    assert reciprocal_rank_fusion([[], []]) == []
+
+
+def test_tokenize_normalizes_packs_and_price_words():
+    assert tokenize("Weather Pro 20L ka rate kya hai?") == ["weather", "pro", "20", "l", "price"]
+    assert tokenize("20 litre") == tokenize("20 ltr") == tokenize("20 लीटर") == ["20", "l"]
+
+
+def test_bm25_ranks_exact_terms_first():
+    index = BM25Index([
+        {"content": "Weather Pro 10L costs ₹1450."},
+        {"content": "Weather Pro 20L costs ₹2500."},
+        {"content": "Delivery takes one day."},
+    ])
+    hits = index.search("weather pro 20 litre price", k=2)
+    assert hits[0][1]["content"] == "Weather Pro 20L costs ₹2500."
+    assert index.search("nothing matches this", k=2) == []
+
+
+def test_retrieve_context_from_the_bundled_docs():
+    with open(DOCS_FILE, encoding="utf-8") as f:
+        index = build_docs_index(f.read())
+    assert "₹2500" in retrieve_context(index, "Weather Pro 20L ka rate kya hai?", k=2)
+    # no term in common: the first sections, not an empty context
+    assert retrieve_context(index, "zzzz", k=1) == index.sections[0]["content"]
@@ -0,0 +1,35 @@
+import threading
+
+from audio_server import LiveClip, SegmentedStream
+from speech_pipeline import SpeechPipeline
+
+SENTENCES = "".join(f"This is sentence number {i} of a long streamed answer. " for i in range(6))
+
+
+def test_segments_play_in_order():
+    pipeline = SpeechPipeline(lambda text, sink=None: text.encode(), max_parallel=3)
+    pipeline.feed(SENTENCES)
+    pipeline.finish()
+    played = []
+    pipeline.play_ready(played.append, block=True)
+    assert b"".join(played) == pipeline.audio()
+    assert [p.decode().split()[4] for p in played] == [str(i) for i in range(6)]
+
+
+def test_cancel_stops_pending_speech_and_closes_the_live_clip():
+    release = threading.Event()
+    calls = []
+
+    def synthesize(text, sink=None):
+        calls.append(text)
+        release.wait(5)
+        return b"x"
+
+    clip = LiveClip("mp3")
+    pipeline = SpeechPipeline(synthesize, max_parallel=1, stream=SegmentedStream(clip))
+    pipeline.feed(SENTENCES)
+    pipeline.cancel()
+    assert clip.done and clip.error == "cancelled"
+    release.set()
+    pipeline.pool.shutdown(wait=True)
+    assert len(calls) <= 1  # at most the segment already running when the answer failed
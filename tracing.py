@@ -0,0 +1,246 @@
+import os
+import sys
+import json
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# -----------------------------
+# Lightweight request tracing + Prometheus metrics
+# -----------------------------
+# trace() opens one trace per request (a chat answer, an ingestion run, ...);
+# span() times a stage inside it. The current trace lives in a context variable,
+# so spans opened in asyncio tasks and asyncio.to_thread() calls join it too.
+# Every span also feeds process-wide metrics, served in Prometheus text format by
+# start_metrics_server() when METRICS_PORT is set. Each finished trace is written
+# as one JSON log line.
+METRICS_PORT = int(os.getenv("METRICS_PORT", "0"))
+METRICS_HOST = os.getenv("METRICS_HOST", "0.0.0.0")
+TRACE_LOG = os.getenv("TRACE_LOG", "1") == "1"
+METRIC_PREFIX = "shikhar"
+
+STAGE_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+# span attributes that are also counted as metrics
+TOKEN_ATTRS = {"prompt_tokens": "prompt", "completion_tokens": "completion", "cached_tokens": "cached"}
+BYTE_ATTRS = {"bytes_in": "in", "bytes_out": "out"}
+
+logger = logging.getLogger("shikhartraders.trace")
+if not logger.handlers:
+    _handler = logging.StreamHandler(sys.stderr)
+    _handler.setFormatter(logging.Formatter("%(message)s"))
+    logger.addHandler(_handler)
+    logger.setLevel(logging.INFO)
+    logger.propagate = False
+
+
+# -----------------------------
+# Metrics
+# -----------------------------
+class Metrics:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.counters: Dict[str, Dict[Tuple, float]] = {}
+        self.histograms: Dict[str, Dict[Tuple, List[float]]] = {}  # label set -> bucket counts + [sum, count]
+        self.help: Dict[str, str] = {}
+
+    def increment(self, name: str, value: float = 1.0, help_text: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.help.setdefault(name, help_text)
+            series = self.counters.setdefault(name, {})
+            series[key] = series.get(key, 0.0) + value
+
+    def observe(self, name: str, value: float, help_text: str = "", **labels):
+        key = tuple(sorted(labels.items()))
+        with self._lock:
+            self.help.setdefault(name, help_text)
+            series = self.histograms.setdefault(name, {})
+            counts = series.setdefault(key, [0.0] * (len(STAGE_BUCKETS) + 2))
+            for i, bound in enumerate(STAGE_BUCKETS):
+                if value <= bound:
+                    counts[i] += 1
+            counts[-2] += value
+            counts[-1] += 1
+
+    def render(self) -> str:
+        """Prometheus text exposition format."""
+        def labels_text(key, extra=()):
+            pairs = list(key) + list(extra)
+            if not pairs:
+                return ""
+            return "{" + ",".join(f'{k}="{str(v).replace(chr(34), chr(39))}"' for k, v in pairs) + "}"
+
+        lines = []
+        with self._lock:
+            for name, series in sorted(self.counters.items()):
+                full = f"{METRIC_PREFIX}_{name}_total"
+                lines += [f"# HELP {full} {self.help.get(name) or name}", f"# TYPE {full} counter"]
+                lines += [f"{full}{labels_text(key)} {value:g}" for key, value in sorted(series.items())]
+            for name, series in sorted(self.histograms.items()):
+                full = f"{METRIC_PREFIX}_{name}"
+                lines += [f"# HELP {full} {self.help.get(name) or name}", f"# TYPE {full} histogram"]
+                for key, counts in sorted(series.items()):
+                    for bound, count in zip(STAGE_BUCKETS, counts):
+                        lines.append(f"{full}_bucket{labels_text(key, [('le', bound)])} {count:g}")
+                    lines.append(f"{full}_bucket{labels_text(key, [('le', '+Inf')])} {counts[-1]:g}")
+                    lines.append(f"{full}_sum{labels_text(key)} {counts[-2]:.6f}")
+                    lines.append(f"{full}_count{labels_text(key)} {counts[-1]:g}")
+        return "\n".join(lines) + "\n"
+
+
+metrics = Metrics()
+
+
+def cache_event(cache: str, hit: bool):
+    """Count a cache lookup and note it on the current trace."""
+    result = "hit" if hit else "miss"
+    metrics.increment("cache_lookups", help_text="Cache lookups by cache and result.", cache=cache, result=result)
+    current = _current_trace.get()
+    if current:
+        current.set(**{f"{cache}_cache": result})
+
+
+# -----------------------------
+# Traces and spans
+# -----------------------------
+class Trace:
+    def __init__(self, name: str, **attrs):
+        self.name = name
+        self.id = uuid.uuid4().hex[:16]
+        self.started = time.perf_counter()
+        self.timestamp = time.time()
+        self.duration = 0.0
+        self.status = "ok"
+        self.attrs = dict(attrs)
+        self.spans: List[Dict] = []
+        self._lock = threading.Lock()
+
+    def set(self, **attrs):
+        with self._lock:
+            self.attrs.update(attrs)
+
+    def add_span(self, span: Dict):
+        with self._lock:
+            self.spans.append(span)
+
+    def breakdown(self) -> List[Tuple[str, float, int]]:
+        """(stage, total seconds, calls) in order of first appearance."""
+        totals: Dict[str, List] = {}
+        with self._lock:
+            for s in self.spans:
+                entry = totals.setdefault(s["name"], [0.0, 0])
+                entry[0] += s["ms"] / 1000
+                entry[1] += 1
+        return [(name, seconds, calls) for name, (seconds, calls) in totals.items()]
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {"trace": self.name, "id": self.id, "ts": round(self.timestamp, 3),
+                    "duration_ms": round(self.duration * 1000, 2), "status": self.status,
+                    "attrs": dict(self.attrs), "spans": list(self.spans)}
+
+
+_current_trace: "contextvars.ContextVar[Optional[Trace]]" = contextvars.ContextVar("current_trace", default=None)
+
+
+@contextmanager
+def trace(name: str, **attrs) -> Iterator[Trace]:
+    current = Trace(name, **attrs)
+    token = _current_trace.set(current)
+    try:
+        yield current
+    except BaseException as e:
+        current.status = type(e).__name__
+        raise
+    finally:
+        _current_trace.reset(token)
+        current.duration = time.perf_counter() - current.started
+        metrics.observe("request_seconds", current.duration, help_text="End-to-end time per traced request.",
+                        request=name, status="ok" if current.status == "ok" else "error")
+        if TRACE_LOG:
+            logger.info(json.dumps(current.to_dict(), ensure_ascii=False, default=str))
+
+
+@contextmanager
+def span(name: str, **attrs) -> Iterator[Dict]:
+    """Time a stage. The yielded dict takes attributes; token and byte counts become metrics."""
+    current = _current_trace.get()
+    started = time.perf_counter()
+    data = dict(attrs)
+    status = "ok"
+    try:
+        yield data
+    except BaseException as e:
+        status = type(e).__name__
+        raise
+    finally:
+        elapsed = time.perf_counter() - started
+        metrics.observe("stage_seconds", elapsed, help_text="Time spent per pipeline stage.", stage=name)
+        for attr, kind in TOKEN_ATTRS.items():
+            if data.get(attr):
+                metrics.increment("tokens", data[attr], help_text="Model tokens by stage and kind.", stage=name, kind=kind)
+        for attr, direction in BYTE_ATTRS.items():
+            if data.get(attr):
+                metrics.increment("bytes", data[attr], help_text="Payload bytes by stage and direction.",
+                                  stage=name, direction=direction)
+        if current:
+            current.add_span({"name": name, "start_ms": round((started - current.started) * 1000, 2),
+                              "ms": round(elapsed * 1000, 2), "status": status, **data})
+
+
+def format_breakdown(current: Trace) -> str:
+    """One-line per-stage timing summary for the UI."""
+    parts = []
+    for name, seconds, calls in current.breakdown():
+        label = f"{name} ×{calls}" if calls > 1 else name
+        parts.append(f"{label} {seconds * 1000:.0f}ms" if seconds < 1 else f"{label} {seconds:.2f}s")
+    parts.append(f"total {current.duration:.2f}s")
+    return " · ".join(parts)
+
+
+# -----------------------------
+# /metrics endpoint
+# -----------------------------
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def log_message(self, *args):
+        pass
+
+    def do_GET(self):
+        if self.path.split("?")[0] != "/metrics":
+            self.send_response(404)
+            self.send_header("Content-Length", "0")
+            self.end_headers()
+            return
+        body = metrics.render().encode("utf-8")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4; charset=utf-8")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+
+_server: Optional[ThreadingHTTPServer] = None
+_server_failed = False
+_server_lock = threading.Lock()
+
+
+def start_metrics_server(port: int = METRICS_PORT, host: str = METRICS_HOST) -> Optional[ThreadingHTTPServer]:
+    """Serve /metrics once per process (safe to call on every Streamlit rerun); port 0 disables it."""
+    global _server, _server_failed
+    with _server_lock:
+        if _server is None and port and not _server_failed:
+            try:
+                _server = ThreadingHTTPServer((host, port), _MetricsHandler)
+            except OSError as e:
+                _server_failed = True
+                logging.getLogger(__name__).warning("Metrics server not started on %s:%s: %s", host, port, e)
+                return None
+            _server.daemon_threads = True
+            threading.Thread(target=_server.serve_forever, name="metrics", daemon=True).start()
+        return _server